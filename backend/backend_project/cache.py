@@ -0,0 +1,243 @@
+"""
+Two-tier cache backend
+An in-process LRU in front of a shared cache alias (file-based on a single host,
+Redis for several nodes). Key prefix and version come from the shared alias, so
+both tiers use the same versioned keys and bumping CACHE_VERSION drops both.
+
+Only keys under LOCAL_PREFIXES are kept in the local tier; everything else
+(throttle histories, auth versions, ...) goes straight to the shared tier so all
+workers see the same value. Local entries live at most LOCAL_TIMEOUT seconds,
+which bounds how stale a worker can be after another worker invalidates a key.
+
+The single-host shared tier is CullingFileBasedCache: Django's FileBasedCache
+lists the whole cache directory on every set() to decide whether to cull, which
+costs tens of milliseconds per write at a few thousand entries.
+"""
+import fcntl
+import os
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.functional import cached_property
+
+_MISSING = object()
+
+
+class _LocalLRU:
+    """Thread-safe LRU of key -> (expires_at, value)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CullingFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache that checks for culling on about one write in CULL_EVERY instead
+    of every write, so set() no longer lists the directory. The directory can
+    overshoot MAX_ENTRIES by roughly CULL_EVERY files between culls. A cull drops
+    expired files first and samples live ones only if still over MAX_ENTRIES.
+    OPTIONS: MAX_ENTRIES, CULL_FREQUENCY as usual, CULL_EVERY (default 200),
+    LOCK_STRIPES (default 256) for lock().
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_every = max(1, int(options.get('CULL_EVERY', 200)))
+        self._lock_stripes = max(1, int(options.get('LOCK_STRIPES', 256)))
+
+    @contextmanager
+    def lock(self, key, version=None):
+        """
+        Exclusive flock shared by every process on the host, for read-modify-write of `key`.
+        Keys map onto LOCK_STRIPES lock files, so unrelated keys may occasionally wait on each other.
+        """
+        key = self.make_and_validate_key(key, version=version)
+        lock_dir = os.path.join(self._dir, 'locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        stripe = zlib.crc32(key.encode()) % self._lock_stripes
+        fd = os.open(os.path.join(lock_dir, f'{stripe}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _cull(self):
+        if random.randrange(self._cull_every):
+            return
+        self.cull()
+
+    def cull(self):
+        """Full cull; also safe to call from cron."""
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        live = []
+        for fname in filelist:
+            try:
+                with open(fname, 'rb') as f:
+                    if not self._is_expired(f):
+                        live.append(fname)
+            except FileNotFoundError:
+                pass
+        if len(live) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        for fname in random.sample(live, int(len(live) / self._cull_frequency)):
+            self._delete(fname)
+
+
+class TieredCache(BaseCache):
+    """
+    CACHES = {'default': {'BACKEND': 'backend_project.cache.TieredCache', 'LOCATION': 'shared',
+                          'OPTIONS': {'LOCAL_PREFIXES': [...], 'LOCAL_TIMEOUT': 5, 'LOCAL_MAX_ENTRIES': 1024}}}
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location or 'shared'
+        self._local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = _LocalLRU(options.get('LOCAL_MAX_ENTRIES', 1024))
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_key(self, key, version):
+        """Versioned key for the local tier, or None when the key is shared-only."""
+        if not self._local_prefixes or not key.startswith(self._local_prefixes):
+            return None
+        return self.shared.make_and_validate_key(key, version=version)
+
+    def _local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self._local_timeout
+        return min(self._local_timeout, timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is None:
+            return self.shared.get(key, default, version=version)
+        value = self._local.get(local_key)
+        if value is _MISSING:
+            value = self.shared.get(key, _MISSING, version=version)
+            if value is _MISSING:
+                return default
+            self._local.set(local_key, value, self._local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = self._local.get(local_key) if local_key is not None else _MISSING
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                local_key = self._local_key(key, version)
+                if local_key is not None:
+                    self._local.set(local_key, value, self._local_timeout)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            if timeout is not None and timeout is not DEFAULT_TIMEOUT and timeout <= 0:
+                self._local.discard(local_key)
+            else:
+                self._local.set(local_key, value, self._local_ttl(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            local_key = self._local_key(key, version)
+            if local_key is not None and key not in failed:
+                self._local.set(local_key, value, self._local_ttl(timeout))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if added and local_key is not None:
+            self._local.set(local_key, value, self._local_ttl(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._local.discard(local_key)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            local_key = self._local_key(key, version)
+            if local_key is not None:
+                self._local.discard(local_key)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None and self._local.get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._local.discard(local_key)
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,132 @@
+"""
+Read-replica routing
+Reads go to the replica alias only inside read_from_replica() (analytics, the
+public property list, visitor and earnings aggregates); everything else, and all
+writes, use the primary. Once a request writes, the rest of it reads from the
+primary, and the client (auth token, else IP) stays pinned to the primary for
+REPLICA_STICKY_SECONDS so it reads its own writes despite replication lag.
+
+Locally the replica can be a second SQLite file (REPLICA_DATABASE_URL).
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+PIN_KEY = 'db:primary-pin:{}'
+
+# Token lookups must see tokens created a moment ago (login), so never read them from the replica
+PRIMARY_ONLY_APPS = {'authtoken', 'sessions'}
+
+
+class _RoutingState:
+    __slots__ = ('use_replica', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.use_replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    """Route reads inside the block to the replica (unless the request is pinned to the primary)."""
+    state = _state.get()
+    token = None
+    if state is None:
+        state = _RoutingState()
+        token = _state.set(state)
+    previous = state.use_replica
+    state.use_replica = True
+    try:
+        yield
+    finally:
+        state.use_replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.use_replica or state.pinned or state.wrote
+            or not replica_configured()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same data as the primary
+        return {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def _client_ident(request):
+    auth = request.META.get('HTTP_AUTHORIZATION')
+    if auth:
+        return hashlib.sha1(auth.encode()).hexdigest()[:20]
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    return forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR', '')
+
+
+class ReplicaPinningMiddleware:
+    """Per-request routing state; clients that wrote recently read from the primary."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        pin_key = PIN_KEY.format(_client_ident(request))
+        state = _RoutingState(pinned=bool(cache.get(pin_key)))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            cache.set(pin_key, 1, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin: safe-method requests for `replica_actions` (None = every action)
+    run inside read_from_replica().
+    """
+    replica_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method not in SAFE_METHODS or (
+            self.replica_actions is not None and action not in self.replica_actions
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
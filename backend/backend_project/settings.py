@@ -51,6 +51,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend_project.db_router.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -94,6 +95,21 @@ if os.getenv('DATABASE_URL'):
         conn_health_checks=True,
     )
 
+# Optional read replica: analytics and public listing reads go there (backend_project.db_router)
+# Locally a copy of the SQLite file works, e.g. REPLICA_DATABASE_URL=sqlite:////tmp/replica.sqlite3
+REPLICA_DATABASE_URL = config("REPLICA_DATABASE_URL", default="")
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ["backend_project.db_router.ReplicaRouter"]
+# بعد أي كتابة يقرأ العميل من القاعدة الأساسية لهذه المدة (قراءة ما كتبه رغم تأخر النسخ)
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
 # ================== Password Validation ==================
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,6 +146,8 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# collect_orphaned_media --limit: آخر ملف تم فحصه في كل مجلد (للاستكمال في التشغيل التالي)
+MEDIA_GC_CHECKPOINT_PATH = config("MEDIA_GC_CHECKPOINT_PATH", default=str(BASE_DIR / ".media_gc_checkpoint.json"))
 
 # ================== Default Field ==================
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -156,7 +174,7 @@ CORS_ALLOW_CREDENTIALS = True
 # ================== REST Framework ==================
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -168,17 +186,134 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "backend_project.throttling.GCRAAnonRateThrottle",
+        "backend_project.throttling.GCRAUserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "60/minute",
         "user": "120/minute",
         "auth": "20/minute",
         "contact": "3/minute",
+        "visit": "30/minute",
+    },
+}
+# GCRA throttles (backend_project.throttling): a scope allows a burst of B requests back to back,
+# then one every period/N. The default B = N keeps SimpleRateThrottle's "N requests at once"
+# and its long-run rate of N per period. A single period can still admit up to 2N - 1 requests
+# (a full burst followed by the refill). THROTTLE_BURSTS lowers B per scope. B = 1 caps every
+# period at N, but it forces period/N between requests, e.g. 3 s for auth and 20 s for contact.
+THROTTLE_BURSTS = {}
+
+# ================== Cache ==================
+# طبقتان: LRU داخل كل worker أمام كاش مشترك بين الـ workers (throttles / إبطال التوكن / ...)
+# CACHE_BACKEND: file (خادم واحد) | redis (عدة خوادم، يتطلب حزمة redis و REDIS_URL) | locmem (تطوير)
+CACHE_BACKEND = config("CACHE_BACKEND", default="file")
+CACHE_KEY_PREFIX = config("CACHE_KEY_PREFIX", default="eskan")
+CACHE_VERSION = config("CACHE_VERSION", default=1, cast=int)  # زيادته تُسقط كل المفاتيح القديمة
+
+_SHARED_CACHES = {
+    "file": {
+        # يفحص الحد الأقصى مرة كل CULL_EVERY كتابة تقريباً بدل سرد المجلد مع كل كتابة
+        "BACKEND": "backend_project.cache.CullingFileBasedCache",
+        "LOCATION": config("CACHE_DIR", default=str(BASE_DIR / ".cache")),
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int),
+            "CULL_EVERY": config("CACHE_CULL_EVERY", default=200, cast=int),
+        },
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL", default="redis://127.0.0.1:6379/1"),
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "backend_project.cache.TieredCache",
+        "LOCATION": "shared",
+        "OPTIONS": {
+            # المفاتيح التي تُقرأ كثيراً وتتحمل تأخر الإبطال بين الـ workers حتى LOCAL_TIMEOUT ثانية
+            "LOCAL_PREFIXES": ["listings:leaderboard:", "listings:area_price_index", "users:public-profile:"],
+            "LOCAL_TIMEOUT": config("CACHE_LOCAL_TIMEOUT", default=5, cast=int),
+            "LOCAL_MAX_ENTRIES": config("CACHE_LOCAL_MAX_ENTRIES", default=1024, cast=int),
+        },
+    },
+    "shared": {
+        **_SHARED_CACHES[CACHE_BACKEND],
+        "KEY_PREFIX": CACHE_KEY_PREFIX,
+        "VERSION": CACHE_VERSION,
     },
 }
 
+# ================== Auth Token Cache ==================
+# token → user → profile في ذاكرة كل worker لمدة قصيرة (يُبطل عند الخروج/تغيير كلمة المرور/تعديل الملف)
+AUTH_TOKEN_CACHE_SIZE = config("AUTH_TOKEN_CACHE_SIZE", default=1024, cast=int)
+AUTH_TOKEN_CACHE_SECONDS = config("AUTH_TOKEN_CACHE_SECONDS", default=60, cast=int)
+# فلتر Bloom لأسماء المستخدمين: أقل مدة بين إعادة البناء عند تسجيل مستخدم في worker آخر
+USERNAME_BLOOM_REFRESH_SECONDS = config("USERNAME_BLOOM_REFRESH_SECONDS", default=30, cast=int)
+# مدة تخزين رأس الملف العام (+ أول صفحة عقارات)؛ يُبطل عند تعديل المالك أو عقاراته
+PUBLIC_PROFILE_CACHE_SECONDS = config("PUBLIC_PROFILE_CACHE_SECONDS", default=300, cast=int)
+
+# ================== Analytics Snapshot ==================
+# مجلد مشترك لملفات اللقطة العمودية (memory-mapped) بين workers؛ فارغ = لقطة لكل worker فقط
+ANALYTICS_SNAPSHOT_DIR = config("ANALYTICS_SNAPSHOT_DIR", default="")
+ANALYTICS_SNAPSHOT_CHECK_SECONDS = config("ANALYTICS_SNAPSHOT_CHECK_SECONDS", default=60, cast=int)
+ANALYTICS_SNAPSHOT_FULL_RELOAD_SECONDS = config("ANALYTICS_SNAPSHOT_FULL_RELOAD_SECONDS", default=600, cast=int)
+
+# مؤشر أسعار المناطق: أقصى عمر قبل إعادة البناء ومدة الكاش
+PRICE_INDEX_MAX_AGE_SECONDS = config("PRICE_INDEX_MAX_AGE_SECONDS", default=3600, cast=int)
+PRICE_INDEX_CACHE_SECONDS = config("PRICE_INDEX_CACHE_SECONDS", default=600, cast=int)
+
+# تجميع المشاهدات والزيارات قبل كتابتها، ونصف عمر درجة الرواج بالساعات
+# خيط خلفي يكتب المخزن بعد MAX_AGE ثانية حتى بدون طلبات؛ القتل المفاجئ للـ worker يفقد آخر MAX_AGE ثانية فقط
+VIEW_BUFFER_MAX_ITEMS = config("VIEW_BUFFER_MAX_ITEMS", default=500, cast=int)
+VIEW_BUFFER_MAX_AGE_SECONDS = config("VIEW_BUFFER_MAX_AGE_SECONDS", default=10, cast=float)
+TRENDING_HALF_LIFE_HOURS = config("TRENDING_HALF_LIFE_HOURS", default=24, cast=float)
+LEADERBOARD_CACHE_SECONDS = config("LEADERBOARD_CACHE_SECONDS", default=60, cast=int)
+VISIT_BUFFER_MAX_ITEMS = config("VISIT_BUFFER_MAX_ITEMS", default=500, cast=int)
+VISIT_BUFFER_MAX_AGE_SECONDS = config("VISIT_BUFFER_MAX_AGE_SECONDS", default=10, cast=float)
+
+# إشعار المالك عند ارتفاع مشاهدات الساعة عن متوسط آخر 24 ساعة
+VIEW_SPIKE_MIN_VIEWS = config("VIEW_SPIKE_MIN_VIEWS", default=20, cast=int)
+VIEW_SPIKE_MULTIPLIER = config("VIEW_SPIKE_MULTIPLIER", default=3.0, cast=float)
+VIEW_SPIKE_COOLDOWN_HOURS = config("VIEW_SPIKE_COOLDOWN_HOURS", default=24, cast=int)
+
+# ================== Moderation ==================
+# أقصى عدد عقارات في طلب مراجعة مجمع، وحجم دفعة رسائل البريد لكل اتصال SMTP
+BULK_MODERATION_MAX_ITEMS = config("BULK_MODERATION_MAX_ITEMS", default=500, cast=int)
+BULK_MODERATION_EMAIL_BATCH = config("BULK_MODERATION_EMAIL_BATCH", default=50, cast=int)
+# send_moderation_emails (cron): إعادة إرسال البريد المعلق الأقدم من N دقيقة (لم يرسله الخيط الخلفي)
+MODERATION_EMAIL_RETRY_AFTER_MINUTES = config("MODERATION_EMAIL_RETRY_AFTER_MINUTES", default=10, cast=int)
+# أقصى عدد عقارات في طلب حذف منطقي / استرجاع مجمع
+BULK_SOFT_DELETE_MAX_ITEMS = config("BULK_SOFT_DELETE_MAX_ITEMS", default=500, cast=int)
+# أولوية قائمة المراجعة: ساعات تقديم للمالك الموثّق ولكل إعادة إرسال (بحد أقصى لعدد المرات)
+MODERATION_VERIFIED_BONUS_HOURS = config("MODERATION_VERIFIED_BONUS_HOURS", default=24, cast=float)
+MODERATION_RESUBMISSION_BONUS_HOURS = config("MODERATION_RESUBMISSION_BONUS_HOURS", default=12, cast=float)
+MODERATION_MAX_RESUBMISSION_BONUSES = config("MODERATION_MAX_RESUBMISSION_BONUSES", default=3, cast=int)
+# كشف التكرار: أقل تشابه نصي (Jaccard تقديري)، أقصى فرق بت بين صورتين، وأقصى عدد مرشحين من LSH
+DUPLICATE_TEXT_THRESHOLD = config("DUPLICATE_TEXT_THRESHOLD", default=0.6, cast=float)
+DUPLICATE_IMAGE_MAX_DISTANCE = config("DUPLICATE_IMAGE_MAX_DISTANCE", default=6, cast=int)
+DUPLICATE_MAX_CANDIDATES = config("DUPLICATE_MAX_CANDIDATES", default=50, cast=int)
+
+# ================== Notifications ==================
+# دمج إشعارات المسؤولين المتتالية غير المقروءة من نفس النوع خلال النافذة في صف واحد
+NOTIFICATION_DIGEST_WINDOW_MINUTES = config("NOTIFICATION_DIGEST_WINDOW_MINUTES", default=60, cast=int)
+# prune_notifications: حذف المقروء الأقدم من N يوم، وأقصى عدد غير مقروء لكل مستخدم
+NOTIFICATION_READ_RETENTION_DAYS = config("NOTIFICATION_READ_RETENTION_DAYS", default=30, cast=int)
+NOTIFICATION_UNREAD_CAP = config("NOTIFICATION_UNREAD_CAP", default=200, cast=int)
+
+# ================== Audit Archive ==================
+# السجلات الأقدم من N يوم تُنقل (archive_audit_logs) إلى ملفات NDJSON مضغوطة، ملف لكل شهر
+AUDIT_ARCHIVE_DIR = config("AUDIT_ARCHIVE_DIR", default=str(BASE_DIR / "archive"))
+AUDIT_ARCHIVE_AFTER_DAYS = config("AUDIT_ARCHIVE_AFTER_DAYS", default=180, cast=int)
+
+# ================== GeoIP ==================
+# ملف CSV لنطاقات IP (مثل DB-IP lite city/country)؛ فارغ = بدون تحديد الدولة/المدينة
+GEOIP_DATABASE_PATH = config("GEOIP_DATABASE_PATH", default="")
+
 # ================== Security (Production) ==================
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
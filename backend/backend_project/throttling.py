@@ -0,0 +1,136 @@
+"""
+GCRA (Generic Cell Rate Algorithm) throttles
+State is a single integer per client: the theoretical arrival time (TAT) in
+microseconds. A request is allowed while now >= TAT - burst tolerance; each
+allowed request pushes TAT forward by one emission interval (period / limit).
+This allows a burst of `limit` requests, then a steady `limit` per period, the
+same long-run bound as DRF's SimpleRateThrottle without its per-request history.
+Any single period can admit up to burst + limit - 1 requests (2 * limit - 1 by default);
+settings.THROTTLE_BURSTS can lower the burst per scope at the cost of spacing requests out.
+
+With the Redis shared tier the check-and-update is one atomic Lua script. The
+file tier wraps the read-compute-write in its per-key flock (CullingFileBasedCache.lock);
+other backends only get a per-process lock, which is enough for locmem.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import SimpleRateThrottle
+
+# KEYS[1] = TAT key; ARGV = now, emission interval, burst tolerance (microseconds)
+# returns [allowed, microseconds to wait]
+GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local allow_at = tat - tolerance
+if now < allow_at then
+    return {0, allow_at - now}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil((new_tat - now) / 1000))
+return {1, 0}
+"""
+
+MICROSECONDS = 1_000_000
+
+_PROCESS_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _shared_backend(cache):
+    # TieredCache (backend_project.cache) exposes its shared alias; other backends are used as-is
+    return getattr(cache, 'shared', cache)
+
+
+def _key_lock(backend, key):
+    lock = getattr(backend, 'lock', None)
+    if lock is not None:
+        return lock(key)
+    return _PROCESS_LOCKS[hash(key) % len(_PROCESS_LOCKS)]
+
+
+def gcra_update(cache, key, interval, tolerance, now=None):
+    """
+    Check and consume one request for `key`. Times are integer microseconds.
+    Returns (allowed, microseconds until the next request would be allowed).
+    """
+    now = int(time.time() * MICROSECONDS) if now is None else now
+    backend = _shared_backend(cache)
+    if isinstance(backend, RedisCache):
+        redis_key = backend.make_and_validate_key(key)
+        client = backend._cache.get_client(redis_key, write=True)
+        allowed, wait = client.eval(GCRA_LUA, 1, redis_key, now, interval, tolerance)
+        return bool(allowed), int(wait)
+
+    with _key_lock(backend, key):
+        tat = max(backend.get(key, now), now)
+        allow_at = tat - tolerance
+        if now < allow_at:
+            return False, allow_at - now
+        new_tat = tat + interval
+        backend.set(key, new_tat, max(1, -(-(new_tat - now) // MICROSECONDS)))
+    return True, 0
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """
+    Drop-in replacement for SimpleRateThrottle subclasses: same `rate` / `scope`
+    settings and get_cache_key(), constant-size state per key.
+    """
+    cache = default_cache
+    cache_format = 'throttle:gcra:%(scope)s:%(ident)s'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        interval = self.duration * MICROSECONDS // self.num_requests
+        tolerance = interval * (self.get_burst() - 1)
+        allowed, self._wait = gcra_update(self.cache, self.key, interval, tolerance)
+        return allowed
+
+    def get_burst(self):
+        """Requests allowed back to back: settings.THROTTLE_BURSTS[scope], default the full rate."""
+        burst = getattr(settings, 'THROTTLE_BURSTS', {}).get(self.scope, self.num_requests)
+        return max(1, min(burst, self.num_requests))
+
+    def wait(self):
+        return self._wait / MICROSECONDS
+
+
+class GCRAAnonRateThrottle(GCRAThrottle):
+    """Anonymous requests, keyed by client IP (scope 'anon')."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class GCRAUserRateThrottle(GCRAThrottle):
+    """Authenticated requests keyed by user id, anonymous ones by IP (scope 'user')."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class GCRAClientRateThrottle(GCRAThrottle):
+    """Every request keyed by client IP, authenticated or not."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
@@ -20,4 +20,4 @@ urlpatterns = [
 # GET /api/earnings/deals/summary/ - ملخص الأرباح
 # GET /api/earnings/deals/by_type/ - الأرباح حسب النوع
 # GET /api/earnings/deals/by_area/ - الأرباح حسب المنطقة
-# GET /api/earnings/deals/monthly/ - الأرباح الشهرية
+# GET /api/earnings/deals/monthly/?granularity=&from=&to= - الأرباح الشهرية (أو حسب الفترة)
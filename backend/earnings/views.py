@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg, Q
 from datetime import datetime, timedelta
-import calendar
+from backend_project.db_router import ReplicaReadMixin
+from listings.timeseries import time_series, format_period, parse_time_series_params
 from .models import UserEarning
 from .serializers import UserEarningSerializer, EarningsSummarySerializer
 
@@ -17,7 +18,7 @@ class IsOwner(permissions.BasePermission):
         return obj.user == request.user
 
 
-class UserEarningViewSet(viewsets.ModelViewSet):
+class UserEarningViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet لإدارة أرباح المستخدم
     
@@ -32,6 +33,8 @@ class UserEarningViewSet(viewsets.ModelViewSet):
     search_fields = ['property_name', 'area', 'property_type']
     ordering_fields = ['deal_date', 'earnings', 'created_at']
     ordering = ['-deal_date']
+    # ملخصات الأرباح تُقرأ من النسخة المتماثلة
+    replica_actions = {'summary', 'by_type', 'by_area', 'monthly', 'filter_by_date'}
     
     def get_queryset(self):
         """
@@ -136,35 +139,33 @@ class UserEarningViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def monthly(self, request):
         """
-        الحصول على الأرباح الشهرية (آخر 12 شهر)
-        """
-        queryset = self.get_queryset()
-        months_data = []
+        الحصول على الأرباح لكل فترة (افتراضياً شهرياً لآخر 12 شهر)
         
-        now = timezone.now()
+        المعاملات:
+        - granularity: day / week / month
+        - from, to: حدود الفترة (YYYY-MM-DD)
+        """
+        try:
+            granularity, start, end = parse_time_series_params(
+                request.query_params, default_granularity='month', default_periods=12
+            )
+            series = time_series(
+                self.get_queryset(), 'deal_date', metric=Sum('earnings'),
+                granularity=granularity, start=start, end=end,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        for i in range(11, -1, -1):
-            # حساب الشهر بدقة باستخدام الحساب على الأشهر والسنوات
-            month = now.month - i
-            year = now.year
-            while month <= 0:
-                month += 12
-                year -= 1
-            
-            month_start = timezone.datetime(year, month, 1).date()
-            last_day = calendar.monthrange(year, month)[1]
-            month_end = timezone.datetime(year, month, last_day).date()
-            
-            month_earnings = queryset.filter(
-                deal_date__gte=month_start,
-                deal_date__lte=month_end
-            ).aggregate(Sum('earnings'))['earnings__sum'] or 0
-            
-            months_data.append({
-                'month': f'{year}-{month:02d}',
-                'month_ar': month_start.strftime('%b'),
-                'earnings': month_earnings
-            })
+        months_data = []
+        for point in series:
+            item = {
+                'period': format_period(point['period'], granularity),
+                'earnings': point['value'],
+            }
+            if granularity == 'month':
+                item['month'] = item['period']
+                item['month_ar'] = point['period'].strftime('%b')
+            months_data.append(item)
         
         return Response(months_data)
     
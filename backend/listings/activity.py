@@ -0,0 +1,102 @@
+"""
+سجل النشاط: كتابة بيانات مختصرة (JSON) ومفتاح منع تكرار، والنص المقروء يُبنى عند العرض فقط
+"""
+from .models import ActivityLog, Area, Property
+
+# أعمدة العقار المحفوظة في payload (قيم خام بدون استعلامات إضافية)
+PROPERTY_PAYLOAD_FIELDS = (
+    'area_id', 'address', 'contact', 'price', 'original_price', 'discount',
+    'rooms', 'beds', 'bathrooms', 'size', 'floor', 'usage_type',
+    'furnished', 'featured', 'status', 'latitude', 'longitude',
+)
+
+TITLES = {
+    'create_property': '📋 تم إضافة عقار جديد',
+    'delete_property': '📋 تم حذف عقار',
+    'restore_property': '♻️ تم استرجاع عقار',
+    'update_property': '📋 تم تعديل عقار',
+    'approve_property': '✅ تمت الموافقة على العقار',
+    'reject_property': '❌ تم رفض العقار',
+    'create_user': '👤 تم إنشاء حساب جديد',
+}
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)  # Decimal / datetime
+
+
+def property_payload(instance, **extra):
+    payload = {field: _json_value(getattr(instance, field)) for field in PROPERTY_PAYLOAD_FIELDS}
+    payload['created_at'] = instance.created_at.isoformat() if instance.created_at else None
+    payload.update({key: _json_value(value) for key, value in extra.items()})
+    return payload
+
+
+def log_activity(action, content_type, object_id, object_name='', user=None, payload=None,
+                 dedupe_key='', ip_address=None, user_id=None):
+    """
+    إدخال سجل نشاط واحد؛ مع dedupe_key يُتجاهل السجل المكرر على مستوى القاعدة (بدون SELECT مسبق)
+    """
+    ActivityLog.objects.bulk_create([
+        ActivityLog(
+            user_id=user.pk if user is not None else user_id,
+            action=action,
+            content_type=content_type,
+            object_id=str(object_id),
+            object_name=(object_name or '')[:500],
+            payload=payload or {},
+            dedupe_key=dedupe_key,
+            ip_address=ip_address,
+        )
+    ], ignore_conflicts=bool(dedupe_key))
+
+
+def soft_delete_dedupe_key(instance):
+    """مفتاح واحد لكل عملية حذف منطقي (سجل الـ view وسجل الـ signal لا يتكرران)"""
+    deleted_at = instance.deleted_at.isoformat() if instance.deleted_at else ''
+    return f'delete_property:{instance.pk}:{deleted_at}'
+
+
+def _yes_no(value):
+    return 'نعم' if value else 'لا'
+
+
+def render_activity(log, area_names=None):
+    """النص المقروء لسجل النشاط (السجلات القديمة تعيد description كما هو)"""
+    payload = log.payload or {}
+    if not payload:
+        return log.description
+
+    lines = [TITLES.get(log.action, log.get_action_display())]
+    if log.content_type == 'property':
+        area_id = payload.get('area_id')
+        area_name = (area_names or {}).get(area_id) or (f'#{area_id}' if area_id else 'غير محدد')
+        lines.append(f"🏠 الاسم: {log.object_name}")
+        if 'address' in payload:
+            lines += [
+                f"📍 المنطقة: {area_name} — العنوان: {payload.get('address')}",
+                f"📞 رقم الاتصال: {payload.get('contact')}",
+                f"💰 السعر: {payload.get('price')} — الأصلي: {payload.get('original_price') or 'بدون'} — الخصم: {payload.get('discount') or 0}%",
+                f"🏢 الغرف: {payload.get('rooms')} — الأسرة: {payload.get('beds')} — الحمامات: {payload.get('bathrooms')}"
+                f" — المساحة: {payload.get('size')} م² — الدور: {payload.get('floor')}",
+                f"⚙️ النوع: {dict(Property.USAGE_TYPES).get(payload.get('usage_type'), payload.get('usage_type'))}"
+                f" — مفروش: {_yes_no(payload.get('furnished'))} — مميز: {_yes_no(payload.get('featured'))}"
+                f" — الحالة: {dict(Property.STATUS_CHOICES).get(payload.get('status'), payload.get('status'))}",
+            ]
+    if payload.get('deleted_at'):
+        lines.append(f"⏰ تاريخ الحذف: {payload['deleted_at'][:19].replace('T', ' ')}")
+    if payload.get('hard_delete'):
+        lines.append('🗑️ حذف نهائي من قاعدة البيانات')
+    if payload.get('notes'):
+        lines.append(f"📝 ملاحظات: {payload['notes']}")
+    return '\n'.join(lines)
+
+
+def area_names_for(logs):
+    """أسماء المناطق المذكورة في مجموعة سجلات (استعلام واحد)"""
+    area_ids = {(log.payload or {}).get('area_id') for log in logs} - {None}
+    if not area_ids:
+        return {}
+    return dict(Area.objects.filter(pk__in=area_ids).values_list('pk', 'name'))
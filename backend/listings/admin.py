@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 from django.http import HttpResponseRedirect
-from .models import Area, Amenity, Property, PropertyImage, PropertyVideo, Offer, ContactMessage, ActivityLog, Transaction, PropertyAuditTrail
+from .activity import area_names_for, render_activity
+from .audit import property_snapshot, record_property_audit
+from .soft_delete import bulk_restore, bulk_soft_delete
+from .models import Area, AreaPriceIndex, Amenity, Property, PropertyDuplicate, PropertyImage, PropertyVideo, Offer, ContactMessage, ActivityLog, Transaction, PropertyAuditTrail
 
 
 class PropertyImageInline(admin.TabularInline):
@@ -38,7 +42,7 @@ class PropertyAdmin(admin.ModelAdmin):
         'is_deleted',  # إضافة فلتر للعقارات المحذوفة
     )
     # الـ actions المتاحة
-    actions = ['soft_delete_selected', 'delete_selected']
+    actions = ['soft_delete_selected', 'restore_selected', 'delete_selected']
     # inlines = [PropertyImageInline, PropertyVideoInline]  # مخفية من admin
     inlines = [PropertyImageInline, PropertyVideoInline]
     readonly_fields = (
@@ -282,27 +286,21 @@ class PropertyAdmin(admin.ModelAdmin):
         مع تسجيل العملية في PropertyAuditTrail
         """
         from django.utils import timezone
-        from .models import PropertyAuditTrail
-        from .serializers import PropertySerializer
         
-        # حفظ البيانات قبل الحذف
-        serializer = PropertySerializer(obj, context={'request': request})
-        property_data_before = serializer.data
+        # لقطة البيانات قبل الحذف
+        property_data_before = property_snapshot(obj)
         
         # تنفيذ soft delete
         obj.is_deleted = True
         obj.deleted_at = timezone.now()
         obj.deleted_by = request.user.profile if hasattr(request.user, 'profile') else None
-        obj.save()
+        obj.save(update_fields=['is_deleted', 'deleted_at', 'deleted_by', 'updated_at'])
         
         # تسجيل العملية في PropertyAuditTrail
         try:
-            PropertyAuditTrail.objects.create(
-                property=obj,
-                action='delete',
+            record_property_audit(
+                obj, property_data_before, 'delete',
                 performed_by=request.user.profile if hasattr(request.user, 'profile') else None,
-                property_data_before=property_data_before,
-                property_data_after={},  # لا توجد بيانات بعد الحذف
                 notes=f"تم الحذف من Django Admin بواسطة {request.user.username}",
                 ip_address=self._get_client_ip(request)
             )
@@ -325,49 +323,39 @@ class PropertyAdmin(admin.ModelAdmin):
         return actions
     
     def soft_delete_selected(self, request, queryset):
-        """حذف ناعم للعناصر المختارة (soft delete) مع تسجيل في PropertyAuditTrail"""
-        from .serializers import PropertySerializer
-        
-        deleted_count = 0
-        
-        for obj in queryset:
-            try:
-                # حفظ البيانات قبل الحذف
-                serializer = PropertySerializer(obj, context={'request': request})
-                property_data_before = serializer.data
-                
-                # تنفيذ soft delete
-                obj.is_deleted = True
-                obj.deleted_at = timezone.now()
-                obj.deleted_by = request.user.profile if hasattr(request.user, 'profile') else None
-                obj.save()
-                
-                # تسجيل العملية في PropertyAuditTrail
-                try:
-                    PropertyAuditTrail.objects.create(
-                        property=obj,
-                        action='delete',
-                        performed_by=request.user.profile if hasattr(request.user, 'profile') else None,
-                        property_data_before=property_data_before,
-                        property_data_after={},
-                        notes=f"تم الحذف المجمع من Django Admin بواسطة {request.user.username}",
-                        ip_address=self._get_client_ip(request)
-                    )
-                except Exception as e:
-                    print(f"خطأ في تسجيل حذف العقار: {str(e)}")
-                
-                deleted_count += 1
-            except Exception as e:
-                self.message_user(request, f"خطأ في حذف العقار: {str(e)}", level='error')
-        
-        self.message_user(
-            request, 
-            f'✅ تم حذف {deleted_count} عقار بنجاح.',
-            level='success'
+        """حذف ناعم للعناصر المختارة (UPDATE واحد + سجلات تدقيق مجمعة لكل دفعة)"""
+        count = self._bulk_soft_delete(
+            request, queryset, bulk_soft_delete,
+            f"تم الحذف المجمع من Django Admin بواسطة {request.user.username}",
         )
+        self.message_user(request, f'✅ تم حذف {count} عقار بنجاح.', level='success')
     
     soft_delete_selected.short_description = "🗑️ حذف العناصر المختارة (حذف ناعم)"
 
+    def restore_selected(self, request, queryset):
+        """استرجاع العقارات المحذوفة المختارة"""
+        count = self._bulk_soft_delete(
+            request, queryset, bulk_restore,
+            f"تم الاسترجاع المجمع من Django Admin بواسطة {request.user.username}",
+        )
+        self.message_user(request, f'♻️ تم استرجاع {count} عقار بنجاح.', level='success')
+    
+    restore_selected.short_description = "♻️ استرجاع العناصر المحذوفة المختارة"
+    
+    def _bulk_soft_delete(self, request, queryset, service, notes):
+        ids = list(queryset.values_list('pk', flat=True))
+        batch_size = getattr(settings, 'BULK_SOFT_DELETE_MAX_ITEMS', 500)
+        count = 0
+        for start in range(0, len(ids), batch_size):
+            applied, _ = service(
+                ids[start:start + batch_size],
+                performed_by=getattr(request.user, 'profile', None),
+                notes=notes,
+                ip_address=self._get_client_ip(request),
+            )
+            count += len(applied)
+        return count
+
 
 @admin.register(Area)
 class AreaAdmin(admin.ModelAdmin):
@@ -379,6 +367,21 @@ class AreaAdmin(admin.ModelAdmin):
     property_count.short_description = "عدد العقارات"
 
 
+@admin.register(AreaPriceIndex)
+class AreaPriceIndexAdmin(admin.ModelAdmin):
+    list_display = ('area', 'usage_type', 'pricing', 'sample_size', 'p10_price', 'median_price', 'p90_price', 'median_price_per_meter', 'computed_at')
+    list_filter = ('usage_type', 'pricing')
+    search_fields = ('area__name',)
+    list_select_related = ('area',)
+
+    def has_add_permission(self, request):
+        # المؤشر يُحسب تلقائياً (rebuild_price_index)
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Amenity)
 class AmenityAdmin(admin.ModelAdmin):
     list_display = ('name', 'icon', 'is_active', 'created_at')
@@ -516,7 +519,10 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'user__user__email',
         'object_name',
         'object_id',
-        'description',
+        'description',  # السجلات القديمة
+        'payload__address',
+        'payload__contact',
+        'payload__notes',
     )
     readonly_fields = (
         'user',
@@ -524,7 +530,8 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'content_type',
         'object_id',
         'object_name',
-        'description',
+        'rendered_description',
+        'payload',
         'ip_address',
         'timestamp',
     )
@@ -536,7 +543,7 @@ class ActivityLogAdmin(admin.ModelAdmin):
             'fields': ('content_type', 'object_id', 'object_name')
         }),
         ('معلومات إضافية', {
-            'fields': ('description', 'ip_address'),
+            'fields': ('rendered_description', 'payload', 'ip_address'),
             'classes': ('collapse',)
         }),
     )
@@ -573,6 +580,11 @@ class ActivityLogAdmin(admin.ModelAdmin):
         return format_html('<span style="color: #e74c3c;">حسابات محذوفة</span>')
     user_display.short_description = 'المستخدم'
     
+    def rendered_description(self, obj):
+        """الوصف المقروء (يُبنى من payload للسجلات الجديدة)"""
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', render_activity(obj, area_names_for([obj])))
+    rendered_description.short_description = 'الوصف'
+    
     def timestamp_display(self, obj):
         """عرض التاريخ والوقت بشكل محسّن"""
         from django.utils.timezone import localtime
@@ -662,6 +674,8 @@ class PropertyAuditTrailAdmin(admin.ModelAdmin):
         'property',
         'action',
         'performed_by',
+        'is_base',
+        'changes',
         'property_data_before',
         'property_data_after',
         'ip_address',
@@ -672,7 +686,7 @@ class PropertyAuditTrailAdmin(admin.ModelAdmin):
             'fields': ('action', 'property', 'performed_by', 'timestamp', 'ip_address')
         }),
         ('البيانات', {
-            'fields': ('property_data_before', 'property_data_after'),
+            'fields': ('is_base', 'changes', 'property_data_before', 'property_data_after'),
             'classes': ('collapse',)
         }),
         ('الملاحظات', {
@@ -737,4 +751,20 @@ class PropertyAuditTrailAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         """منع تعديل السجلات"""
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(PropertyDuplicate)
+class PropertyDuplicateAdmin(admin.ModelAdmin):
+    list_display = ('property', 'duplicate_of', 'text_similarity', 'image_matches', 'created_at')
+    list_filter = ('property__status',)
+    search_fields = ('property__name', 'duplicate_of__name')
+    list_select_related = ('property', 'duplicate_of')
+    raw_id_fields = ('property', 'duplicate_of')
+
+    def has_add_permission(self, request):
+        # تُرصد تلقائياً عند إضافة العقار (rebuild_duplicate_index)
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,10 +5,16 @@ Analytics Views and Utilities for Dashboard
 
 from django.db.models import Count, Q, Avg, Sum, Max, Min
 from django.utils import timezone
-from datetime import timedelta
-import calendar
+from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import Property, Area, Offer, ContactMessage, ActivityLog
+import numpy as np
+from .models import Property, Area, AreaPriceIndex, Offer, ContactMessage, ActivityLog
+from .activity import area_names_for, render_activity
+from .columnar import get_snapshot, group_by, histogram, price_per_meter
+from .price_index import display_prices, get_price_index_map
+from .leaderboard import get_leaderboard
+from .visitor_sketch import unique_visitors_last_days, unique_visitors_today
+from .timeseries import time_series, format_period, parse_time_series_params
 from users.models import UserProfile
 
 
@@ -17,37 +23,40 @@ class DashboardAnalytics:
     
     @staticmethod
     def get_property_stats():
-        """الحصول على إحصائيات العقارات"""
-        total_properties = Property.objects.filter(is_deleted=False).count()
-        approved_properties = Property.objects.filter(status='approved', is_deleted=False).count()
-        pending_properties = Property.objects.filter(status='pending', is_deleted=False).count()
-        deleted_properties = Property.objects.filter(is_deleted=True).count()
-        
-        total_value = Property.objects.filter(is_deleted=False).aggregate(
-            total=Sum('price')
-        )['total'] or Decimal('0')
-        
-        # إحصائيات اليوم
-        today = timezone.now().date()
-        properties_today = Property.objects.filter(created_at__date=today, is_deleted=False).count()
-        
+        """الحصول على إحصائيات العقارات (من اللقطة العمودية في الذاكرة)"""
+        props = get_snapshot().properties()
+        status = props['status']
+        live = ~props['is_deleted']
+        live_prices = props['price'][live]
+
+        # إحصائيات اليوم (بداية اليوم بالتوقيت المحلي)
+        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        created_today = props['created_at'] >= int(today_start.timestamp() * 1_000_000)
+
+        approved = live & (status == props.code('status', 'approved'))
+        price_per_m2 = price_per_meter(props['price'][approved], props['size'][approved])
+
         return {
-            'total': total_properties,
-            'approved': approved_properties,
-            'pending': pending_properties,
+            'total': int(live.sum()),
+            'approved': int(approved.sum()),
+            'pending': int((live & (status == props.code('status', 'pending'))).sum()),
             'draft': 0,  # لا يوجد حالة draft في النظام الحالي,
-            'rejected': Property.objects.filter(status='rejected', is_deleted=False).count(),
-            'deleted': deleted_properties,
-            'total_value': float(total_value),
-            'avg_price': float(
-                Property.objects.filter(is_deleted=False).aggregate(avg=Avg('price'))['avg'] or Decimal('0')
-            ),
-            'today': properties_today,
+            'rejected': int((live & (status == props.code('status', 'rejected'))).sum()),
+            'deleted': int(props['is_deleted'].sum()),
+            'total_value': float(live_prices.sum()),
+            'avg_price': float(live_prices.mean()) if len(live_prices) else 0.0,
+            'median_price': float(np.median(live_prices)) if len(live_prices) else 0.0,
+            'avg_price_per_meter': float(price_per_m2.mean()) if len(price_per_m2) else 0.0,
+            'today': int((live & created_today).sum()),
         }
     
     @staticmethod
-    def get_user_stats():
+    def get_user_stats(granularity='month', start=None, end=None):
         """الحصول على إحصائيات المستخدمين"""
+        if start is None:
+            granularity, start, end = parse_time_series_params(
+                {'granularity': granularity}, default_periods=6
+            )
         total_users = UserProfile.objects.count()
         today = timezone.now().date()
         new_users_today = UserProfile.objects.filter(
@@ -66,34 +75,21 @@ class DashboardAnalytics:
             total=Sum('visit_count')
         )['total'] or 0
         
-        # حساب الزيارات اليوم
-        visitors_today = Visitor.objects.filter(
-            last_visited__date=today
-        ).count()
+        # الزوار الفريدون اليوم وآخر 7/30 يوم (من ملخصات HLL اليومية)
+        visitors_today = unique_visitors_today()
         
-        # آخر 6 أشهر من التسجيلات
+        # التسجيلات حسب الفترة (افتراضياً آخر 6 أشهر) باستعلام واحد
+        registrations = time_series(
+            UserProfile.objects.all(), 'created_at',
+            granularity=granularity, start=start, end=end,
+        )
         monthly_registrations = []
-        now = timezone.now()
-        for i in range(5, -1, -1):
-            month = now.month - i
-            year = now.year
-            while month <= 0:
-                month += 12
-                year -= 1
-
-            month_start = timezone.datetime(year, month, 1).date()
-            last_day = calendar.monthrange(year, month)[1]
-            month_end = timezone.datetime(year, month, last_day).date()
-
-            month_count = UserProfile.objects.filter(
-                created_at__date__gte=month_start,
-                created_at__date__lte=month_end
-            ).count()
-
-            monthly_registrations.append({
-                'month': f'{year}-{month:02d}',
-                'count': month_count,
-            })
+        for point in registrations:
+            label = format_period(point['period'], granularity)
+            item = {'period': label, 'count': point['value']}
+            if granularity == 'month':
+                item['month'] = label
+            monthly_registrations.append(item)
 
         return {
             'total': total_users,
@@ -105,26 +101,63 @@ class DashboardAnalytics:
             'total_visits': total_visits,
             'total_unique_visitors': total_unique_visitors,
             'visitors_today': visitors_today,
+            'unique_visitors_7d': unique_visitors_last_days(7),
+            'unique_visitors_30d': unique_visitors_last_days(30),
             'monthly_registrations': monthly_registrations,
         }
     
     @staticmethod
     def get_area_stats():
-        """الحصول على إحصائيات المناطق"""
-        areas = Area.objects.annotate(
-            property_count=Count('properties', filter=Q(properties__is_deleted=False)),
-            avg_price=Avg('properties__price', filter=Q(properties__is_deleted=False)),
-            total_properties_value=Sum('properties__price', filter=Q(properties__is_deleted=False))
-        ).order_by('-property_count')[:10]
-        
+        """الحصول على إحصائيات المناطق (العقارات المعتمدة فقط + مؤشر الأسعار)"""
+        props = get_snapshot().properties()
+        approved = ~props['is_deleted'] & (props['status'] == props.code('status', 'approved'))
+        groups = group_by(props['area_id'][approved], props['price'][approved])
+
+        top = np.argsort(-groups['count'], kind='stable')[:10]
+        area_ids = [int(groups['keys'][i]) for i in top]
+        names = Area.objects.in_bulk(area_ids)
+        index_map = get_price_index_map()
+
+        result = []
+        for i, area_id in zip(top, area_ids):
+            if area_id not in names:
+                continue
+            index = index_map.get((area_id, AreaPriceIndex.ALL_USAGE_TYPES)) or {}
+            result.append({
+                'name': names[area_id].name,
+                'property_count': int(groups['count'][i]),
+                'avg_price': float(groups['mean'][i]),
+                'total_value': float(groups['sum'][i]),
+                'median_price': index.get('median'),
+                'p10_price': index.get('p10'),
+                'p90_price': index.get('p90'),
+                'median_price_per_meter': index.get('median_per_meter'),
+            })
+        return result
+    
+    @staticmethod
+    def get_area_price_index(area_id=None, usage_type=None):
+        """مؤشر أسعار المناطق لكل (منطقة، نوع استخدام)"""
+        rows = AreaPriceIndex.objects.select_related('area')
+        if area_id:
+            rows = rows.filter(area_id=area_id)
+        if usage_type:
+            rows = rows.filter(usage_type=usage_type)
+
         return [
             {
-                'name': area.name,
-                'property_count': area.property_count,
-                'avg_price': float(area.avg_price or Decimal('0')),
-                'total_value': float(area.total_properties_value or Decimal('0')),
+                'area_id': row.area_id,
+                'area': row.area.name,
+                'usage_type': row.usage_type,
+                'pricing': row.pricing,
+                'sample_size': row.sample_size,
+                'p10_price': float(row.p10_price),
+                'median_price': float(row.median_price),
+                'p90_price': float(row.p90_price),
+                'median_price_per_meter': float(row.median_price_per_meter) if row.median_price_per_meter is not None else None,
+                'computed_at': row.computed_at.isoformat(),
             }
-            for area in areas
+            for row in rows
         ]
     
     @staticmethod
@@ -138,30 +171,30 @@ class DashboardAnalytics:
             'daily': 'حجز يومي',
         }
         
-        stats = Property.objects.filter(is_deleted=False).values('usage_type').annotate(
-            count=Count('id'),
-            avg_price=Avg('price')
-        )
-        
-        return [
-            {
-                'name': usage_types.get(item['usage_type'], item['usage_type']),
-                'value': item['count'],
-                'avg_price': float(item['avg_price'] or Decimal('0')),
-            }
-            for item in stats
-        ]
+        props = get_snapshot().properties()
+        live = ~props['is_deleted']
+        groups = group_by(props['usage_type'][live], props['price'][live])
+
+        result = []
+        for code, count, avg_price in zip(groups['keys'], groups['count'], groups['mean']):
+            usage_type = props.label('usage_type', code)
+            result.append({
+                'name': usage_types.get(usage_type, usage_type),
+                'value': int(count),
+                'avg_price': float(avg_price),
+            })
+        return result
     
     @staticmethod
     def get_rooms_distribution():
         """الحصول على توزيع العقارات حسب عدد الغرف"""
-        properties = Property.objects.filter(status='approved', is_deleted=False)
-        
-        # حساب عدد العقارات لكل فئة غرف
-        one_room = properties.filter(rooms=1).count()
-        two_rooms = properties.filter(rooms=2).count()
-        three_rooms = properties.filter(rooms=3).count()
-        four_plus_rooms = properties.filter(rooms__gte=4).count()
+        props = get_snapshot().properties()
+        approved = ~props['is_deleted'] & (props['status'] == props.code('status', 'approved'))
+
+        # حساب عدد العقارات لكل فئة غرف (1, 2, 3, 4+)
+        one_room, two_rooms, three_rooms, four_plus_rooms = histogram(
+            props['rooms'][approved], [1, 2, 3, 4, np.inf]
+        )
         
         return [
             {'name': 'غرفة', 'value': one_room, 'color': '#0ea5e9'},
@@ -187,9 +220,10 @@ class DashboardAnalytics:
     @staticmethod
     def get_recent_activities(limit=10):
         """الحصول على آخر الأنشطة"""
-        activities = ActivityLog.objects.select_related('user').order_by(
+        activities = list(ActivityLog.objects.select_related('user').order_by(
             '-timestamp'
-        )[:limit]
+        )[:limit])
+        area_names = area_names_for(activities)
         
         return [
             {
@@ -198,17 +232,18 @@ class DashboardAnalytics:
                 'action': activity.get_action_display(),
                 'object_name': activity.object_name,
                 'timestamp': activity.timestamp.isoformat(),
-                'description': activity.description,
+                'description': render_activity(activity, area_names),
             }
             for activity in activities
         ]
     
     @staticmethod
-    def get_top_properties(limit=5):
-        """الحصول على أكثر العقارات مشاهدة (حسب الإرسالات/التحديثات)"""
-        properties = Property.objects.filter(
-            status='approved', is_deleted=False
-        ).order_by('-updated_at')[:limit]
+    def get_top_properties(limit=5, kind='views'):
+        """الحصول على أكثر العقارات مشاهدة (أو الأكثر رواجاً حالياً)"""
+        properties = get_leaderboard(
+            kind=kind, limit=limit,
+            queryset=Property.objects.filter(status='approved', is_deleted=False).select_related('area'),
+        )
         
         return [
             {
@@ -217,7 +252,8 @@ class DashboardAnalytics:
                 'area': prop.area.name if prop.area else 'غير محدد',
                 'price': float(prop.price),
                 'rooms': prop.rooms,
-                'images_count': prop.images.count(),
+                'views': prop.views,
+                'images_count': prop.images_count,
                 'featured': prop.featured,
             }
             for prop in properties
@@ -243,47 +279,87 @@ class DashboardAnalytics:
         }
     
     @staticmethod
-    def get_price_distribution():
-        """الحصول على توزيع الأسعار"""
-        price_ranges = [
-            {'min': 0, 'max': 10000, 'label': 'أقل من 10,000'},
-            {'min': 10000, 'max': 50000, 'label': '10,000 - 50,000'},
-            {'min': 50000, 'max': 100000, 'label': '50,000 - 100,000'},
-            {'min': 100000, 'max': 500000, 'label': '100,000 - 500,000'},
-            {'min': 500000, 'max': None, 'label': 'أكثر من 500,000'},
-        ]
+    def get_price_distribution(pricing='monthly'):
+        """الحصول على توزيع الأسعار (الشهرية أو اليومية بشكل منفصل)"""
+        if pricing == 'daily':
+            price_ranges = [
+                {'min': 0, 'max': 500, 'label': 'أقل من 500'},
+                {'min': 500, 'max': 1000, 'label': '500 - 1,000'},
+                {'min': 1000, 'max': 2000, 'label': '1,000 - 2,000'},
+                {'min': 2000, 'max': 5000, 'label': '2,000 - 5,000'},
+                {'min': 5000, 'max': None, 'label': 'أكثر من 5,000'},
+            ]
+        else:
+            price_ranges = [
+                {'min': 0, 'max': 10000, 'label': 'أقل من 10,000'},
+                {'min': 10000, 'max': 50000, 'label': '10,000 - 50,000'},
+                {'min': 50000, 'max': 100000, 'label': '50,000 - 100,000'},
+                {'min': 100000, 'max': 500000, 'label': '100,000 - 500,000'},
+                {'min': 500000, 'max': None, 'label': 'أكثر من 500,000'},
+            ]
         
-        result = []
-        for range_item in price_ranges:
-            query = Q(price__gte=range_item['min'])
-            if range_item['max']:
-                query &= Q(price__lt=range_item['max'])
-            
-            count = Property.objects.filter(query, status='approved', is_deleted=False).count()
-            result.append({
-                'label': range_item['label'],
-                'value': count,
-            })
-        
-        return result
+        props = get_snapshot().properties()
+        approved = ~props['is_deleted'] & (props['status'] == props.code('status', 'approved'))
+        prices, is_daily = display_prices(props, approved)
+        prices = prices[is_daily] if pricing == 'daily' else prices[~is_daily]
+
+        edges = [item['min'] for item in price_ranges] + [np.inf]
+        counts = histogram(prices, edges)
+
+        return [
+            {'label': item['label'], 'value': count}
+            for item, count in zip(price_ranges, counts)
+        ]
     
     @staticmethod
-    def get_daily_activity(days=30):
-        """الحصول على نشاط يومي للـ X أيام الماضية"""
-        start_date = timezone.now() - timedelta(days=days)
-        
-        activities = ActivityLog.objects.filter(
-            timestamp__gte=start_date
-        ).values('timestamp__date').annotate(
-            count=Count('id')
-        ).order_by('timestamp__date')
-        
+    def get_transaction_stats():
+        """إحصائيات الصفقات: الإجماليات والنسب المئوية والتجميع حسب المنطقة والنوع"""
+        transactions = get_snapshot().transactions()
+        profit = transactions['profit']
+        commission = transactions['commission']
+
+        def grouped(column):
+            groups = group_by(transactions[column], profit)
+            order = np.argsort(-groups['sum'], kind='stable')
+            return [
+                {
+                    'name': transactions.label(column, groups['keys'][i]),
+                    'count': int(groups['count'][i]),
+                    'total_profit': float(groups['sum'][i]),
+                    'avg_profit': float(groups['mean'][i]),
+                }
+                for i in order
+            ]
+
+        percentiles = np.percentile(profit, [10, 50, 90]).tolist() if len(profit) else [0.0, 0.0, 0.0]
+        return {
+            'total': len(transactions),
+            'total_profit': float(profit.sum()),
+            'total_commission': float(commission.sum()),
+            'avg_profit': float(profit.mean()) if len(profit) else 0.0,
+            'profit_percentiles': dict(zip(('p10', 'p50', 'p90'), percentiles)),
+            'by_region': grouped('region'),
+            'by_property_type': grouped('property_type'),
+        }
+    
+    @staticmethod
+    def get_daily_activity(days=30, granularity='day', start=None, end=None):
+        """الحصول على النشاط لكل فترة (افتراضياً يومياً لآخر X يوم)"""
+        if start is None:
+            granularity, start, end = parse_time_series_params(
+                {'granularity': granularity}, default_periods=days
+            )
+
+        series = time_series(
+            ActivityLog.objects.all(), 'timestamp',
+            granularity=granularity, start=start, end=end,
+        )
         return [
             {
-                'date': str(activity['timestamp__date']),
-                'count': activity['count'],
+                'date': format_period(point['period'], granularity),
+                'count': point['value'],
             }
-            for activity in activities
+            for point in series
         ]
     
     @staticmethod
@@ -315,6 +391,33 @@ class DashboardAnalytics:
         
         return result
     
+    @staticmethod
+    def get_geo_stats(limit=10):
+        """توزيع الزوار حسب الدولة والمدينة (من بيانات GeoIP)"""
+        from .models import Visitor
+        
+        visitors = Visitor.objects.exclude(country='')
+        countries = visitors.values('country').annotate(
+            count=Count('id'),
+            total_visits=Sum('visit_count')
+        ).order_by('-count')[:limit]
+        cities = visitors.exclude(city='').values('country', 'city').annotate(
+            count=Count('id'),
+            total_visits=Sum('visit_count')
+        ).order_by('-count')[:limit]
+        
+        return {
+            'countries': [
+                {'country': item['country'], 'count': item['count'], 'total_visits': item['total_visits'] or 0}
+                for item in countries
+            ],
+            'cities': [
+                {'country': item['country'], 'city': item['city'], 'count': item['count'], 'total_visits': item['total_visits'] or 0}
+                for item in cities
+            ],
+            'unknown': Visitor.objects.filter(country='').count(),
+        }
+    
     @staticmethod
     def get_top_owners(limit=4, user_type='landlord'):
         """الحصول على أفضل المالكين/الوسطاء/المكاتب"""
@@ -347,6 +450,8 @@ class DashboardAnalytics:
             'offers': DashboardAnalytics.get_offers_stats(),
             'contact_messages': DashboardAnalytics.get_contact_messages_stats(),
             'price_distribution': DashboardAnalytics.get_price_distribution(),
+            'daily_price_distribution': DashboardAnalytics.get_price_distribution(pricing='daily'),
+            'transactions': DashboardAnalytics.get_transaction_stats(),
             'recent_activities': DashboardAnalytics.get_recent_activities(limit=15),
             'top_properties': DashboardAnalytics.get_top_properties(limit=10),
             'daily_activity': DashboardAnalytics.get_daily_activity(days=30),
@@ -0,0 +1,163 @@
+"""
+أرشفة السجلات الباردة (ActivityLog / PropertyAuditTrail) في ملفات NDJSON مضغوطة بـ gzip، ملف لكل شهر
+الجداول تبقى صغيرة (بيانات حديثة فقط) والأرشيف يُقرأ تسلسلياً بمؤشر (ملف:سطر) بدون تحميله كاملاً
+"""
+import fcntl
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .audit import rebase_audit_trail
+from .models import ActivityLog, PropertyAuditTrail
+
+ARCHIVE_MODELS = {
+    'activity': ActivityLog,
+    'audit': PropertyAuditTrail,
+}
+
+
+class ArchiveError(ValueError):
+    """مؤشر أو نوع أرشيف غير صالح"""
+
+
+def archive_dir():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', settings.BASE_DIR / 'archive'))
+
+
+def _month_key(timestamp):
+    return timezone.localtime(timestamp).strftime('%Y-%m')
+
+
+def archive_path(kind, month):
+    return archive_dir() / f'{kind}-{month}.ndjson.gz'
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str, dict, list)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)  # UUID
+
+
+def _row_dict(obj):
+    # المفاتيح بأسماء الحقول (property وليس property_id) لتطابق استجابة الـ API
+    return {field.name: _json_value(getattr(obj, field.attname)) for field in obj._meta.concrete_fields}
+
+
+def _append(path, rows):
+    """كل دفعة عضو gzip جديد في نهاية الملف (gzip يقرأ الأعضاء المتتالية كملف واحد)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+            for row in rows:
+                gz.write(json.dumps(row, ensure_ascii=False).encode('utf-8') + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+@contextmanager
+def _archive_lock():
+    """قفل حصري على مجلد الأرشيف طوال التشغيل: تشغيلان متزامنان (cron متداخل) لا يكتبان نفس السجلات"""
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / '.lock', 'w') as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def archive_rows(kind, before, batch_size=1000, dry_run=False):
+    """
+    نقل السجلات الأقدم من before إلى ملفات الأرشيف على دفعات
+    كل دفعة: كتابة الملف ثم الحذف داخل نفس المعاملة (فشل الكتابة لا يحذف شيئاً)
+    التوقف بين الكتابة وتأكيد الحذف يعيد كتابة الدفعة في التشغيل التالي؛ read_archive يتجاهل المكرر
+    يعيد {الشهر: عدد السجلات}
+    """
+    if kind not in ARCHIVE_MODELS:
+        raise ArchiveError(f'نوع أرشيف غير معروف: {kind}')
+    model = ARCHIVE_MODELS[kind]
+    queryset = model.objects.filter(timestamp__lt=before).order_by('timestamp', 'id')
+
+    if dry_run:
+        counts = {}
+        for timestamp in queryset.values_list('timestamp', flat=True).iterator():
+            month = _month_key(timestamp)
+            counts[month] = counts.get(month, 0) + 1
+        return counts
+
+    with _archive_lock():
+        if kind == 'audit':
+            # السجل الأساسي قد يُؤرشف بينما تبقى فروق لاحقة: أول سجل حديث يصبح لقطة أساسية
+            with transaction.atomic():
+                rebase_audit_trail(before)
+
+        counts = {}
+        while True:
+            with transaction.atomic():
+                batch = list(queryset[:batch_size])
+                if not batch:
+                    break
+                by_month = {}
+                for obj in batch:
+                    by_month.setdefault(_month_key(obj.timestamp), []).append(_row_dict(obj))
+                for month, rows in by_month.items():
+                    _append(archive_path(kind, month), rows)
+                    counts[month] = counts.get(month, 0) + len(rows)
+                model.objects.filter(pk__in=[obj.pk for obj in batch]).delete()
+    return counts
+
+
+def archive_months(kind):
+    return sorted(
+        path.name[len(kind) + 1:-len('.ndjson.gz')]
+        for path in archive_dir().glob(f'{kind}-*.ndjson.gz')
+    )
+
+
+def _parse_cursor(cursor):
+    if not cursor:
+        return None, 0
+    month, _, line = cursor.rpartition(':')
+    if not month or not line.isdigit():
+        raise ArchiveError('مؤشر الأرشيف غير صالح')
+    return month, int(line)
+
+
+def read_archive(kind, cursor=None, limit=50, match=None, since=None, until=None):
+    """
+    قراءة الأرشيف بترتيب زمني تصاعدي (الأقدم أولاً) من المؤشر 'YYYY-MM:سطر'
+    match: دالة تصفية على السجل؛ since/until: حدود الشهر 'YYYY-MM'
+    السجل المكرر في نفس الشهر (أرشفة توقفت قبل الحذف) يُعاد مرة واحدة، ولو في صفحة سابقة
+    يعيد (السجلات، المؤشر التالي أو None)
+    """
+    if kind not in ARCHIVE_MODELS:
+        raise ArchiveError(f'نوع أرشيف غير معروف: {kind}')
+    start_month, start_line = _parse_cursor(cursor)
+
+    results = []
+    for month in archive_months(kind):
+        if (since and month < since) or (until and month > until):
+            continue
+        if start_month and month < start_month:
+            continue
+        skip = start_line if month == start_month else 0
+        seen = set()
+        with gzip.open(archive_path(kind, month), 'rt', encoding='utf-8') as fh:
+            for line_no, line in enumerate(fh):
+                row = json.loads(line)
+                duplicate = row['id'] in seen
+                seen.add(row['id'])
+                if line_no < skip or duplicate:
+                    continue
+                if match is not None and not match(row):
+                    continue
+                if len(results) == limit:
+                    return results, f'{month}:{line_no}'
+                results.append(row)
+    return results, None
@@ -0,0 +1,164 @@
+"""
+سجل تدقيق العقارات بترميز الفروق:
+أول سجل لكل عقار يحفظ لقطة كاملة (is_base)، وكل سجل بعده يحفظ الحقول المتغيرة فقط {field: [قبل، بعد]}
+اللقطة تُقرأ من قيم الأعمدة مباشرة بدون PropertySerializer (بدون استعلامات إضافية)
+"""
+from django.db.models import OuterRef, Subquery
+
+from .models import Property, PropertyAuditTrail
+
+# أعمدة لا معنى لتتبعها في التدقيق (عدادات وحقول محسوبة تتغير مع كل مشاهدة)
+SNAPSHOT_EXCLUDED_FIELDS = frozenset({
+    'visited_ips', 'views', 'visitors', 'trending_score', 'last_viewed_at',
+    'moderation_priority', 'updated_at',
+})
+
+# بعد هذا العدد من سجلات الفروق يصبح السجل التالي أساسياً، فلا تتجاوز إعادة البناء هذا العدد من السجلات
+REBASE_EVERY = 50
+
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in Property._meta.concrete_fields
+    if field.attname not in SNAPSHOT_EXCLUDED_FIELDS
+)
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)  # Decimal / UUID
+
+
+def property_snapshot(instance):
+    """لقطة العقار من قيم الأعمدة الخام (المفاتيح الأجنبية كمعرفات)"""
+    return {field: _json_value(getattr(instance, field)) for field in SNAPSHOT_FIELDS}
+
+
+def diff_snapshots(before, after):
+    """الحقول المتغيرة فقط: {field: [قبل، بعد]}"""
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in before.keys() | after.keys()
+        if before.get(field) != after.get(field)
+    }
+
+
+def _apply_changes(state, changes):
+    for field, (_, new) in changes.items():
+        state[field] = new
+    return state
+
+
+def _replay(rows):
+    """إعادة بناء الحالة من سجلات مرتبة زمنياً؛ السجلات القديمة قبل أول لقطة أساسية تُتجاهل"""
+    state = None
+    for is_base, base_snapshot, changes in rows:
+        if is_base:
+            state = dict(base_snapshot)
+        if state is not None:
+            _apply_changes(state, changes or {})
+    return state
+
+
+def record_property_audits(entries, action, performed_by=None, notes='', ip_address=None):
+    """
+    تسجيل عملية على مجموعة عقارات: entries = [(العقار بعد التعديل، لقطته قبل التعديل)]
+    استعلام واحد لقراءة التاريخ منذ آخر لقطة أساسية وإدخال واحد (bulk_create)
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+
+    latest_base = (
+        PropertyAuditTrail.objects
+        .filter(property_id=OuterRef('property_id'), is_base=True)
+        .order_by('-timestamp', '-id')
+        .values('timestamp')[:1]
+    )
+    history = {}
+    rows = (
+        PropertyAuditTrail.objects
+        .filter(property_id__in=[instance.pk for instance, _ in entries], timestamp__gte=Subquery(latest_base))
+        .order_by('timestamp', 'id')
+        .values_list('property_id', 'is_base', 'property_data_before', 'changes')
+    )
+    for property_id, *row in rows:
+        history.setdefault(property_id, []).append(row)
+
+    audits = []
+    for instance, before in entries:
+        after = property_snapshot(instance)
+        chain = history.get(instance.pk, [])
+        last_state = _replay(chain)
+        if last_state is None:
+            is_base, base_state = True, before
+        else:
+            # سلسلة طويلة: لقطة أساسية جديدة من آخر حالة مسجلة
+            is_base, base_state = len(chain) >= REBASE_EVERY, last_state
+        audits.append(PropertyAuditTrail(
+            property=instance,
+            action=action,
+            performed_by=performed_by,
+            is_base=is_base,
+            property_data_before=base_state if is_base else {},
+            # أي تعديل لم يُسجل منذ آخر عملية يظهر ضمن فروق هذا السجل
+            changes=diff_snapshots(base_state, after),
+            notes=notes,
+            ip_address=ip_address,
+        ))
+    return PropertyAuditTrail.objects.bulk_create(audits)
+
+
+def record_property_audit(instance, before, action, performed_by=None, notes='', ip_address=None):
+    return record_property_audits([(instance, before)], action, performed_by, notes, ip_address)[0]
+
+
+def reconstruct_property(property_id, at=None):
+    """حالة العقار كما سجلها التدقيق في وقت معين (أو آخر حالة)؛ None إذا لا توجد لقطة أساسية حتى ذلك الوقت"""
+    rows = PropertyAuditTrail.objects.filter(property_id=property_id)
+    if at is not None:
+        rows = rows.filter(timestamp__lte=at)
+    base = rows.filter(is_base=True).order_by('-timestamp', '-id').values_list('timestamp', flat=True).first()
+    if base is None:
+        return None
+    rows = rows.filter(timestamp__gte=base)
+    return _replay(
+        rows.order_by('timestamp', 'id').values_list('is_base', 'property_data_before', 'changes').iterator()
+    )
+
+
+def rebase_audit_trail(before):
+    """
+    قبل أرشفة السجلات الأقدم من before: لكل عقار له سجلات حديثة، أول سجل حديث يصبح أساسياً
+    بلقطة تساوي الحالة بعد آخر سجل مؤرشف (حتى تبقى إعادة البناء ممكنة من الجدول وحده)
+    """
+    hot_ids = PropertyAuditTrail.objects.filter(timestamp__gte=before).values('property_id')
+    history = {}
+    rows = (
+        PropertyAuditTrail.objects
+        .filter(property_id__in=hot_ids, timestamp__lt=before)
+        .order_by('timestamp', 'id')
+        .values_list('property_id', 'is_base', 'property_data_before', 'changes')
+    )
+    for property_id, *row in rows.iterator():
+        history.setdefault(property_id, []).append(row)
+
+    rebased = 0
+    for property_id, cold_rows in history.items():
+        state = _replay(cold_rows)
+        if state is None:
+            continue
+        first_hot = (
+            PropertyAuditTrail.objects
+            .filter(property_id=property_id, timestamp__gte=before)
+            .order_by('timestamp', 'id')
+            .first()
+        )
+        if first_hot.is_base:
+            continue
+        first_hot.is_base = True
+        first_hot.property_data_before = state
+        first_hot.save(update_fields=['is_base', 'property_data_before'])
+        rebased += 1
+    return rebased
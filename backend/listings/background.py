@@ -0,0 +1,42 @@
+"""
+مهام خلفية بعد تأكيد المعاملة
+خيط واحد لكل عملية (ليس daemon: المهام المجدولة تُستكمل عند الإيقاف الطبيعي للـ worker).
+المهام نفسها لا تُحفظ: كل مهمة تترك أثراً دائماً في القاعدة (علم أو غياب صف) يلتقطه أمر
+إدارة من الـ cron إذا ضاعت المهمة (SIGKILL / timeout)
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        # بعد fork لا تنتقل خيوط العملية الأم
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='listings-background')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(fn, args):
+    try:
+        fn(*args)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+    finally:
+        connections.close_all()  # اتصالات هذا الخيط فقط
+
+
+def run_after_commit(fn, *args):
+    """تشغيل fn(*args) في الخيط الخلفي بعد تأكيد المعاملة الحالية (أو فوراً خارج أي معاملة)"""
+    transaction.on_commit(lambda: _get_executor().submit(_run, fn, args))
@@ -0,0 +1,140 @@
+"""
+Batch write buffers
+تجميع عمليات الكتابة المتكررة (مشاهدات، زيارات...) في الذاكرة وكتابتها دفعة واحدة
+عند الوصول لعدد معين من المفاتيح أو بعد مدة زمنية، ومرة أخيرة عند إيقاف الـ worker
+
+الضمان: خيط flusher في كل عملية يكتب أي مخزن مضى على أول عنصر فيه max_age ثانية حتى بدون
+طلبات جديدة، والإيقاف الطبيعي (SIGTERM / انتهاء العملية) يكتب الباقي عبر atexit.
+عند القتل المفاجئ (SIGKILL، timeout الـ worker) يضيع ما لم يُكتب بعد: على الأكثر آخر
+max_age (+ FLUSH_INTERVAL) ثانية من الكتابات لكل worker.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+
+FLUSH_INTERVAL = 1.0  # ثوانٍ بين فحوص خيط الـ flusher
+
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+class BatchBuffer:
+    """
+    مخزن مؤقت آمن بين الـ threads
+
+    - add(key, value): يدمج القيمة مع القيمة الحالية للمفتاح عبر merge(old, new)
+    - flush(): يستبدل المحتوى بقاموس فارغ ثم يستدعي flush_fn(items) خارج القفل
+    - عند فشل flush_fn تُعاد العناصر للمخزن لتُكتب في المرة التالية (بحد أقصى 10 × max_items)
+    """
+
+    def __init__(self, name, flush_fn, merge, max_items=500, max_age=10.0):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.merge = merge
+        self.max_items = max_items
+        self.max_age = max_age
+        self._items = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._started_at = None
+        _buffers.add(self)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._items:
+                self._items[key] = self.merge(self._items[key], value)
+            else:
+                self._items[key] = value
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            full = len(self._items) >= self.max_items
+        # الكتابة حسب العمر لخيط الـ flusher فقط حتى لا يتحمل الطلب زمنها
+        if full:
+            self.flush()
+        else:
+            _ensure_flusher()
+
+    def is_due(self):
+        started_at = self._started_at
+        return started_at is not None and time.monotonic() - started_at >= self.max_age
+
+    def _take(self):
+        with self._lock:
+            items, self._items = self._items, {}
+            self._started_at = None
+        return items
+
+    def flush(self):
+        """كتابة المحتوى الحالي (flush واحد في نفس الوقت لكل مخزن)"""
+        with self._flush_lock:
+            items = self._take()
+            if not items:
+                return 0
+            try:
+                self.flush_fn(items)
+            except Exception:
+                # الفحص وإعادة العناصر تحت نفس القفل حتى لا تتجاوز add() الحد بينهما
+                with self._lock:
+                    drop = len(items) + len(self._items) > self.max_items * 10
+                    if not drop:
+                        for key, value in items.items():
+                            if key in self._items:
+                                self._items[key] = self.merge(value, self._items[key])
+                            else:
+                                self._items[key] = value
+                        if self._started_at is None:
+                            self._started_at = time.monotonic()
+                verb = 'dropping' if drop else 're-queueing'
+                logger.exception('%s buffer: flush failed, %s %s keys', self.name, verb, len(items))
+                return 0
+            return len(items)
+
+
+def flush_all():
+    """كتابة جميع المخازن (عند الإيقاف أو من أوامر الإدارة)"""
+    for buffer in list(_buffers):
+        buffer.flush()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        for buffer in list(_buffers):
+            if not buffer.is_due():
+                continue
+            # اتصال هذا الخيط طويل العمر: إغلاقه إذا تجاوز CONN_MAX_AGE أو انقطع
+            close_old_connections()
+            try:
+                buffer.flush()
+            except Exception:
+                logger.exception('%s buffer: background flush failed', buffer.name)
+
+
+def _ensure_flusher():
+    """تشغيل خيط الـ flusher مرة لكل عملية (بعد fork لا ينتقل الخيط للعملية الابنة)"""
+    global _flusher, _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher_pid == pid and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name='batch-buffer-flusher', daemon=True)
+        _flusher.start()
+        _flusher_pid = pid
+
+
+atexit.register(flush_all)
@@ -0,0 +1,413 @@
+"""
+In-memory columnar snapshot of properties and transactions
+لقطة عمودية (NumPy) للعقارات والصفقات تُحمَّل مرة واحدة لكل worker
+وتُحدَّث تدريجياً حسب updated_at، مع إمكانية مشاركتها بين جميع الـ workers
+عبر ملفات memory-mapped (ANALYTICS_SNAPSHOT_DIR)
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+
+from .models import Property, Transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows (بيئة التطوير)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _micros(value):
+    """تحويل datetime إلى ميكروثانية منذ epoch (int64)"""
+    if value is None:
+        return 0
+    return int(value.timestamp() * 1_000_000)
+
+
+def from_micros(value):
+    """تحويل ميكروثانية منذ epoch إلى datetime واعٍ بالمنطقة (UTC)"""
+    return datetime.fromtimestamp(int(value) / 1_000_000, tz=dt_timezone.utc)
+
+
+class TableSpec:
+    """تعريف جدول عمودي: النموذج، الأعمدة وأنواعها، والأعمدة التصنيفية"""
+
+    def __init__(self, name, model, columns, categories):
+        self.name = name
+        self.model = model
+        # (اسم العمود, حقل قاعدة البيانات, dtype)
+        self.columns = columns
+        # عمود تصنيفي → القيم الأولية للقاموس (تضاف القيم الجديدة تلقائياً)
+        self.categories = categories
+
+    @property
+    def db_fields(self):
+        return [db_field for _, db_field, _ in self.columns]
+
+    def empty(self):
+        return {name: np.empty(0, dtype=dtype) for name, _, dtype in self.columns}
+
+
+PROPERTY_SPEC = TableSpec(
+    'properties',
+    Property,
+    [
+        ('id', 'id', 'U36'),
+        ('price', 'price', 'f8'),
+        ('daily_price', 'daily_price', 'f8'),
+        ('size', 'size', 'f8'),
+        ('rooms', 'rooms', 'i4'),
+        ('area_id', 'area_id', 'i8'),
+        ('usage_type', 'usage_type', 'i2'),
+        ('status', 'status', 'i2'),
+        ('is_deleted', 'is_deleted', '?'),
+        ('views', 'views', 'i8'),
+        ('created_at', 'created_at', 'i8'),
+        ('updated_at', 'updated_at', 'i8'),
+    ],
+    {
+        'usage_type': [''] + [code for code, _ in Property.USAGE_TYPES],
+        'status': [code for code, _ in Property.STATUS_CHOICES],
+    },
+)
+
+TRANSACTION_SPEC = TableSpec(
+    'transactions',
+    Transaction,
+    [
+        ('id', 'id', 'U36'),
+        ('profit', 'profit', 'f8'),
+        ('commission', 'commission', 'f8'),
+        ('rent_price', 'rent_price', 'f8'),
+        ('region', 'region', 'i4'),
+        ('property_type', 'property_type', 'i2'),
+        ('account_type', 'account_type', 'i2'),
+        ('created_at', 'created_at', 'i8'),
+        ('updated_at', 'updated_at', 'i8'),
+    ],
+    {
+        'region': [],
+        'property_type': [code for code, _ in Transaction.PROPERTY_TYPE_CHOICES],
+        'account_type': [code for code, _ in Transaction.ACCOUNT_TYPE_CHOICES],
+    },
+)
+
+SPECS = (PROPERTY_SPEC, TRANSACTION_SPEC)
+
+
+class ColumnTable:
+    """جدول أعمدة NumPy مع فهرس id → رقم الصف وقواميس للأعمدة التصنيفية"""
+
+    def __init__(self, spec, columns=None, vocab=None):
+        self.spec = spec
+        self.columns = columns if columns is not None else spec.empty()
+        self.vocab = vocab if vocab is not None else {
+            column: list(seed) for column, seed in spec.categories.items()
+        }
+        self._codes = {column: {v: i for i, v in enumerate(values)} for column, values in self.vocab.items()}
+        self._index = None
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {key: row for row, key in enumerate(self.columns['id'].tolist())}
+        return self._index
+
+    @property
+    def watermark(self):
+        """أحدث updated_at موجود في اللقطة (ميكروثانية)"""
+        updated = self.columns['updated_at']
+        return int(updated.max()) if len(updated) else 0
+
+    def code(self, column, value):
+        """رقم الترميز لقيمة تصنيفية (-1 إذا لم تكن موجودة)"""
+        return self._codes[column].get(value, -1)
+
+    def label(self, column, code):
+        return self.vocab[column][int(code)]
+
+    def _encode_category(self, column, value):
+        value = value or ''
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(self.vocab[column])
+            self.vocab[column].append(value)
+        return codes[value]
+
+    def encode(self, rows):
+        """تحويل صفوف values_list إلى أعمدة NumPy"""
+        encoded = {}
+        for position, (name, db_field, dtype) in enumerate(self.spec.columns):
+            raw = [row[position] for row in rows]
+            if name in self.vocab:
+                raw = [self._encode_category(name, value) for value in raw]
+            elif dtype == 'i8' and name.endswith('_at'):
+                raw = [_micros(value) for value in raw]
+            elif dtype == 'U36':
+                raw = [str(value) for value in raw]
+            elif dtype == 'f8':
+                raw = [float(value) if value is not None else np.nan for value in raw]
+            else:
+                raw = [value if value is not None else 0 for value in raw]
+            encoded[name] = np.asarray(raw, dtype=dtype)
+        return encoded
+
+    def upsert(self, rows):
+        """تحديث الصفوف الموجودة وإضافة الجديدة (بدون إعادة تحميل الجدول كاملاً)"""
+        if not rows:
+            return 0
+        new = self.encode(rows)
+        index = self.index
+        positions = np.fromiter((index.get(key, -1) for key in new['id'].tolist()), dtype=np.int64, count=len(rows))
+        existing = positions >= 0
+        appended = ~existing
+
+        for name in list(self.columns):
+            column = self.columns[name]
+            if existing.any():
+                if not column.flags.writeable:  # أعمدة memory-mapped للقراءة فقط
+                    column = column.copy()
+                column[positions[existing]] = new[name][existing]
+            if appended.any():
+                column = np.concatenate([column, new[name][appended]])
+            self.columns[name] = column
+
+        if appended.any():
+            start = len(index)
+            for offset, key in enumerate(new['id'][appended].tolist()):
+                index[key] = start + offset
+        return len(rows)
+
+
+class ColumnarSnapshot:
+    """
+    مدير اللقطة العمودية لكل worker
+
+    - refresh(): يتحقق كل check_interval ثانية من صفوف updated_at الأحدث من العلامة المائية
+    - إعادة تحميل كاملة كل full_reload_interval (لالتقاط الحذف الفعلي والمشاهدات)
+    - عند تحديد directory: تُكتب اللقطة كملفات .npy وتقرأها باقي الـ workers بـ mmap
+    """
+
+    def __init__(self, directory=None, check_interval=60, full_reload_interval=600):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.full_reload_interval = full_reload_interval
+        self.tables = {}
+        self._lock = threading.RLock()
+        self._checked_at = 0.0
+        self._full_loaded_at = 0.0
+        self._generation = 0
+
+    def table(self, name):
+        self.refresh()
+        return self.tables[name]
+
+    def properties(self):
+        return self.table(PROPERTY_SPEC.name)
+
+    def transactions(self):
+        return self.table(TRANSACTION_SPEC.name)
+
+    def refresh(self, force=False):
+        with self._lock:
+            now = time.time()
+            if not force and self.tables and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+
+            if not force and self.directory and self._load_shared(now):
+                return
+
+            full = force or not self.tables or now - self._full_loaded_at >= self.full_reload_interval
+            for spec in SPECS:
+                if full or spec.name not in self.tables:
+                    self.tables[spec.name] = self._load_table(spec)
+                else:
+                    self._refresh_table(spec)
+            if full:
+                self._full_loaded_at = now
+
+            if self.directory:
+                self._persist(now)
+
+    def _load_table(self, spec):
+        table = ColumnTable(spec)
+        rows = list(spec.model.objects.order_by().values_list(*spec.db_fields))
+        table.upsert(rows)
+        return table
+
+    def _refresh_table(self, spec):
+        table = self.tables[spec.name]
+        watermark = table.watermark
+        queryset = spec.model.objects.order_by()
+        if watermark:
+            queryset = queryset.filter(updated_at__gte=from_micros(watermark))
+        changed = table.upsert(list(queryset.values_list(*spec.db_fields)))
+
+        # الحذف الفعلي لا يغير updated_at: نتحقق بعدد الصفوف
+        if spec.model.objects.count() != len(table):
+            self.tables[spec.name] = self._load_table(spec)
+        elif changed:
+            logger.debug('columnar snapshot: refreshed %s rows in %s', changed, spec.name)
+
+    # ==================== Shared memory-mapped files ====================
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def _load_shared(self, now):
+        """تحميل لقطة حديثة كتبها worker آخر (بدون أي استعلام لقاعدة البيانات)"""
+        manifest = self._read_manifest()
+        if not manifest or now - manifest['written_at'] >= self.check_interval:
+            return False
+        if manifest['generation'] <= self._generation and self.tables:
+            return True
+
+        base = os.path.join(self.directory, f"gen-{manifest['generation']}")
+        try:
+            tables = {}
+            for spec in SPECS:
+                meta = manifest['tables'][spec.name]
+                columns = {
+                    name: np.load(os.path.join(base, f'{spec.name}.{name}.npy'), mmap_mode='r')
+                    for name, _, _ in spec.columns
+                }
+                tables[spec.name] = ColumnTable(spec, columns=columns, vocab=meta['vocab'])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning('columnar snapshot: failed to load shared generation: %s', e)
+            return False
+
+        self.tables = tables
+        self._generation = manifest['generation']
+        self._full_loaded_at = manifest['full_loaded_at']
+        return True
+
+    def _persist(self, now):
+        os.makedirs(self.directory, exist_ok=True)
+        lock_handle = open(os.path.join(self.directory, '.lock'), 'w')
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return  # worker آخر يكتب الآن
+            generation = max(self._generation, int(now * 1000))
+            base = os.path.join(self.directory, f'gen-{generation}')
+            os.makedirs(base, exist_ok=True)
+            for name, table in self.tables.items():
+                for column, values in table.columns.items():
+                    np.save(os.path.join(base, f'{name}.{column}.npy'), np.ascontiguousarray(values))
+
+            manifest = {
+                'generation': generation,
+                'written_at': now,
+                'full_loaded_at': self._full_loaded_at,
+                'tables': {
+                    name: {'length': len(table), 'vocab': table.vocab}
+                    for name, table in self.tables.items()
+                },
+            }
+            tmp_path = self._manifest_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(manifest, handle, ensure_ascii=False)
+            os.replace(tmp_path, self._manifest_path())
+            self._generation = generation
+            self._cleanup(keep=(generation,))
+        except OSError as e:
+            logger.warning('columnar snapshot: failed to persist: %s', e)
+        finally:
+            lock_handle.close()
+
+    def _cleanup(self, keep):
+        """حذف الأجيال القديمة مع إبقاء السابق مباشرة (قد يكون مفتوحاً لدى worker آخر)"""
+        generations = sorted(
+            int(entry.name[4:]) for entry in os.scandir(self.directory)
+            if entry.is_dir() and entry.name.startswith('gen-')
+        )
+        for generation in generations[:-2]:
+            if generation not in keep:
+                shutil.rmtree(os.path.join(self.directory, f'gen-{generation}'), ignore_errors=True)
+
+
+# ==================== Vectorized operations ====================
+
+def group_by(keys, values=None):
+    """
+    تجميع متجه حسب المفتاح
+    يعيد dict فيه keys و count (و sum و mean إذا تم تمرير values)
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique_keys))
+    result = {'keys': unique_keys, 'count': counts}
+    if values is not None:
+        sums = np.bincount(inverse, weights=values, minlength=len(unique_keys))
+        result['sum'] = sums
+        result['mean'] = sums / np.maximum(counts, 1)
+    return result
+
+
+def group_percentiles(keys, values, percentiles=(10, 50, 90)):
+    """النسب المئوية لكل مجموعة: {key: [p...]} (فرز واحد ثم تقسيم)"""
+    if len(keys) == 0:
+        return {}
+    order = np.lexsort((values, keys))
+    sorted_keys = keys[order]
+    sorted_values = values[order]
+    boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+    result = {}
+    for chunk_keys, chunk in zip(np.split(sorted_keys, boundaries), np.split(sorted_values, boundaries)):
+        result[chunk_keys[0].item()] = np.percentile(chunk, percentiles).tolist()
+    return result
+
+
+def histogram(values, edges):
+    """عدد القيم في كل نطاق [edges[i], edges[i+1])"""
+    counts, _ = np.histogram(values, bins=np.asarray(edges, dtype='f8'))
+    return counts.tolist()
+
+
+def price_per_meter(price, size):
+    """سعر المتر المربع (يتجاهل المساحات الصفرية)"""
+    valid = size > 0
+    return price[valid] / size[valid]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """اللقطة المشتركة للـ worker الحالي (تُنشأ عند أول استخدام)"""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = ColumnarSnapshot(
+                    directory=getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', None) or None,
+                    check_interval=getattr(settings, 'ANALYTICS_SNAPSHOT_CHECK_SECONDS', 60),
+                    full_reload_interval=getattr(settings, 'ANALYTICS_SNAPSHOT_FULL_RELOAD_SECONDS', 600),
+                )
+    return _snapshot
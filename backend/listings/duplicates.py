@@ -0,0 +1,264 @@
+"""
+كشف العقارات المكررة عند الإضافة
+- النص (الاسم + العنوان + الوصف): MinHash على shingles حرفية بعد توحيد الكتابة العربية
+- الصور: pHash (DCT 8x8) لكل صورة
+- البحث عن المرشحين عبر فهرس LSH في PropertySignatureBucket بدلاً من مقارنة كل العقارات
+- الفحص لا يتم داخل الطلب: أي تعديل يحذف البصمة ويُجدول الفحص في خيط خلفي بعد تأكيد المعاملة؛
+  العقار بدون بصمة هو "قيد الانتظار"، فما يضيع (إعادة تشغيل الـ worker) يلتقطه
+  rebuild_duplicate_index --missing من الـ cron
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from functools import partial, reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image
+
+from .background import run_after_commit
+from .models import Property, PropertyDuplicate, PropertySignature, PropertySignatureBucket
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+TEXT_BANDS = 16  # 16 نطاق × 4 صفوف: عتبة LSH التقريبية ≈ 0.5
+TEXT_ROWS = NUM_PERM // TEXT_BANDS
+IMAGE_BAND_OFFSET = 100
+IMAGE_CHUNKS = 4  # 4 × 16 بت: أي صورتين بفرق ≤ 3 بت تشتركان في نطاق واحد على الأقل
+
+_PRIME = np.uint64(4294967291)  # أكبر عدد أولي < 2^32
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+
+_DIACRITICS = re.compile('[\u064B-\u0652\u0640]')
+_NON_WORD = re.compile(r'[^\w]+')
+_ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+
+# ==================== النص ====================
+
+def normalize_text(text):
+    """توحيد الهمزات والتاء المربوطة والأرقام وحذف التشكيل وعلامات الترقيم"""
+    text = _DIACRITICS.sub('', (text or '').lower()).translate(_ARABIC_FOLD)
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def text_minhash(*parts):
+    """MinHash (NUM_PERM قيمة) لـ shingles النص، أو None إذا كان النص فارغاً"""
+    text = normalize_text(' | '.join(part for part in parts if part))
+    if not text:
+        return None
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), 'big') for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+
+def text_similarity(a, b):
+    """تقدير Jaccard من نسبة القيم المتساوية"""
+    if not a or not b:
+        return 0.0
+    return float(np.mean(np.asarray(a, dtype=np.uint64) == np.asarray(b, dtype=np.uint64)))
+
+
+def _text_band_keys(minhash):
+    keys = []
+    for band in range(TEXT_BANDS):
+        rows = np.asarray(minhash[band * TEXT_ROWS:(band + 1) * TEXT_ROWS], dtype=np.uint64)
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+# ==================== الصور ====================
+
+def _dct_matrix(n=32):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+_DCT = _dct_matrix()
+
+
+def image_phash(fileobj):
+    """pHash بطول 64 بت: DCT لصورة رمادية 32x32 ومقارنة الترددات المنخفضة بالوسيط"""
+    with Image.open(fileobj) as image:
+        pixels = np.asarray(image.convert('L').resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def _image_band_keys(phash):
+    return [
+        (IMAGE_BAND_OFFSET + chunk, (phash >> (16 * chunk)) & 0xFFFF)
+        for chunk in range(IMAGE_CHUNKS)
+    ]
+
+
+def property_image_hashes(property_obj):
+    hashes = []
+    for image in property_obj.images.all():
+        if not image.image:
+            continue
+        try:
+            with image.image.open('rb') as fileobj:
+                hashes.append(image_phash(fileobj))
+        except Exception as e:
+            logger.warning("Could not hash image %s: %s", image.pk, e)
+    return hashes
+
+
+# ==================== الفهرس والبحث ====================
+
+def index_property(property_obj):
+    """حساب بصمة العقار وتحديث دلاء LSH الخاصة به"""
+    minhash = text_minhash(property_obj.name, property_obj.address, property_obj.description)
+    image_hashes = property_image_hashes(property_obj)
+
+    keys = _text_band_keys(minhash) if minhash is not None else []
+    for phash in image_hashes:
+        keys.extend(_image_band_keys(phash))
+
+    with transaction.atomic():
+        signature, _ = PropertySignature.objects.update_or_create(
+            property=property_obj,
+            defaults={
+                'text_minhash': [int(v) for v in minhash] if minhash is not None else [],
+                'image_hashes': image_hashes,
+            },
+        )
+        PropertySignatureBucket.objects.filter(property=property_obj).delete()
+        PropertySignatureBucket.objects.bulk_create([
+            PropertySignatureBucket(property=property_obj, band=band, key=key)
+            for band, key in set(keys)
+        ])
+    return signature, keys
+
+
+def find_duplicates(property_obj, signature, keys):
+    """
+    المرشحون = العقارات التي تشترك في دلو واحد على الأقل، ثم التحقق بالتشابه الفعلي
+    يعيد [(عقار مكرر id، تشابه النص، عدد الصور المتطابقة)]
+    """
+    if not keys:
+        return []
+    max_candidates = getattr(settings, 'DUPLICATE_MAX_CANDIDATES', 50)
+    hits = Counter(
+        PropertySignatureBucket.objects.filter(reduce(or_, (Q(band=band, key=key) for band, key in set(keys))))
+        .exclude(property=property_obj)
+        .filter(property__is_deleted=False)
+        .values_list('property_id', flat=True)
+    )
+    candidate_ids = [pk for pk, _ in hits.most_common(max_candidates)]
+    if not candidate_ids:
+        return []
+
+    text_threshold = getattr(settings, 'DUPLICATE_TEXT_THRESHOLD', 0.6)
+    max_distance = getattr(settings, 'DUPLICATE_IMAGE_MAX_DISTANCE', 6)
+    matches = []
+    for candidate in PropertySignature.objects.filter(property_id__in=candidate_ids):
+        similarity = text_similarity(signature.text_minhash, candidate.text_minhash)
+        image_matches = sum(
+            1 for phash in signature.image_hashes
+            if any(hamming(phash, other) <= max_distance for other in candidate.image_hashes)
+        )
+        if similarity >= text_threshold or image_matches:
+            matches.append((candidate.property_id, round(similarity, 3), image_matches))
+    return matches
+
+
+def detect_duplicates(property_obj, reindex=True):
+    """فهرسة العقار وربط التكرارات المحتملة به (تستبدل النتائج السابقة)"""
+    if reindex or not hasattr(property_obj, 'signature'):
+        signature, keys = index_property(property_obj)
+    else:
+        signature = property_obj.signature
+        keys = list(PropertySignatureBucket.objects.filter(property=property_obj).values_list('band', 'key'))
+    matches = find_duplicates(property_obj, signature, keys)
+    with transaction.atomic():
+        PropertyDuplicate.objects.filter(property=property_obj).delete()
+        PropertyDuplicate.objects.bulk_create([
+            PropertyDuplicate(
+                property=property_obj,
+                duplicate_of_id=duplicate_id,
+                text_similarity=similarity,
+                image_matches=image_matches,
+            )
+            for duplicate_id, similarity, image_matches in matches
+        ])
+    return matches
+
+
+# ==================== الجدولة ====================
+
+def invalidate_signature(property_id):
+    """حذف البصمة ودلاءها: المحتوى تغير، والعقار ينتظر إعادة الفحص"""
+    PropertySignatureBucket.objects.filter(property_id=property_id).delete()
+    PropertySignature.objects.filter(property_id=property_id).delete()
+
+
+_scheduled_scans = threading.local()
+
+
+def _submit_scan(property_id, scan):
+    _scheduled_scans.callbacks.pop(property_id, None)
+    if scan:
+        run_after_commit(scan_property, property_id)
+
+
+def schedule_duplicate_scan(property_id):
+    """
+    إبطال البصمة الآن، والفحص في الخيط الخلفي بعد تأكيد المعاملة
+    مرة واحدة لكل عقار في المعاملة: ما دام فحصه معلقاً في on_commit لا تفعل الاستدعاءات التالية
+    (صور متعددة، حفظ العقار ثم صوره) شيئاً؛ التراجع (ولو عن savepoint) يُسقطه مع الإبطال.
+    العقار المحذوف منطقياً لا يُبطل ولا يُفحص (مثل حذف صوره في collect_orphaned_media)
+    """
+    connection = transaction.get_connection()
+    callbacks = getattr(_scheduled_scans, 'callbacks', None)
+    if callbacks is None or not connection.in_atomic_block:
+        callbacks = _scheduled_scans.callbacks = {}
+    pending = callbacks.get(property_id)
+    if pending is not None and any(func is pending for _, func, _ in connection.run_on_commit):
+        return
+    live = Property.objects.filter(pk=property_id, is_deleted=False).exists()
+    if live:
+        invalidate_signature(property_id)
+    callbacks[property_id] = callback = partial(_submit_scan, property_id, live)
+    transaction.on_commit(callback)
+
+
+def scan_property(property_id):
+    """فهرسة عقار بدون بصمة، ورصد تكراراته إذا كان معلقاً (لا شيء إذا فُحص بالفعل)"""
+    property_obj = (
+        Property.objects.filter(pk=property_id, is_deleted=False, signature__isnull=True)
+        .prefetch_related('images')
+        .first()
+    )
+    if property_obj is None:
+        return
+    if property_obj.status == 'pending':
+        detect_duplicates(property_obj)
+    else:
+        index_property(property_obj)
+
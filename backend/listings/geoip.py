@@ -0,0 +1,183 @@
+"""
+Offline IP geolocation
+قاعدة نطاقات IP محلية (CSV بصيغة DB-IP lite: ip_start, ip_end, ..., country, ..., city)
+تُحوَّل مرة واحدة إلى مصفوفات NumPy مرتبة (تُحفظ بجانب الملف وتُقرأ بـ mmap)
+والبحث بـ searchsorted (binary search) لـ IPv4 و bisect لـ IPv6.
+"""
+import bisect
+import csv
+import ipaddress
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = ('', '')
+
+
+def _parse_row(row):
+    """(start, end, country, city) من صف CSV (3 أعمدة = دولة فقط، 6+ = مدينة أيضاً)"""
+    if len(row) >= 6:
+        return row[0], row[1], row[3], row[5]
+    if len(row) >= 3:
+        return row[0], row[1], row[2], ''
+    return None
+
+
+class GeoIPDatabase:
+    """جدول نطاقات IP مرتب مع بحث ثنائي"""
+
+    def __init__(self, starts, ends, locations, labels, v6_starts=(), v6_ends=(), v6_locations=()):
+        self.starts = starts          # uint32 مرتبة
+        self.ends = ends              # uint32
+        self.locations = locations    # int32 → labels
+        self.labels = labels          # [(country, city), ...]
+        self.v6_starts = list(v6_starts)
+        self.v6_ends = list(v6_ends)
+        self.v6_locations = list(v6_locations)
+
+    @classmethod
+    def from_csv(cls, path):
+        labels, label_index = [], {}
+        v4, v6 = [], []
+        with open(path, newline='', encoding='utf-8') as handle:
+            for row in csv.reader(handle):
+                parsed = _parse_row(row)
+                if parsed is None:
+                    continue
+                start, end, country, city = parsed
+                try:
+                    start, end = ipaddress.ip_address(start.strip()), ipaddress.ip_address(end.strip())
+                except ValueError:
+                    continue  # سطر العناوين أو صف تالف
+                label = (country.strip(), city.strip())
+                if label not in label_index:
+                    label_index[label] = len(labels)
+                    labels.append(label)
+                target = v4 if start.version == 4 else v6
+                target.append((int(start), int(end), label_index[label]))
+
+        v4.sort()
+        v6.sort()
+        return cls(
+            np.array([r[0] for r in v4], dtype=np.uint32),
+            np.array([r[1] for r in v4], dtype=np.uint32),
+            np.array([r[2] for r in v4], dtype=np.int32),
+            labels,
+            [r[0] for r in v6], [r[1] for r in v6], [r[2] for r in v6],
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'starts.npy'), self.starts)
+        np.save(os.path.join(directory, 'ends.npy'), self.ends)
+        np.save(os.path.join(directory, 'locations.npy'), self.locations)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as handle:
+            json.dump({
+                'labels': self.labels,
+                # IPv6 كنصوص (أكبر من int64)
+                'v6': [[str(s), str(e), loc] for s, e, loc in zip(self.v6_starts, self.v6_ends, self.v6_locations)],
+            }, handle, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as handle:
+            meta = json.load(handle)
+        v6 = meta['v6']
+        return cls(
+            np.load(os.path.join(directory, 'starts.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'ends.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'locations.npy'), mmap_mode='r'),
+            [tuple(label) for label in meta['labels']],
+            [int(s) for s, _, _ in v6], [int(e) for _, e, _ in v6], [loc for _, _, loc in v6],
+        )
+
+    def _lookup_v6(self, value):
+        i = bisect.bisect_right(self.v6_starts, value) - 1
+        if i >= 0 and value <= self.v6_ends[i]:
+            return self.labels[self.v6_locations[i]]
+        return UNKNOWN
+
+    def lookup(self, ip_address):
+        """(country, city) لعنوان واحد أو ('', '') إذا لم يوجد"""
+        return self.lookup_many([ip_address])[0]
+
+    def lookup_many(self, ip_addresses):
+        """بحث متجه لدفعة عناوين IPv4 (searchsorted واحد) و bisect لـ IPv6"""
+        results = [UNKNOWN] * len(ip_addresses)
+        v4_positions, v4_values = [], []
+        for position, raw in enumerate(ip_addresses):
+            try:
+                address = ipaddress.ip_address(raw)
+            except ValueError:
+                continue
+            if address.version == 6 and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            if address.version == 4:
+                v4_positions.append(position)
+                v4_values.append(int(address))
+            elif self.v6_starts:
+                results[position] = self._lookup_v6(int(address))
+
+        if v4_values and len(self.starts):
+            values = np.array(v4_values, dtype=np.uint32)
+            index = np.searchsorted(self.starts, values, side='right') - 1
+            valid = index >= 0
+            safe_index = np.where(valid, index, 0)
+            valid &= values <= self.ends[safe_index]
+            for position, ok, i in zip(v4_positions, valid.tolist(), safe_index.tolist()):
+                if ok:
+                    results[position] = self.labels[self.locations[i]]
+        return results
+
+
+_database = None
+_database_path = None
+_lock = threading.Lock()
+
+
+def _cache_directory(path):
+    return f'{path}.npycache'
+
+
+def get_database():
+    """قاعدة البيانات المحملة (أو None إذا لم يتم ضبط GEOIP_DATABASE_PATH)"""
+    global _database, _database_path
+    path = getattr(settings, 'GEOIP_DATABASE_PATH', '') or ''
+    if not path or not os.path.exists(path):
+        return None
+    if _database is not None and _database_path == path:
+        return _database
+
+    with _lock:
+        if _database is not None and _database_path == path:
+            return _database
+        cache_dir = _cache_directory(path)
+        meta_path = os.path.join(cache_dir, 'meta.json')
+        try:
+            if os.path.exists(meta_path) and os.path.getmtime(meta_path) >= os.path.getmtime(path):
+                database = GeoIPDatabase.load(cache_dir)
+            else:
+                database = GeoIPDatabase.from_csv(path)
+                try:
+                    database.save(cache_dir)
+                except OSError as e:
+                    logger.warning('geoip: could not write cache %s: %s', cache_dir, e)
+        except (OSError, ValueError) as e:
+            logger.warning('geoip: failed to load %s: %s', path, e)
+            return None
+        _database, _database_path = database, path
+    return _database
+
+
+def lookup_many(ip_addresses):
+    """[(country, city)] لكل عنوان، أو ('', '') عند عدم وجود قاعدة بيانات"""
+    database = get_database()
+    if database is None:
+        return [UNKNOWN] * len(ip_addresses)
+    return database.lookup_many(ip_addresses)
@@ -0,0 +1,132 @@
+"""
+Most-viewed and trending leaderboards
+المشاهدات تُجمَّع في BatchBuffer وتُكتب دفعة واحدة، ومع كل دفعة تُحدَّث درجة الرواج
+(trending_score) لكل عقار في نفس الـ UPDATE بدون إعادة حساب باقي العقارات،
+وتُضاف لعداد الساعة (PropertyViewBucket) ويُفحص الارتفاع المفاجئ.
+
+درجة الرواج محفوظة في الفضاء اللوغاريتمي:
+    score = log( Σ views_i · e^(λ·t_i) )     حيث t بالساعات و λ = ln2 / half_life
+إضافة مشاهدات جديدة = logaddexp(score, log(n) + λ·t)، والترتيب حسب score
+يساوي الترتيب حسب المشاهدات المتناقصة زمنياً (نصف العمر TRENDING_HALF_LIFE_HOURS).
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .buffers import BatchBuffer
+from .models import Property
+from .view_stats import detect_view_spikes, record_view_buckets
+
+LEADERBOARD_CACHE_KEYS = {
+    'views': 'listings:leaderboard:views',
+    'trending': 'listings:leaderboard:trending',
+}
+# يُخزَّن أكبر k مرة واحدة وتُقتطع منه الطلبات الأصغر
+MAX_LEADERBOARD_SIZE = 50
+
+
+def _decay_rate():
+    return math.log(2) / getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+
+
+def trending_term(views, when=None):
+    """الحد اللوغاريتمي لعدد مشاهدات في لحظة معينة"""
+    when = when or timezone.now()
+    hours = when.timestamp() / 3600
+    return math.log(views) + _decay_rate() * hours
+
+
+def add_trending(score, views, when=None):
+    """دمج مشاهدات جديدة مع الدرجة الحالية (logaddexp بدون overflow)"""
+    term = trending_term(views, when)
+    if score is None:
+        return term
+    high, low = max(score, term), min(score, term)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _merge_views(old, new):
+    views, ips = old
+    for ip, count in new[1].items():
+        ips[ip] = ips.get(ip, 0) + count
+    return views + new[0], ips
+
+
+def flush_views(items):
+    """كتابة دفعة المشاهدات: SELECT واحد ثم UPDATE واحد لكل عقار"""
+    now = timezone.now()
+    with transaction.atomic():
+        current = list(Property.objects.select_for_update().filter(pk__in=list(items)).values_list(
+            'pk', 'visited_ips', 'trending_score'
+        ))
+        for pk, visited_ips, score in current:
+            views, ips = items[pk]
+            visited_ips = dict(visited_ips or {})
+            new_visitors = 0
+            for ip, count in ips.items():
+                if ip not in visited_ips:
+                    new_visitors += 1
+                    visited_ips[ip] = 0
+                visited_ips[ip] += count
+            Property.objects.filter(pk=pk).update(
+                views=F('views') + views,
+                visitors=F('visitors') + new_visitors,
+                visited_ips=visited_ips,
+                trending_score=add_trending(score, views, now),
+                last_viewed_at=now,
+            )
+
+        # العقارات المحذوفة فعلياً قبل الكتابة تُتجاهل
+        views_by_property = {pk: items[pk][0] for pk, _, _ in current}
+        record_view_buckets(views_by_property, now)
+        detect_view_spikes(list(views_by_property), now)
+    transaction.on_commit(invalidate_leaderboards)
+
+
+view_buffer = BatchBuffer(
+    'property-views',
+    flush_views,
+    _merge_views,
+    max_items=getattr(settings, 'VIEW_BUFFER_MAX_ITEMS', 500),
+    max_age=getattr(settings, 'VIEW_BUFFER_MAX_AGE_SECONDS', 10),
+)
+
+
+def record_property_view(property_id, ip_address):
+    """تسجيل مشاهدة في المخزن المؤقت (تُكتب لاحقاً مع باقي الدفعة)"""
+    view_buffer.add(property_id, (1, {ip_address: 1} if ip_address else {}))
+
+
+def invalidate_leaderboards():
+    cache.delete_many(list(LEADERBOARD_CACHE_KEYS.values()))
+
+
+def _leaderboard_ids(kind):
+    def load():
+        queryset = Property.objects.filter(status='approved', is_deleted=False)
+        if kind == 'trending':
+            queryset = queryset.filter(trending_score__isnull=False).order_by('-trending_score')
+        else:
+            queryset = queryset.order_by('-views', '-created_at')
+        return list(queryset.values_list('pk', flat=True)[:MAX_LEADERBOARD_SIZE])
+
+    timeout = getattr(settings, 'LEADERBOARD_CACHE_SECONDS', 60)
+    return cache.get_or_set(LEADERBOARD_CACHE_KEYS[kind], load, timeout)
+
+
+def get_leaderboard(kind='views', limit=10, queryset=None):
+    """
+    أعلى k عقار حسب المشاهدات (views) أو الرواج (trending) بنفس الترتيب
+    القائمة (ids فقط) من الكاش، ثم استعلام واحد لجلب العقارات
+    """
+    if kind not in LEADERBOARD_CACHE_KEYS:
+        raise ValueError(f'نوع غير مدعوم: {kind}')
+    ids = _leaderboard_ids(kind)[:max(1, min(limit, MAX_LEADERBOARD_SIZE))]
+    if queryset is None:
+        queryset = Property.objects.filter(status='approved', is_deleted=False).select_related('area').prefetch_related('images')
+    properties = queryset.annotate(images_count=Count('images')).in_bulk(ids)
+    return [properties[pk] for pk in ids if pk in properties]
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from listings.archive import ARCHIVE_MODELS, archive_dir, archive_rows
+
+
+class Command(BaseCommand):
+    help = "Move ActivityLog / PropertyAuditTrail rows older than N days into monthly gzip NDJSON archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'AUDIT_ARCHIVE_AFTER_DAYS', 180),
+            help='Archive rows older than this many days',
+        )
+        parser.add_argument('--kind', choices=[*ARCHIVE_MODELS, 'all'], default='all')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        kinds = list(ARCHIVE_MODELS) if options['kind'] == 'all' else [options['kind']]
+        self.stdout.write(f"Archiving rows older than {before:%Y-%m-%d %H:%M} into {archive_dir()}")
+
+        for kind in kinds:
+            counts = archive_rows(kind, before, batch_size=options['batch_size'], dry_run=options['dry_run'])
+            for month, count in sorted(counts.items()):
+                self.stdout.write(f"  {kind} {month}: {count}")
+            verb = 'Would archive' if options['dry_run'] else 'Archived'
+            self.stdout.write(self.style.SUCCESS(f"{verb} {sum(counts.values())} {kind} rows"))
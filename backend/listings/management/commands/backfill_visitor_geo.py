@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from listings.geoip import get_database
+from listings.models import Visitor
+
+
+class Command(BaseCommand):
+    help = "Fill Visitor.country / Visitor.city from the local GeoIP database (GEOIP_DATABASE_PATH)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--all', action='store_true', help='Re-resolve rows that already have a country')
+
+    def handle(self, *args, **options):
+        database = get_database()
+        if database is None:
+            self.stdout.write(self.style.ERROR("GEOIP_DATABASE_PATH is not set or the file does not exist."))
+            return
+
+        visitors = Visitor.objects.only('id', 'ip_address', 'country', 'city').order_by('id')
+        if not options['all']:
+            visitors = visitors.filter(country='')
+
+        batch_size = options['batch_size']
+        batch, updated = [], 0
+
+        def flush(batch):
+            changed = []
+            for visitor, (country, city) in zip(batch, database.lookup_many([v.ip_address for v in batch])):
+                if country and (country, city) != (visitor.country, visitor.city):
+                    visitor.country, visitor.city = country, city
+                    changed.append(visitor)
+            Visitor.objects.bulk_update(changed, ['country', 'city'])
+            return len(changed)
+
+        for visitor in visitors.iterator(chunk_size=batch_size):
+            batch.append(visitor)
+            if len(batch) >= batch_size:
+                updated += flush(batch)
+                batch = []
+        if batch:
+            updated += flush(batch)
+        self.stdout.write(self.style.SUCCESS(f"Updated location for {updated} visitors"))
@@ -0,0 +1,53 @@
+import pickle
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from backend_project.throttling import GCRAAnonRateThrottle
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's history-list AnonRateThrottle with the GCRA throttle: time per check and cached state size"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Checks per throttle')
+        parser.add_argument('--clients', type=int, default=10, help='Distinct client IPs')
+        parser.add_argument('--rate', default='1000/minute', help='Throttle rate for both classes')
+        parser.add_argument('--cache', default='default', help='Cache alias to store throttle state in')
+
+    def handle(self, *args, **options):
+        cache = caches[options['cache']]
+        factory = APIRequestFactory()
+        requests = [
+            Request(factory.get('/', REMOTE_ADDR=f'10.0.{i // 256}.{i % 256}'))
+            for i in range(options['clients'])
+        ]
+        self.stdout.write(
+            f"{options['requests']} checks, {options['clients']} clients, rate {options['rate']}, "
+            f"cache '{options['cache']}' ({type(getattr(cache, 'shared', cache)).__name__})"
+        )
+
+        for label, base in (('drf-history', AnonRateThrottle), ('gcra', GCRAAnonRateThrottle)):
+            throttle_class = type(f'Bench{base.__name__}', (base,), {
+                'rate': options['rate'], 'scope': f'bench-{label}', 'cache': cache,
+            })
+            keys = set()
+            allowed = 0
+            started = time.perf_counter()
+            for i in range(options['requests']):
+                throttle = throttle_class()
+                if throttle.allow_request(requests[i % len(requests)], None):
+                    allowed += 1
+                keys.add(throttle.key)
+            elapsed = time.perf_counter() - started
+
+            state_bytes = max(len(pickle.dumps(cache.get(key))) for key in keys)
+            cache.delete_many(list(keys))
+            self.stdout.write(
+                f"  {label:12} {elapsed / options['requests'] * 1e6:8.1f} µs/check  "
+                f"allowed {allowed:6}  state {state_bytes:7} bytes/key"
+            )
@@ -0,0 +1,162 @@
+import heapq
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from listings.models import PropertyImage, PropertyVideo
+
+# (model, file field) for every upload directory the collector reconciles
+MEDIA_FIELDS = (
+    (PropertyImage, 'image'),
+    (PropertyVideo, 'video'),
+)
+LOOKUP_CHUNK = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files under the property media directories that no PropertyImage/PropertyVideo row references, "
+        "optionally purging media of properties soft-deleted more than N days ago"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting')
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Check at most this many files per directory, resuming after the saved checkpoint (0 = all)',
+        )
+        parser.add_argument(
+            '--min-age-hours', type=float, default=24,
+            help='Skip files modified more recently than this (uploads whose row is not committed yet)',
+        )
+        parser.add_argument(
+            '--purge-deleted-days', type=int, default=None,
+            help='Also delete media rows and files of properties soft-deleted more than this many days ago',
+        )
+        parser.add_argument(
+            '--checkpoint', default=getattr(settings, 'MEDIA_GC_CHECKPOINT_PATH', ''),
+            help='JSON file that stores the last checked file name per directory',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        total_files = total_bytes = 0
+
+        if options['purge_deleted_days'] is not None:
+            files, size = self.purge_deleted(options['purge_deleted_days'], dry_run)
+            self.stdout.write(f"Media of deleted properties: {files} files, {_format_bytes(size)}")
+            total_files += files
+            total_bytes += size
+
+        checkpoint = self.load_checkpoint(options['checkpoint'])
+        min_mtime = time.time() - options['min_age_hours'] * 3600
+        for model, field_name in MEDIA_FIELDS:
+            upload_to = model._meta.get_field(field_name).upload_to.strip('/')
+            directory = Path(settings.MEDIA_ROOT) / upload_to
+            if not directory.is_dir():
+                continue
+            files, size, last_name = self.collect_directory(
+                directory, upload_to, model, field_name,
+                after=checkpoint.get(upload_to, ''),
+                limit=options['limit'],
+                min_mtime=min_mtime,
+                dry_run=dry_run,
+            )
+            checkpoint[upload_to] = last_name
+            self.stdout.write(f"{upload_to}: {files} orphaned files, {_format_bytes(size)}")
+            total_files += files
+            total_bytes += size
+
+        if options['limit'] and not dry_run:
+            self.save_checkpoint(options['checkpoint'], checkpoint)
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {_format_bytes(total_bytes)} from {total_files} files"))
+
+    def collect_directory(self, directory, upload_to, model, field_name, after, limit, min_mtime, dry_run):
+        """
+        Stream the directory with os.scandir; with --limit only the next `limit` names after the
+        checkpoint (lexical order, kept in a bounded heap) are checked. Returns (files, bytes, new checkpoint).
+        """
+        with os.scandir(directory) as entries:
+            names = (entry.name for entry in entries if entry.is_file(follow_symlinks=False) and entry.name > after)
+            candidates = heapq.nsmallest(limit, names) if limit else list(names)
+        # fewer than `limit` names left means the directory is done: start over next run
+        new_checkpoint = candidates[-1] if limit and len(candidates) == limit else ''
+
+        files = size = 0
+        for start in range(0, len(candidates), LOOKUP_CHUNK):
+            chunk = candidates[start:start + LOOKUP_CHUNK]
+            paths = {f'{upload_to}/{name}': name for name in chunk}
+            referenced = set(
+                model.objects.filter(**{f'{field_name}__in': list(paths)}).values_list(field_name, flat=True)
+            )
+            for path, name in paths.items():
+                if path in referenced:
+                    continue
+                file_path = directory / name
+                try:
+                    stat = file_path.stat()
+                    if stat.st_mtime > min_mtime:
+                        continue
+                    if not dry_run:
+                        file_path.unlink()
+                except FileNotFoundError:
+                    continue
+                files += 1
+                size += stat.st_size
+        return files, size, new_checkpoint
+
+    def purge_deleted(self, days, dry_run):
+        """Delete image/video rows and files of properties soft-deleted before the cutoff"""
+        cutoff = timezone.now() - timedelta(days=days)
+        files = size = 0
+        for model, field_name in MEDIA_FIELDS:
+            rows = model.objects.filter(property__is_deleted=True, property__deleted_at__lt=cutoff)
+            purged_ids = []
+            for pk, name in rows.values_list('pk', field_name).iterator(chunk_size=LOOKUP_CHUNK):
+                purged_ids.append(pk)
+                if not name:
+                    continue
+                file_path = Path(settings.MEDIA_ROOT) / name
+                try:
+                    file_size = file_path.stat().st_size
+                    if not dry_run:
+                        file_path.unlink()
+                except FileNotFoundError:
+                    continue
+                files += 1
+                size += file_size
+            if not dry_run:
+                for start in range(0, len(purged_ids), LOOKUP_CHUNK):
+                    model.objects.filter(pk__in=purged_ids[start:start + LOOKUP_CHUNK]).delete()
+        return files, size
+
+    def load_checkpoint(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, path, checkpoint):
+        if not path:
+            return
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(checkpoint, fh)
+        os.replace(tmp, path)
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.notification_policy import prune_notifications
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications older than N days and cap unread notifications per recipient"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--read-days', type=int, default=getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', 30),
+            help='Delete read notifications older than this many days',
+        )
+        parser.add_argument(
+            '--unread-cap', type=int, default=getattr(settings, 'NOTIFICATION_UNREAD_CAP', 200),
+            help='Keep at most this many unread notifications per recipient (newest first)',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['read_days'] < 0 or options['unread_cap'] < 0:
+            raise CommandError('--read-days and --unread-cap must be non-negative')
+        read_deleted, unread_deleted = prune_notifications(
+            read_days=options['read_days'],
+            unread_cap=options['unread_cap'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {read_deleted} read notifications and {unread_deleted} unread over the cap"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from listings.models import Visitor
+from listings.user_agents import classify_user_agent
+
+
+class Command(BaseCommand):
+    help = "Delete Visitor rows recorded from crawler/bot user agents and re-detect device types"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        bot_ids, changed = [], []
+        for visitor in Visitor.objects.only('id', 'user_agent', 'device_type').iterator(chunk_size=2000):
+            agent = classify_user_agent(visitor.user_agent)
+            if agent.is_bot:
+                bot_ids.append(visitor.id)
+            elif agent.device_type != visitor.device_type:
+                visitor.device_type = agent.device_type
+                changed.append(visitor)
+
+        if not options['dry_run']:
+            Visitor.objects.filter(id__in=bot_ids).delete()
+            Visitor.objects.bulk_update(changed, ['device_type'], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f"Bots removed: {len(bot_ids)}, device types corrected: {len(changed)}"
+            + (" (dry run)" if options['dry_run'] else "")
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from listings.duplicates import detect_duplicates, index_property, scan_property
+from listings.models import Property
+
+
+class Command(BaseCommand):
+    help = "Rebuild text/image signatures and the LSH index, then re-detect duplicates for pending listings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-index', action='store_true', help='Only re-run detection for pending listings')
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only scan listings without a signature (scans lost by a worker restart); run from cron',
+        )
+
+    def handle(self, *args, **options):
+        properties = Property.objects.filter(is_deleted=False).prefetch_related('images').order_by('created_at')
+
+        if options['missing']:
+            scanned = 0
+            missing = Property.objects.filter(is_deleted=False, signature__isnull=True).order_by('created_at')
+            for property_id in missing.values_list('pk', flat=True).iterator():
+                scan_property(property_id)
+                scanned += 1
+            self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} listings without a signature"))
+            return
+
+        if not options['skip_index']:
+            indexed = 0
+            for property_obj in properties.iterator(chunk_size=200):
+                index_property(property_obj)
+                indexed += 1
+            self.stdout.write(f"Indexed {indexed} properties")
+
+        flagged = 0
+        pending = properties.filter(status='pending').select_related('signature')
+        for property_obj in pending.iterator(chunk_size=200):
+            if detect_duplicates(property_obj, reindex=False):
+                flagged += 1
+        self.stdout.write(self.style.SUCCESS(f"Pending listings with possible duplicates: {flagged}"))
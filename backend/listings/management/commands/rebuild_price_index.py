@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from listings.columnar import get_snapshot
+from listings.price_index import rebuild_price_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-area price index (median, p10/p90, price per m²)"
+
+    def handle(self, *args, **options):
+        get_snapshot().refresh(force=True)
+        count = rebuild_price_index()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt price index: {count} rows"))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.moderation import send_pending_moderation_emails
+
+
+class Command(BaseCommand):
+    help = "Send approval/rejection emails still pending from bulk moderation (SMTP failures, restarted workers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-minutes', type=int, default=getattr(settings, 'MODERATION_EMAIL_RETRY_AFTER_MINUTES', 10),
+            help='Only emails pending for at least this long (newer ones are still being sent by the worker)',
+        )
+
+    def handle(self, *args, **options):
+        if options['min_age_minutes'] < 0:
+            raise CommandError('--min-age-minutes must be non-negative')
+        done, failed = send_pending_moderation_emails(older_than=timedelta(minutes=options['min_age_minutes']))
+        self.stdout.write(self.style.SUCCESS(f"Sent emails for {done} properties, {failed} still pending"))
@@ -0,0 +1,34 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0064_property_booking_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaPriceIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usage_type', models.CharField(max_length=20, verbose_name='نوع الاستخدام')),
+                ('pricing', models.CharField(choices=[('monthly', 'شهري'), ('daily', 'يومي')], default='monthly', max_length=10, verbose_name='نوع التسعير')),
+                ('sample_size', models.PositiveIntegerField(default=0, verbose_name='عدد العقارات')),
+                ('p10_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='السعر (p10)')),
+                ('median_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='السعر الوسيط')),
+                ('p90_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='السعر (p90)')),
+                ('median_price_per_meter', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='وسيط سعر المتر')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الحساب')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_index', to='listings.area', verbose_name='المنطقة')),
+            ],
+            options={
+                'verbose_name': 'مؤشر أسعار منطقة',
+                'verbose_name_plural': 'مؤشرات أسعار المناطق',
+                'ordering': ['area__name', 'usage_type'],
+                'constraints': [models.UniqueConstraint(fields=('area', 'usage_type'), name='unique_area_price_index')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0065_areapriceindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='trending_score',
+            field=models.FloatField(blank=True, null=True, verbose_name='درجة الرواج'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='last_viewed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر مشاهدة'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_deleted', '-views'], name='property_top_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_deleted', '-trending_score'], name='property_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0066_property_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='الساعة')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='المشاهدات')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='listings.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'مشاهدات الساعة',
+                'verbose_name_plural': 'مشاهدات العقارات بالساعة',
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('property', 'hour'), name='unique_property_view_bucket')],
+            },
+        ),
+    ]
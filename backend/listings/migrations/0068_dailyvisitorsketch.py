@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0067_propertyviewbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('device_type', models.CharField(choices=[('mobile', 'هاتف'), ('tablet', 'تابلت'), ('desktop', 'كمبيوتر'), ('unknown', 'غير معروف')], default='unknown', max_length=20, verbose_name='نوع الجهاز')),
+                ('registers', models.BinaryField(verbose_name='سجلات HLL')),
+                ('visits', models.PositiveIntegerField(default=0, verbose_name='عدد الزيارات')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'ملخص زوار يومي',
+                'verbose_name_plural': 'ملخصات الزوار اليومية',
+                'ordering': ['-day', 'device_type'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'device_type'), name='unique_daily_visitor_sketch')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+# نسخة مجمدة من listings.moderation.compute_moderation_priority وقت كتابة الـ migration
+VERIFIED_BONUS_HOURS = 24
+MAX_RESUBMISSION_BONUSES = 3
+RESUBMISSION_BONUS_HOURS = 12
+
+
+def _priority(submitted_at, owner_verified, resubmissions):
+    hours = -submitted_at.timestamp() / 3600
+    if owner_verified:
+        hours += VERIFIED_BONUS_HOURS
+    return hours + min(resubmissions, MAX_RESUBMISSION_BONUSES) * RESUBMISSION_BONUS_HOURS
+
+
+def backfill_moderation_priority(apps, schema_editor):
+    Property = apps.get_model('listings', 'Property')
+    pending = Property.objects.filter(status='pending', is_deleted=False).select_related('owner')
+    for property_obj in pending.iterator():
+        property_obj.moderation_priority = _priority(
+            property_obj.submitted_at or property_obj.created_at,
+            bool(property_obj.owner and property_obj.owner.is_verified),
+            property_obj.resubmission_count,
+        )
+        property_obj.save(update_fields=['moderation_priority'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0068_dailyvisitorsketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='resubmission_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد مرات إعادة الإرسال'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='moderation_priority',
+            field=models.FloatField(blank=True, null=True, verbose_name='أولوية المراجعة'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_deleted', '-moderation_priority', '-id'], name='property_moderation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_deleted', 'submitted_at', 'id'], name='property_submitted_idx'),
+        ),
+        migrations.RunPython(backfill_moderation_priority, migrations.RunPython.noop),
+    ]
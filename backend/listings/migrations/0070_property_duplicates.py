@@ -0,0 +1,57 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0069_property_moderation_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_minhash', models.JSONField(default=list, verbose_name='MinHash النص')),
+                ('image_hashes', models.JSONField(default=list, verbose_name='pHash الصور')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ الحساب')),
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='listings.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'بصمة عقار',
+                'verbose_name_plural': 'بصمات العقارات',
+            },
+        ),
+        migrations.CreateModel(
+            name='PropertySignatureBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='النطاق')),
+                ('key', models.BigIntegerField(verbose_name='قيمة النطاق')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_buckets', to='listings.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'دلو LSH',
+                'verbose_name_plural': 'دلاء LSH',
+                'indexes': [models.Index(fields=['band', 'key'], name='signature_bucket_lookup_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PropertyDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_similarity', models.FloatField(default=0, verbose_name='تشابه النص')),
+                ('image_matches', models.PositiveSmallIntegerField(default=0, verbose_name='صور متطابقة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الرصد')),
+                ('duplicate_of', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='listings.property', verbose_name='مكرر من')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='listings.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'تكرار محتمل',
+                'verbose_name_plural': 'تكرارات محتملة',
+                'ordering': ['-text_similarity', '-image_matches'],
+                'constraints': [models.UniqueConstraint(fields=['property', 'duplicate_of'], name='unique_property_duplicate')],
+            },
+        ),
+    ]
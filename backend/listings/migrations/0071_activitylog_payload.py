@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0070_property_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, verbose_name='البيانات'),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=120, verbose_name='مفتاح منع التكرار'),
+        ),
+        migrations.AddConstraint(
+            model_name='activitylog',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedupe_key', ''), _negated=True), fields=('dedupe_key',), name='unique_activity_dedupe_key'),
+        ),
+    ]
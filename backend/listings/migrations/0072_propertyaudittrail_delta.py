@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0071_activitylog_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyaudittrail',
+            name='is_base',
+            field=models.BooleanField(default=False, verbose_name='لقطة أساسية'),
+        ),
+        migrations.AddField(
+            model_name='propertyaudittrail',
+            name='changes',
+            field=models.JSONField(blank=True, default=dict, verbose_name='الحقول المتغيرة'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0073_notification_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action',
+            field=models.CharField(choices=[('create_property', 'إضافة عقار جديد'), ('delete_property', 'حذف عقار'), ('restore_property', 'استرجاع عقار'), ('update_property', 'تعديل عقار'), ('create_user', 'إنشاء حساب جديد'), ('approve_property', 'الموافقة على عقار'), ('reject_property', 'رفض عقار')], max_length=50, verbose_name='نوع النشاط'),
+        ),
+    ]
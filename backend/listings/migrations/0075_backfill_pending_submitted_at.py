@@ -0,0 +1,19 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_submitted_at(apps, schema_editor):
+    # العقارات المعلقة بدون submitted_at تختفي من ترتيب oldest/newest (keyset على عمود NULL)
+    Property = apps.get_model('listings', 'Property')
+    Property.objects.filter(status='pending', submitted_at__isnull=True).update(submitted_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0074_activitylog_restore_action'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_submitted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0075_backfill_pending_submitted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='moderation_email_pending',
+            field=models.BooleanField(default=False, verbose_name='بريد المراجعة لم يُرسل'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(
+                condition=models.Q(('moderation_email_pending', True)),
+                fields=['updated_at'],
+                name='property_email_pending_idx',
+            ),
+        ),
+    ]
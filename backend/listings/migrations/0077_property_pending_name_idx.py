@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+# LIKE 'prefix%' على PostgreSQL لا يستخدم فهرس btree عادياً إلا مع text_pattern_ops (أو ترتيب C)
+CREATE_SQL = {
+    'postgresql': (
+        "CREATE INDEX property_pending_name_idx ON listings_property (LOWER(name) text_pattern_ops) "
+        "WHERE status = 'pending' AND NOT is_deleted"
+    ),
+}
+DEFAULT_CREATE_SQL = (
+    "CREATE INDEX property_pending_name_idx ON listings_property (LOWER(name)) "
+    "WHERE status = 'pending' AND NOT is_deleted"
+)
+
+
+def create_index(apps, schema_editor):
+    schema_editor.execute(CREATE_SQL.get(schema_editor.connection.vendor, DEFAULT_CREATE_SQL))
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS property_pending_name_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0076_property_moderation_email_pending'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='property',
+                    index=models.Index(
+                        Lower('name'),
+                        condition=models.Q(('is_deleted', False), ('status', 'pending')),
+                        name='property_pending_name_idx',
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_index, drop_index),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import MinLengthValidator, MaxLengthValidator, RegexValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
@@ -137,15 +138,20 @@ class Property(models.Model):
     views = models.IntegerField(default=0, verbose_name='عدد المشاهدات')
     visitors = models.IntegerField(default=0, verbose_name='عدد الزيارات الفريدة')
     visited_ips = models.JSONField(default=dict, blank=True, verbose_name='عناوين IP التي زارت العقار')
+    trending_score = models.FloatField(null=True, blank=True, verbose_name='درجة الرواج')  # لوغاريتم المشاهدات المتناقصة زمنياً
+    last_viewed_at = models.DateTimeField(null=True, blank=True, verbose_name='آخر مشاهدة')
     
     # ==================== Status & Approval Workflow ====================
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='الحالة')
     owner = models.ForeignKey('users.UserProfile', on_delete=models.CASCADE, null=True, blank=True, related_name='properties', verbose_name='المالك')
     submitted_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ الإرسال')
+    resubmission_count = models.PositiveIntegerField(default=0, verbose_name='عدد مرات إعادة الإرسال')
+    moderation_priority = models.FloatField(null=True, blank=True, verbose_name='أولوية المراجعة')  # الأعلى يُراجع أولاً (listings.moderation)
     approved_by = models.ForeignKey('users.UserProfile', on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_properties', verbose_name='موافق عليه من')
     approved_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ الموافقة')
     rejected_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ الرفض')
     approval_notes = models.TextField(blank=True, verbose_name='ملاحظات الموافقة')
+    moderation_email_pending = models.BooleanField(default=False, verbose_name='بريد المراجعة لم يُرسل')  # outbox: listings.moderation
         # ==================== Booking Status ====================
     is_booked = models.BooleanField(default=False, verbose_name='محجوز')
     booked_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ الحجز')
@@ -160,6 +166,25 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'is_deleted', '-views'], name='property_top_views_idx'),
+            models.Index(fields=['status', 'is_deleted', '-trending_score'], name='property_trending_idx'),
+            models.Index(fields=['status', 'is_deleted', '-moderation_priority', '-id'], name='property_moderation_idx'),
+            models.Index(fields=['status', 'is_deleted', 'submitted_at', 'id'], name='property_submitted_idx'),
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(moderation_email_pending=True),
+                name='property_email_pending_idx',
+            ),
+            # بحث قائمة المراجعة بأول الاسم (على PostgreSQL بـ text_pattern_ops، انظر الهجرة 0077)
+            models.Index(
+                Lower('name'),
+                condition=models.Q(status='pending', is_deleted=False),
+                name='property_pending_name_idx',
+            ),
+        ]
+
     def is_daily_pricing_category(self):
         """التحقق إذا كانت الفئة تستخدم سعر يومي"""
         return self.usage_type in ['vacation', 'daily']
@@ -176,32 +201,14 @@ class Property(models.Model):
             return 'يوم'
         return 'شهر'
 
-    def record_view(self, ip_address):
-        """تسجيل مشاهدة جديدة للعقار (بشكل atomic)"""
-        from django.db.models import F
-        
-        # تحديث atomic لعداد المشاهدات
-        Property.objects.filter(pk=self.pk).update(views=F('views') + 1)
-        
-        # تتبع عناوين IP الفريدة للعقار
-        if not self.visited_ips:
-            self.visited_ips = {}
-        
-        # إذا كان هذا IP جديداً، زد عداد الزيارات الفريدة
-        if ip_address not in self.visited_ips:
-            self.visited_ips[ip_address] = 1
-            Property.objects.filter(pk=self.pk).update(
-                visitors=F('visitors') + 1,
-                visited_ips=self.visited_ips
-            )
-        else:
-            self.visited_ips[ip_address] += 1
-            Property.objects.filter(pk=self.pk).update(
-                visited_ips=self.visited_ips
-            )
-        
-        # Refresh from DB
-        self.refresh_from_db()
+    def record_view(self, ip_address, user_agent=None):
+        """تسجيل مشاهدة جديدة للعقار (تُجمَّع في الذاكرة وتُكتب دفعة واحدة) - البوتات لا تُحسب"""
+        from .leaderboard import record_property_view
+        from .user_agents import is_bot
+        if user_agent is not None and is_bot(user_agent):
+            return False
+        record_property_view(self.pk, ip_address)
+        return True
 
     def __str__(self):
         return self.name
@@ -298,6 +305,7 @@ class ActivityLog(models.Model):
     ACTION_CHOICES = [
         ('create_property', 'إضافة عقار جديد'),
         ('delete_property', 'حذف عقار'),
+        ('restore_property', 'استرجاع عقار'),
         ('update_property', 'تعديل عقار'),
         ('create_user', 'إنشاء حساب جديد'),
         ('approve_property', 'الموافقة على عقار'),
@@ -338,6 +346,16 @@ class ActivityLog(models.Model):
     description = models.TextField(
         verbose_name='الوصف',
         blank=True
+    )  # السجلات القديمة فقط؛ الجديدة تُعرض من payload (listings.activity)
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='البيانات'
+    )
+    dedupe_key = models.CharField(
+        max_length=120,
+        blank=True,
+        verbose_name='مفتاح منع التكرار'
     )
     ip_address = models.GenericIPAddressField(
         null=True,
@@ -358,6 +376,13 @@ class ActivityLog(models.Model):
             models.Index(fields=['user', '-timestamp']),
             models.Index(fields=['action', '-timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=~models.Q(dedupe_key=''),
+                name='unique_activity_dedupe_key',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_action_display()} - {self.user} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -415,6 +440,19 @@ class PropertyAuditTrail(models.Model):
         verbose_name='بيانات العقار بعد العملية'
     )
     
+    # أول سجل للعقار يحمل اللقطة الكاملة في property_data_before، وما بعده فروق فقط (listings.audit)
+    is_base = models.BooleanField(
+        default=False,
+        verbose_name='لقطة أساسية'
+    )
+    
+    # الحقول المتغيرة في هذه العملية {field: [قبل، بعد]}
+    changes = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='الحقول المتغيرة'
+    )
+    
     # الملاحظات أو السبب
     notes = models.TextField(
         blank=True,
@@ -488,44 +526,14 @@ class Visitor(models.Model):
     @staticmethod
     def detect_device_type(user_agent=''):
         """كشف نوع الجهاز من user_agent"""
-        user_agent_lower = user_agent.lower()
-        
-        # كشف الهاتف
-        mobile_keywords = ['mobile', 'android', 'iphone', 'ipod', 'windows phone', 'blackberry']
-        if any(keyword in user_agent_lower for keyword in mobile_keywords):
-            return 'mobile'
-        
-        # كشف التابلت
-        tablet_keywords = ['ipad', 'tablet', 'kindle', 'playbook', 'nexus 7', 'nexus 10']
-        if any(keyword in user_agent_lower for keyword in tablet_keywords):
-            return 'tablet'
-        
-        # كشف الكمبيوتر
-        desktop_keywords = ['windows', 'macintosh', 'linux', 'x11', 'unix']
-        if any(keyword in user_agent_lower for keyword in desktop_keywords):
-            return 'desktop'
-        
-        return 'unknown'
+        from .user_agents import classify_user_agent
+        return classify_user_agent(user_agent).device_type
     
     @staticmethod
     def record_visitor(ip_address, user_agent=''):
-        """تسجيل زائر جديد أو تحديث الزائر الموجود"""
-        device_type = Visitor.detect_device_type(user_agent)
-        visitor, created = Visitor.objects.get_or_create(
-            ip_address=ip_address,
-            defaults={
-                'user_agent': user_agent,
-                'device_type': device_type,
-                'visit_count': 1,
-            }
-        )
-        if not created:
-            # إذا كان الزائر موجوداً، زد عدد الزيارات
-            visitor.visit_count += 1
-            visitor.user_agent = user_agent  # تحديث بيانات المتصفح
-            visitor.device_type = device_type  # تحديث نوع الجهاز
-            visitor.save()
-        return visitor
+        """تسجيل زيارة (تُجمَّع في الذاكرة وتُكتب كـ upsert مع الدفعة التالية) - البوتات لا تُحسب"""
+        from .visitors import enqueue_visit
+        return enqueue_visit(ip_address, user_agent)
 
 
 class Transaction(models.Model):
@@ -625,6 +633,10 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False, verbose_name='هل تم القراءة')
     read_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ القراءة')
     
+    # تجميع الإشعارات المتتالية من نفس النوع في صف واحد (listings.notification_policy)
+    group_key = models.CharField(max_length=50, blank=True, verbose_name='مفتاح التجميع')
+    group_count = models.PositiveIntegerField(default=1, verbose_name='عدد الإشعارات المجمعة')
+    
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التعديل')
     
@@ -635,6 +647,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
             models.Index(fields=['recipient', 'is_read']),
+            models.Index(fields=['is_read', 'created_at'], name='notification_retention_idx'),
         ]
     
     def __str__(self):
@@ -645,4 +658,123 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
\ No newline at end of file
+            self.save()
+
+class AreaPriceIndex(models.Model):
+    """مؤشر أسعار المنطقة: الوسيط و p10/p90 وسعر المتر لكل (منطقة، نوع استخدام)"""
+    ALL_USAGE_TYPES = 'all'
+    PRICING_CHOICES = [
+        ('monthly', 'شهري'),
+        ('daily', 'يومي'),
+    ]
+
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='price_index', verbose_name='المنطقة')
+    usage_type = models.CharField(max_length=20, verbose_name='نوع الاستخدام')  # 'all' = كل العقارات الشهرية
+    pricing = models.CharField(max_length=10, choices=PRICING_CHOICES, default='monthly', verbose_name='نوع التسعير')
+    sample_size = models.PositiveIntegerField(default=0, verbose_name='عدد العقارات')
+    p10_price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='السعر (p10)')
+    median_price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='السعر الوسيط')
+    p90_price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='السعر (p90)')
+    median_price_per_meter = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, verbose_name='وسيط سعر المتر')
+    computed_at = models.DateTimeField(default=timezone.now, verbose_name='تاريخ الحساب')
+
+    class Meta:
+        verbose_name = 'مؤشر أسعار منطقة'
+        verbose_name_plural = 'مؤشرات أسعار المناطق'
+        ordering = ['area__name', 'usage_type']
+        constraints = [
+            models.UniqueConstraint(fields=['area', 'usage_type'], name='unique_area_price_index'),
+        ]
+
+    def __str__(self):
+        return f"{self.area.name} - {self.usage_type} - {self.median_price}"
+
+
+class PropertyViewBucket(models.Model):
+    """عدد مشاهدات العقار لكل ساعة (تُملأ من دفعات المشاهدات)"""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='view_buckets', verbose_name='العقار')
+    hour = models.DateTimeField(verbose_name='الساعة')  # بداية الساعة (UTC)
+    views = models.PositiveIntegerField(default=0, verbose_name='المشاهدات')
+
+    class Meta:
+        verbose_name = 'مشاهدات الساعة'
+        verbose_name_plural = 'مشاهدات العقارات بالساعة'
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'hour'], name='unique_property_view_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} - {self.hour:%Y-%m-%d %H:00} - {self.views}"
+
+
+class DailyVisitorSketch(models.Model):
+    """ملخص HyperLogLog للزوار الفريدين لكل (يوم، نوع جهاز) بدلاً من صف لكل زيارة"""
+    day = models.DateField(verbose_name='اليوم')
+    device_type = models.CharField(max_length=20, choices=Visitor.DEVICE_TYPE_CHOICES, default='unknown', verbose_name='نوع الجهاز')
+    registers = models.BinaryField(verbose_name='سجلات HLL')
+    visits = models.PositiveIntegerField(default=0, verbose_name='عدد الزيارات')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
+
+    class Meta:
+        verbose_name = 'ملخص زوار يومي'
+        verbose_name_plural = 'ملخصات الزوار اليومية'
+        ordering = ['-day', 'device_type']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'device_type'], name='unique_daily_visitor_sketch'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.device_type}"
+
+
+class PropertySignature(models.Model):
+    """بصمة العقار لكشف التكرار: MinHash للنص و pHash لكل صورة"""
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, related_name='signature', verbose_name='العقار')
+    text_minhash = models.JSONField(default=list, verbose_name='MinHash النص')
+    image_hashes = models.JSONField(default=list, verbose_name='pHash الصور')
+    computed_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ الحساب')
+
+    class Meta:
+        verbose_name = 'بصمة عقار'
+        verbose_name_plural = 'بصمات العقارات'
+
+    def __str__(self):
+        return f"{self.property_id}"
+
+
+class PropertySignatureBucket(models.Model):
+    """فهرس LSH: (band، قيمة) -> عقار؛ نطاقات النص 0..N ونطاقات الصور تبدأ من 100"""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='signature_buckets', verbose_name='العقار')
+    band = models.PositiveSmallIntegerField(verbose_name='النطاق')
+    key = models.BigIntegerField(verbose_name='قيمة النطاق')
+
+    class Meta:
+        verbose_name = 'دلو LSH'
+        verbose_name_plural = 'دلاء LSH'
+        indexes = [
+            models.Index(fields=['band', 'key'], name='signature_bucket_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.band}:{self.key} -> {self.property_id}"
+
+
+class PropertyDuplicate(models.Model):
+    """عقار مشابه محتمل تم رصده عند الإضافة (يظهر للمراجع في قائمة المراجعة)"""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='duplicate_candidates', verbose_name='العقار')
+    duplicate_of = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='+', verbose_name='مكرر من')
+    text_similarity = models.FloatField(default=0, verbose_name='تشابه النص')  # تقدير Jaccard من MinHash
+    image_matches = models.PositiveSmallIntegerField(default=0, verbose_name='صور متطابقة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الرصد')
+
+    class Meta:
+        verbose_name = 'تكرار محتمل'
+        verbose_name_plural = 'تكرارات محتملة'
+        ordering = ['-text_similarity', '-image_matches']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'duplicate_of'], name='unique_property_duplicate'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} ~ {self.duplicate_of_id}"
@@ -0,0 +1,173 @@
+"""
+مراجعة العقارات المعلقة دفعة واحدة (موافقة / رفض)
+تحديث واحد بـ UPDATE، وسجلات التدقيق والإشعارات بـ bulk_create، والبريد على دفعات بعد تأكيد المعاملة
+
+البريد عبر outbox في القاعدة: moderation_email_pending يُضبط في نفس الـ UPDATE، ويُرسل في الخيط
+الخلفي بعد التأكيد ويُصفّر بعد نجاح كل دفعة؛ ما لم يُرسل (فشل SMTP أو توقف الـ worker) يعيده
+أمر send_moderation_emails من الـ cron
+"""
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.public_profile import refresh_properties_count
+
+from .audit import property_snapshot, record_property_audits
+from .background import run_after_commit
+from .models import ActivityLog, Notification, Property
+from .notifications import send_moderation_emails
+
+MODERATION_ACTIONS = {
+    # action -> (status, timestamp field, audit action, activity action, notification type)
+    'approve': ('approved', 'approved_at', 'approve', 'approve_property', 'property'),
+    'reject': ('rejected', 'rejected_at', 'reject', 'reject_property', 'rejection'),
+}
+
+
+# ترتيبات قائمة المراجعة المسموحة (كلها مغطاة بفهارس property_moderation_idx / property_submitted_idx)
+# submitted_at غير فارغ لكل عقار معلق (signals.set_moderation_priority + migration 0075)
+QUEUE_ORDERINGS = {
+    'priority': ('-moderation_priority', '-id'),
+    'oldest': ('submitted_at', 'id'),
+    'newest': ('-submitted_at', '-id'),
+}
+
+
+def compute_moderation_priority(submitted_at, owner_verified=False, resubmissions=0):
+    """
+    أولوية ثابتة تُحسب مرة عند الإرسال (الأعلى يُراجع أولاً):
+    الأقدم إرسالاً أعلى، والمالك الموثّق وإعادة الإرسال تقدّم العقار بعدد ساعات محدد
+    """
+    if submitted_at is None:
+        return None
+    hours = -submitted_at.timestamp() / 3600
+    if owner_verified:
+        hours += getattr(settings, 'MODERATION_VERIFIED_BONUS_HOURS', 24)
+    resubmissions = min(resubmissions, getattr(settings, 'MODERATION_MAX_RESUBMISSION_BONUSES', 3))
+    hours += resubmissions * getattr(settings, 'MODERATION_RESUBMISSION_BONUS_HOURS', 12)
+    return hours
+
+
+class ModerationError(ValueError):
+    """طلب مراجعة غير صالح"""
+
+
+def bulk_moderate(property_ids, action, notes='', moderator=None, ip_address=None):
+    """
+    موافقة/رفض مجموعة عقارات معلقة في معاملة واحدة
+    يعيد (المعرفات التي تم تطبيقها، المعرفات المتجاهلة: غير موجودة أو ليست معلقة أو محذوفة)
+    """
+    if action not in MODERATION_ACTIONS:
+        raise ModerationError('الإجراء يجب أن يكون approve أو reject')
+    if action == 'reject' and not notes:
+        raise ModerationError('يجب إدخال سبب الرفض')
+
+    max_items = getattr(settings, 'BULK_MODERATION_MAX_ITEMS', 500)
+    requested = list(dict.fromkeys(str(pk) for pk in property_ids))
+    if not requested:
+        raise ModerationError('يجب تحديد عقار واحد على الأقل')
+    if len(requested) > max_items:
+        raise ModerationError(f'الحد الأقصى {max_items} عقار في الطلب الواحد')
+
+    valid_ids = [pk for pk in requested if _is_uuid(pk)]
+    new_status, timestamp_field, audit_action, activity_action, notification_type = MODERATION_ACTIONS[action]
+    now = timezone.now()
+
+    with transaction.atomic():
+        # قفل الصفوف المعلقة فقط حتى لا يراجع مشرفان نفس العقار
+        properties = list(
+            Property.objects.select_for_update(of=('self',))
+            .filter(pk__in=valid_ids, status='pending', is_deleted=False)
+            .select_related('area', 'owner__user')
+        )
+        applied_ids = [p.pk for p in properties]
+        if not applied_ids:
+            return [], requested
+        snapshots = [property_snapshot(p) for p in properties]
+
+        Property.objects.filter(pk__in=applied_ids).update(**{
+            'status': new_status,
+            'approved_by': moderator,
+            timestamp_field: now,
+            'approval_notes': notes,
+            'moderation_priority': None,
+            'moderation_email_pending': True,
+            'updated_at': now,
+        })
+        for property_obj in properties:
+            property_obj.status = new_status
+            property_obj.approved_by = moderator
+            setattr(property_obj, timestamp_field, now)
+            property_obj.approval_notes = notes
+
+        record_property_audits(
+            [(property_obj, before) for property_obj, before in zip(properties, snapshots)],
+            audit_action, performed_by=moderator, notes=notes, ip_address=ip_address,
+        )
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=moderator,
+                action=activity_action,
+                content_type='property',
+                object_id=str(property_obj.pk),
+                object_name=property_obj.name,
+                payload={'area_id': property_obj.area_id, 'status': new_status, 'notes': notes},
+                ip_address=ip_address,
+            )
+            for property_obj in properties
+        ])
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=property_obj.owner_id,
+                notification_type=notification_type,
+                title='تمت الموافقة على عقارك' if action == 'approve' else 'تم رفض عقارك',
+                description=f"{property_obj.name}" + (f"\n{notes}" if notes else ''),
+                related_property=property_obj,
+                related_user=moderator,
+            )
+            for property_obj in properties
+            if property_obj.owner_id
+        ])
+
+        # UPDATE لا يطلق post_save: تحديث عدادات الملفات العامة والبريد بعد التأكيد
+        owner_ids = {p.owner_id for p in properties}
+        transaction.on_commit(lambda: refresh_properties_count(owner_ids))
+        run_after_commit(send_pending_moderation_emails, applied_ids)
+
+    applied = {str(pk) for pk in applied_ids}
+    return applied_ids, [pk for pk in requested if pk not in applied]
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def send_pending_moderation_emails(property_ids=None, older_than=None):
+    """
+    إرسال بريد المراجعة المعلق على دفعات (BULK_MODERATION_EMAIL_BATCH لكل اتصال SMTP)
+    older_than: فقط ما مضى عليه هذا الوقت (حتى لا يكرر الـ cron ما يرسله الخيط الخلفي الآن)
+    يعيد (عدد العقارات المنتهية، عدد المتبقية بعد فشل الإرسال)
+    """
+    queryset = Property.objects.filter(moderation_email_pending=True).select_related('area', 'owner__user')
+    if property_ids is not None:
+        queryset = queryset.filter(pk__in=property_ids)
+    if older_than is not None:
+        queryset = queryset.filter(updated_at__lt=timezone.now() - older_than)
+
+    batch_size = getattr(settings, 'BULK_MODERATION_EMAIL_BATCH', 50)
+    properties = list(queryset.order_by('updated_at', 'pk'))
+    done = failed = 0
+    for start in range(0, len(properties), batch_size):
+        batch = properties[start:start + batch_size]
+        if not send_moderation_emails(batch):
+            failed += len(batch)
+            continue
+        Property.objects.filter(pk__in=[p.pk for p in batch]).update(moderation_email_pending=False)
+        done += len(batch)
+    return done, failed
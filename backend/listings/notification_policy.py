@@ -0,0 +1,123 @@
+"""
+سياسة إشعارات المسؤولين:
+- الإرسال الجماعي (fan-out) بعدد ثابت من الاستعلامات، مع دمج الإشعارات المتتالية من نفس النوع في صف تجميعي واحد
+- الاحتفاظ: حذف المقروء الأقدم من N يوم، وحد أقصى للإشعارات غير المقروءة لكل مستخدم
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from users.models import UserProfile
+
+from .models import Notification
+
+# عنوان الصف التجميعي حسب مفتاح التجميع ({count} = عدد الإشعارات المدمجة)
+DIGEST_TITLES = {
+    'pending_property': '{count} عقارات معلقة جديدة بانتظار الموافقة',
+    'new_user': '{count} مستخدمين جدد',
+    'contact_message': '{count} رسائل تواصل جديدة',
+}
+
+
+def digest_title(notification):
+    """العنوان المعروض: عنوان الإشعار نفسه أو عنوان التجميع إذا دُمج أكثر من إشعار"""
+    template = DIGEST_TITLES.get(notification.group_key)
+    if template and notification.group_count > 1:
+        return template.format(count=notification.group_count)
+    return notification.title
+
+
+def admin_profile_ids(exclude=()):
+    return list(
+        UserProfile.objects.filter(Q(user_type='admin') | Q(user__is_staff=True), user__is_active=True)
+        .exclude(pk__in=exclude)
+        .values_list('pk', flat=True)
+    )
+
+
+def notify_admins(group_key, notification_type, title, description,
+                  related_property=None, related_user=None, exclude=()):
+    """
+    إشعار كل المسؤولين: المسؤول الذي لديه إشعار غير مقروء بنفس المفتاح خلال نافذة التجميع
+    يُحدَّث صفه (العدد + آخر وصف) بدلاً من صف جديد؛ الباقون صف جديد بـ bulk_create
+    """
+    recipient_ids = admin_profile_ids(exclude)
+    if not recipient_ids:
+        return 0
+
+    now = timezone.now()
+    window = timedelta(minutes=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW_MINUTES', 60))
+    # بدون مفتاح تجميع: صف جديد دائماً (إشعار مجمع بطبيعته مثل الحذف المجمع)
+    digests = {} if not group_key else dict(
+        Notification.objects.filter(
+            recipient_id__in=recipient_ids,
+            group_key=group_key,
+            is_read=False,
+            created_at__gte=now - window,
+        )
+        .order_by('recipient_id', 'created_at')
+        .values_list('recipient_id', 'pk')  # الأحدث لكل مستخدم يبقى في dict
+    )
+    if digests:
+        # created_at يتقدم حتى يظهر الصف التجميعي أعلى القائمة
+        Notification.objects.filter(pk__in=digests.values()).update(
+            group_count=F('group_count') + 1,
+            description=description,
+            related_property=related_property,
+            related_user=related_user,
+            created_at=now,
+            updated_at=now,
+        )
+
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=recipient_id,
+            notification_type=notification_type,
+            title=title,
+            description=description,
+            related_property=related_property,
+            related_user=related_user,
+            group_key=group_key,
+        )
+        for recipient_id in recipient_ids
+        if recipient_id not in digests
+    ])
+    return len(recipient_ids)
+
+
+def prune_notifications(read_days=None, unread_cap=None, batch_size=5000):
+    """
+    تطبيق سياسة الاحتفاظ؛ يعيد (المقروءة المحذوفة، غير المقروءة المحذوفة فوق الحد)
+    الحذف على دفعات بالمعرفات حتى لا تطول الأقفال على الجدول
+    """
+    read_days = getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', 30) if read_days is None else read_days
+    unread_cap = getattr(settings, 'NOTIFICATION_UNREAD_CAP', 200) if unread_cap is None else unread_cap
+
+    expired = Notification.objects.filter(is_read=True, created_at__lt=timezone.now() - timedelta(days=read_days))
+    read_deleted = _delete_in_batches(expired, batch_size)
+
+    unread_deleted = 0
+    over_cap = list(
+        Notification.objects.filter(is_read=False)
+        .values('recipient_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=unread_cap)
+        .values_list('recipient_id', flat=True)
+    )
+    for recipient_id in over_cap:
+        unread = Notification.objects.filter(recipient_id=recipient_id, is_read=False)
+        # المعرفات الزائدة عن الحد بعد أحدث unread_cap إشعار
+        surplus = unread.order_by('-created_at', '-pk').values_list('pk', flat=True)[unread_cap:]
+        unread_deleted += _delete_in_batches(Notification.objects.filter(pk__in=list(surplus)), batch_size)
+    return read_deleted, unread_deleted
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Notification.objects.filter(pk__in=ids).delete()[0]
@@ -1,40 +1,59 @@
 # listings/notifications.py
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from .models import Property
 
+# حالة العقار -> نوع بريد المراجعة
+MODERATION_EMAIL_ACTIONS = {'approved': 'approve', 'rejected': 'reject'}
 
-def send_property_approved_email(property_obj: Property):
+def build_property_moderation_email(property_obj: Property, action: str):
     """
-    إرسال بريد إلكتروني عند الموافقة على العقار
+    بناء بريد الموافقة/الرفض (EmailMultiAlternatives) أو None إذا لم يكن للمالك بريد
     """
     if not property_obj.owner or not property_obj.owner.user.email:
-        return False
+        return None
 
-    try:
+    owner_name = property_obj.owner.user.get_full_name() or property_obj.owner.user.username
+    context = {
+        'property_name': property_obj.name,
+        'property_price': property_obj.price,
+        'property_area': property_obj.area.name if property_obj.area else 'غير محدد',
+        'owner_name': owner_name,
+    }
+    if action == 'approve':
         subject = f"✅ تم الموافقة على عقارك: {property_obj.name}"
-        
-        context = {
-            'property_name': property_obj.name,
-            'property_price': property_obj.price,
-            'property_area': property_obj.area.name if property_obj.area else 'غير محدد',
-            'owner_name': property_obj.owner.user.get_full_name() or property_obj.owner.user.username,
+        body = f'تم الموافقة على عقارك: {property_obj.name}'
+        template = 'email/property_approved.html'
+        context.update({
             'approval_notes': property_obj.approval_notes or 'تمت الموافقة على عقارك بنجاح',
             'property_url': f"{settings.FRONTEND_URL}/property/{property_obj.id}",
             'dashboard_url': f"{settings.FRONTEND_URL}/dashboard/my-properties",
-        }
-        
-        html_message = render_to_string('email/property_approved.html', context)
-        
-        send_mail(
-            subject,
-            f'تم الموافقة على عقارك: {property_obj.name}',
-            settings.DEFAULT_FROM_EMAIL,
-            [property_obj.owner.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        })
+    else:
+        subject = f"❌ تم رفض عقارك: {property_obj.name}"
+        body = f'تم رفض عقارك: {property_obj.name}'
+        template = 'email/property_rejected.html'
+        context.update({
+            'rejection_reason': property_obj.approval_notes or 'لم يتم تحديد السبب',
+            'resubmit_url': f"{settings.FRONTEND_URL}/dashboard/my-rejected",
+            'support_email': settings.SUPPORT_EMAIL,
+        })
+
+    message = EmailMultiAlternatives(subject, body, settings.DEFAULT_FROM_EMAIL, [property_obj.owner.user.email])
+    message.attach_alternative(render_to_string(template, context), 'text/html')
+    return message
+
+
+def send_property_approved_email(property_obj: Property):
+    """
+    إرسال بريد إلكتروني عند الموافقة على العقار
+    """
+    try:
+        message = build_property_moderation_email(property_obj, 'approve')
+        if message is None:
+            return False
+        message.send(fail_silently=False)
         return True
     except Exception as e:
         print(f"Error sending approval email: {e}")
@@ -45,38 +64,46 @@ def send_property_rejected_email(property_obj: Property):
     """
     إرسال بريد إلكتروني عند رفض العقار
     """
-    if not property_obj.owner or not property_obj.owner.user.email:
-        return False
-
     try:
-        subject = f"❌ تم رفض عقارك: {property_obj.name}"
-        
-        context = {
-            'property_name': property_obj.name,
-            'property_price': property_obj.price,
-            'property_area': property_obj.area.name if property_obj.area else 'غير محدد',
-            'owner_name': property_obj.owner.user.get_full_name() or property_obj.owner.user.username,
-            'rejection_reason': property_obj.approval_notes or 'لم يتم تحديد السبب',
-            'resubmit_url': f"{settings.FRONTEND_URL}/dashboard/my-rejected",
-            'support_email': settings.SUPPORT_EMAIL,
-        }
-        
-        html_message = render_to_string('email/property_rejected.html', context)
-        
-        send_mail(
-            subject,
-            f'تم رفض عقارك: {property_obj.name}',
-            settings.DEFAULT_FROM_EMAIL,
-            [property_obj.owner.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        message = build_property_moderation_email(property_obj, 'reject')
+        if message is None:
+            return False
+        message.send(fail_silently=False)
         return True
     except Exception as e:
         print(f"Error sending rejection email: {e}")
         return False
 
 
+def send_moderation_emails(properties):
+    """
+    إرسال رسائل الموافقة/الرفض (حسب حالة كل عقار) عبر اتصال SMTP واحد
+    يعيد False عند فشل الإرسال (الدفعة كاملة تُعاد لاحقاً)، والعقارات بدون بريد أو ليست
+    موافقاً عليها/مرفوضة تُعتبر منتهية
+    """
+    messages = []
+    for property_obj in properties:
+        action = MODERATION_EMAIL_ACTIONS.get(property_obj.status)
+        if action is None:
+            continue
+        try:
+            message = build_property_moderation_email(property_obj, action)
+        except Exception as e:
+            print(f"Error building moderation email for {property_obj.pk}: {e}")
+            continue
+        if message is not None:
+            messages.append(message)
+    if not messages:
+        return True
+    try:
+        with get_connection(fail_silently=False) as connection:
+            connection.send_messages(messages)
+    except Exception as e:
+        print(f"Error sending moderation email batch: {e}")
+        return False
+    return True
+
+
 def send_property_submitted_email(property_obj: Property):
     """
     إرسال بريد تأكيد عند إرسال عقار للمراجعة
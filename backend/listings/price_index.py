@@ -0,0 +1,152 @@
+"""
+Area price index
+مؤشر أسعار المناطق: الوسيط و p10/p90 وسعر المتر لكل (منطقة، نوع استخدام)
+يُحسب دفعة واحدة (vectorized) من اللقطة العمودية ويُخزَّن في AreaPriceIndex للقراءة السريعة
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .columnar import get_snapshot, group_percentiles
+from .models import AreaPriceIndex
+
+PRICE_INDEX_CACHE_KEY = 'listings:area_price_index'
+PERCENTILES = (10, 50, 90)
+
+# أنواع الاستخدام التي يُعرض سعرها يومياً (نفس Property.is_daily_pricing_category)
+DAILY_USAGE_TYPES = ('vacation', 'daily')
+
+# أقل عدد عقارات لعرض مقارنة "السعر مقابل وسيط المنطقة"
+MIN_SAMPLE_SIZE = 3
+
+
+def display_prices(props, mask):
+    """السعر المعروض لكل عقار (اليومي لفئات الحجز اليومي إن وُجد) ومصفوفة هل هو يومي"""
+    daily_codes = [props.code('usage_type', usage_type) for usage_type in DAILY_USAGE_TYPES]
+    is_daily = np.isin(props['usage_type'][mask], daily_codes)
+    daily_price = props['daily_price'][mask]
+    has_daily = is_daily & ~np.isnan(daily_price) & (daily_price > 0)
+    return np.where(has_daily, daily_price, props['price'][mask]), is_daily
+
+
+def _index_rows(keys, prices, sizes):
+    """{key: (العدد, p10, p50, p90, وسيط سعر المتر)} لكل مجموعة"""
+    price_stats = group_percentiles(keys, prices, PERCENTILES)
+    valid = sizes > 0
+    per_meter = group_percentiles(keys[valid], prices[valid] / sizes[valid], (50,))
+    counts = dict(zip(*np.unique(keys, return_counts=True)))
+    return {
+        key: (int(counts[key]), *stats, per_meter.get(key, [None])[0])
+        for key, stats in price_stats.items()
+    }
+
+
+def compute_price_index():
+    """حساب المؤشر لجميع المناطق من اللقطة العمودية (العقارات المعتمدة فقط)"""
+    props = get_snapshot().properties()
+    approved = ~props['is_deleted'] & (props['status'] == props.code('status', 'approved'))
+    prices, is_daily = display_prices(props, approved)
+    areas = props['area_id'][approved]
+    usage = props['usage_type'][approved].astype(np.int64)
+    sizes = props['size'][approved]
+
+    results = []
+    # لكل (منطقة، نوع استخدام): مفتاح مركب واحد لتجميع متجه
+    width = len(props.vocab['usage_type'])
+    for key, stats in _index_rows(areas * width + usage, prices, sizes).items():
+        area_id, code = divmod(key, width)
+        usage_type = props.label('usage_type', code)
+        if not usage_type:
+            continue
+        pricing = 'daily' if usage_type in DAILY_USAGE_TYPES else 'monthly'
+        results.append((area_id, usage_type, pricing, stats))
+
+    # "all" لكل منطقة: العقارات الشهرية فقط (لا يصح خلط السعر اليومي بالشهري)
+    monthly = ~is_daily
+    for area_id, stats in _index_rows(areas[monthly], prices[monthly], sizes[monthly]).items():
+        results.append((area_id, AreaPriceIndex.ALL_USAGE_TYPES, 'monthly', stats))
+    return results
+
+
+def _decimal(value):
+    return Decimal(str(round(float(value), 2))) if value is not None else None
+
+
+@transaction.atomic
+def rebuild_price_index():
+    """إعادة بناء جدول المؤشر بالكامل (استبدال ذري) وإبطال الكاش"""
+    now = timezone.now()
+    rows = [
+        AreaPriceIndex(
+            area_id=area_id,
+            usage_type=usage_type,
+            pricing=pricing,
+            sample_size=count,
+            p10_price=_decimal(p10),
+            median_price=_decimal(p50),
+            p90_price=_decimal(p90),
+            median_price_per_meter=_decimal(per_meter),
+            computed_at=now,
+        )
+        for area_id, usage_type, pricing, (count, p10, p50, p90, per_meter) in compute_price_index()
+    ]
+    AreaPriceIndex.objects.all().delete()
+    AreaPriceIndex.objects.bulk_create(rows)
+    transaction.on_commit(lambda: cache.delete(PRICE_INDEX_CACHE_KEY))
+    return len(rows)
+
+
+def ensure_fresh():
+    """إعادة البناء إذا كان المؤشر أقدم من PRICE_INDEX_MAX_AGE_SECONDS"""
+    max_age = getattr(settings, 'PRICE_INDEX_MAX_AGE_SECONDS', 3600)
+    latest = AreaPriceIndex.objects.order_by('-computed_at').values_list('computed_at', flat=True).first()
+    if latest is None or timezone.now() - latest > timedelta(seconds=max_age):
+        return rebuild_price_index()
+    return 0
+
+
+def get_price_index_map():
+    """كل المؤشر كـ dict {(area_id, usage_type): {...}} من الكاش (استعلام واحد عند انتهاء الصلاحية)"""
+    def load():
+        return {
+            (row['area_id'], row['usage_type']): {
+                'pricing': row['pricing'],
+                'sample_size': row['sample_size'],
+                'p10': float(row['p10_price']),
+                'median': float(row['median_price']),
+                'p90': float(row['p90_price']),
+                'median_per_meter': float(row['median_price_per_meter']) if row['median_price_per_meter'] is not None else None,
+            }
+            for row in AreaPriceIndex.objects.values(
+                'area_id', 'usage_type', 'pricing', 'sample_size',
+                'p10_price', 'median_price', 'p90_price', 'median_price_per_meter',
+            )
+        }
+    return cache.get_or_set(PRICE_INDEX_CACHE_KEY, load, getattr(settings, 'PRICE_INDEX_CACHE_SECONDS', 600))
+
+
+def compare_to_area_median(prop, index_map=None):
+    """مقارنة سعر العقار بوسيط منطقته ونوع استخدامه (None إذا كانت العينة صغيرة)"""
+    if index_map is None:
+        index_map = get_price_index_map()
+    entry = index_map.get((prop.area_id, prop.usage_type))
+    if (entry is None or entry['sample_size'] < MIN_SAMPLE_SIZE) and not prop.is_daily_pricing_category():
+        entry = index_map.get((prop.area_id, AreaPriceIndex.ALL_USAGE_TYPES))
+    if entry is None or entry['sample_size'] < MIN_SAMPLE_SIZE or not entry['median']:
+        return None
+
+    price = float(prop.get_display_price())
+    return {
+        'area_median': entry['median'],
+        'p10': entry['p10'],
+        'p90': entry['p90'],
+        'median_per_meter': entry['median_per_meter'],
+        'pricing': entry['pricing'],
+        'sample_size': entry['sample_size'],
+        'difference_percent': round((price - entry['median']) / entry['median'] * 100, 1),
+    }
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from .models import Area, Property, PropertyImage, PropertyVideo, Offer, ContactMessage, ActivityLog, Transaction, Visitor, PropertyAuditTrail, Notification, Amenity
+from .activity import area_names_for, render_activity
+from .notification_policy import digest_title
+from .price_index import compare_to_area_median, get_price_index_map
 from decimal import Decimal, InvalidOperation
+from django.db.models import QuerySet
 import logging
 
 logger = logging.getLogger(__name__)
@@ -76,6 +80,7 @@ class PropertySerializer(serializers.ModelSerializer):
     price_unit = serializers.SerializerMethodField()
     display_price = serializers.SerializerMethodField()
     is_daily_pricing = serializers.SerializerMethodField()
+    area_price_comparison = serializers.SerializerMethodField()
     
     def get_price_unit(self, obj):
         """الحصول على وحدة السعر (شهري أو يومي)"""
@@ -89,6 +94,12 @@ class PropertySerializer(serializers.ModelSerializer):
         """التحقق إذا كانت الفئة تستخدم سعر يومي"""
         return obj.is_daily_pricing_category()
     
+    def get_area_price_comparison(self, obj):
+        """السعر مقارنة بوسيط المنطقة (المؤشر يُقرأ مرة واحدة لكل استجابة)"""
+        if 'price_index' not in self.context:
+            self.context['price_index'] = get_price_index_map()
+        return compare_to_area_median(obj, self.context['price_index'])
+    
     def get_usage_type_ar(self, obj):
         """تحويل usage_type إلى العربية"""
         usage_type_map = {
@@ -228,7 +239,7 @@ class PropertySerializer(serializers.ModelSerializer):
             'images', 'videos', 'created_at', 'updated_at',
             'amenities', 'amenity_ids',
             # حقول جديدة للسعر
-            'price_unit', 'display_price', 'is_daily_pricing',
+            'price_unit', 'display_price', 'is_daily_pricing', 'area_price_comparison',
             # حقول الموافقات
             'owner', 'owner_id', 'owner_username', 'owner_name', 'owner_type', 'owner_is_verified', 'status', 'status_display', 'submitted_at',
             'approved_by', 'approved_by_name', 'approved_at', 'rejected_at', 'approval_notes',
@@ -239,7 +250,7 @@ class PropertySerializer(serializers.ModelSerializer):
             # حقول الحجز
             'is_booked', 'booked_at', 'booking_expires_at'
         )
-        read_only_fields = ('id', 'created_at', 'updated_at', 'submitted_at', 'approved_by', 'approved_at', 'rejected_at', 'approval_notes', 'status', 'status_display', 'owner', 'owner_id', 'owner_username', 'owner_name', 'owner_type', 'owner_is_verified', 'area_data', 'views', 'visitors', 'visited_ips', 'is_deleted', 'deleted_at', 'deleted_by', 'deleted_by_name', 'price_unit', 'display_price', 'is_daily_pricing', 'original_contact', 'is_booked', 'booked_at', 'booking_expires_at')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'submitted_at', 'approved_by', 'approved_at', 'rejected_at', 'approval_notes', 'status', 'status_display', 'owner', 'owner_id', 'owner_username', 'owner_name', 'owner_type', 'owner_is_verified', 'area_data', 'views', 'visitors', 'visited_ips', 'is_deleted', 'deleted_at', 'deleted_by', 'deleted_by_name', 'price_unit', 'display_price', 'is_daily_pricing', 'area_price_comparison', 'original_contact', 'is_booked', 'booked_at', 'booking_expires_at')
         extra_kwargs = {
             'name': {'required': True},
             'area': {'required': True},
@@ -267,6 +278,85 @@ class PropertySerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class PropertyCardSerializer(serializers.ModelSerializer):
+    """بطاقة عقار مختصرة للقوائم العامة (الأكثر مشاهدة / الرائج الآن)"""
+    area_name = serializers.CharField(source='area.name', read_only=True)
+    display_price = serializers.SerializerMethodField()
+    price_unit = serializers.CharField(source='get_price_unit', read_only=True)
+    image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Property
+        fields = (
+            'id', 'name', 'area', 'area_name', 'usage_type', 'rooms', 'size', 'furnished', 'featured',
+            'display_price', 'price_unit', 'image_url', 'views',
+        )
+        read_only_fields = fields
+
+    def get_display_price(self, obj):
+        return float(obj.get_display_price())
+
+    def get_image_url(self, obj):
+        """أول صورة (من الصور المحملة مسبقاً بـ prefetch)"""
+        images = sorted(obj.images.all(), key=lambda image: image.order)
+        request = self.context.get('request')
+        if images and images[0].image and request:
+            return request.build_absolute_uri(images[0].image.url)
+        return None
+
+
+class ProfilePropertyCardSerializer(PropertyCardSerializer):
+    """بطاقة عقار لصفحة الملف العام: حقول PropertyCard فقط بدون الفيديوهات والمميزات والتدقيق"""
+    area_data = serializers.SerializerMethodField()
+    images = PropertyImageSerializer(many=True, read_only=True)
+    is_daily_pricing = serializers.BooleanField(source='is_daily_pricing_category', read_only=True)
+    owner_username = serializers.CharField(source='owner.user.username', read_only=True)
+    owner_name = serializers.SerializerMethodField()
+    owner_is_verified = serializers.BooleanField(source='owner.is_verified', read_only=True)
+
+    class Meta(PropertyCardSerializer.Meta):
+        fields = PropertyCardSerializer.Meta.fields + (
+            'area_data', 'images', 'price', 'original_price', 'discount', 'is_daily_pricing',
+            'bathrooms', 'floor', 'is_booked', 'created_at',
+            'owner_username', 'owner_name', 'owner_is_verified',
+        )
+        read_only_fields = fields
+
+    def get_area_data(self, obj):
+        return {'id': obj.area_id, 'name': obj.area.name} if obj.area_id else None
+
+    def get_owner_name(self, obj):
+        user = obj.owner.user
+        return user.get_full_name() or user.username
+
+
+class ModerationQueueSerializer(PropertyCardSerializer):
+    """عنصر في قائمة المراجعة: بطاقة العقار + بيانات المالك والأولوية"""
+    owner_username = serializers.CharField(source='owner.user.username', read_only=True, default=None)
+    owner_is_verified = serializers.BooleanField(source='owner.is_verified', read_only=True, default=False)
+    possible_duplicates = serializers.SerializerMethodField()
+
+    class Meta(PropertyCardSerializer.Meta):
+        fields = PropertyCardSerializer.Meta.fields + (
+            'status', 'submitted_at', 'resubmission_count', 'moderation_priority',
+            'owner_username', 'owner_is_verified', 'possible_duplicates',
+        )
+        read_only_fields = fields
+
+    def get_possible_duplicates(self, obj):
+        """التكرارات المرصودة عند الإضافة (محملة مسبقاً بـ prefetch)"""
+        return [
+            {
+                'id': str(duplicate.duplicate_of_id),
+                'name': duplicate.duplicate_of.name,
+                'status': duplicate.duplicate_of.status,
+                'text_similarity': duplicate.text_similarity,
+                'image_matches': duplicate.image_matches,
+            }
+            for duplicate in obj.duplicate_candidates.all()
+        ]
+
+
 class OfferSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
@@ -306,11 +396,21 @@ class ContactMessageSerializer(serializers.ModelSerializer):
 class ActivityLogSerializer(serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     action_display = serializers.CharField(source='get_action_display', read_only=True)
+    description = serializers.SerializerMethodField()
     
     def get_user_name(self, obj):
         if obj.user and obj.user.user:
             return obj.user.user.get_full_name() or obj.user.user.username
         return 'نظام'
+
+    def get_description(self, obj):
+        """النص يُبنى من payload عند العرض؛ أسماء المناطق تُقرأ مرة واحدة لكل استجابة"""
+        if 'activity_area_names' not in self.context:
+            logs = self.root.instance
+            if not isinstance(logs, (list, tuple, QuerySet)):
+                logs = [obj]
+            self.context['activity_area_names'] = area_names_for(logs)
+        return render_activity(obj, self.context['activity_area_names'])
     
     class Meta:
         model = ActivityLog
@@ -339,6 +439,8 @@ class DashboardSummarySerializer(serializers.Serializer):
     offers = serializers.DictField()
     contact_messages = serializers.DictField()
     price_distribution = serializers.ListField()
+    daily_price_distribution = serializers.ListField()
+    transactions = serializers.DictField()
     recent_activities = serializers.ListField()
     top_properties = serializers.ListField()
     daily_activity = serializers.ListField()
@@ -442,6 +544,8 @@ class PropertyAuditTrailSerializer(serializers.ModelSerializer):
             'action_display',
             'performed_by',
             'performed_by_name',
+            'is_base',
+            'changes',
             'property_data_before',
             'property_data_after',
             'notes',
@@ -462,6 +566,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     related_property_name = serializers.CharField(source='related_property.name', read_only=True, allow_null=True)
     related_user_name = serializers.SerializerMethodField()
     notification_type_display = serializers.CharField(source='get_notification_type_display', read_only=True)
+    title = serializers.SerializerMethodField()
     time = serializers.SerializerMethodField()
     
     class Meta:
@@ -478,13 +583,18 @@ class NotificationSerializer(serializers.ModelSerializer):
             'related_property_name',
             'related_user',
             'related_user_name',
+            'group_count',
             'is_read',
             'read_at',
             'created_at',
             'updated_at',
             'time',
         )
-        read_only_fields = ('id', 'recipient', 'created_at', 'updated_at', 'read_at')
+        read_only_fields = ('id', 'recipient', 'group_count', 'created_at', 'updated_at', 'read_at')
+    
+    def get_title(self, obj):
+        """عنوان التجميع عند دمج أكثر من إشعار"""
+        return digest_title(obj)
     
     def get_recipient_name(self, obj):
         """الحصول على اسم المستقبل"""
@@ -1,215 +1,84 @@
 """
 Signals for tracking user activities on properties and user accounts
 """
-from django.db.models.signals import post_save, post_delete, pre_save
-from django.db.models import Q
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
 from django.dispatch import receiver
+from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Property, ActivityLog, Notification, ContactMessage
+from .models import Property, PropertyImage, Notification, ContactMessage
 from users.models import UserProfile
+from users.public_profile import refresh_properties_count
+from .activity import log_activity, property_payload, soft_delete_dedupe_key
+from .duplicates import schedule_duplicate_scan
+from .moderation import compute_moderation_priority
+from .notification_policy import notify_admins
 
 
-@receiver(post_save, sender=Property)
-def log_property_activity(sender, instance, created, **kwargs):
+@receiver(pre_save, sender=Property)
+def set_moderation_priority(sender, instance, update_fields=None, **kwargs):
+    """
+    حساب أولوية المراجعة للعقارات المعلقة (تُحفظ مع نفس الـ save)
+    وكل عقار معلق له submitted_at (مثل المضاف من لوحة الإدارة) حتى يظهر في ترتيب oldest/newest
     """
-    Log property creation with complete details
+    if update_fields is None and instance.status == 'pending' and instance.submitted_at is None:
+        instance.submitted_at = timezone.now()
+    if update_fields is not None and 'moderation_priority' not in update_fields:
+        return
+    if instance.status == 'pending':
+        instance.moderation_priority = compute_moderation_priority(
+            instance.submitted_at or timezone.now(),
+            bool(instance.owner_id and instance.owner.is_verified),
+            instance.resubmission_count,
+        )
+    else:
+        instance.moderation_priority = None
+
+
+def log_property_activity(instance):
+    """
+    Log property creation (structured payload, rendered by listings.activity)
     """
     try:
-        # Only log if the property has an owner and it's a new property
-        if created and instance.owner:
-            # Build complete property details
-            usage_type_display = dict(Property.USAGE_TYPES).get(instance.usage_type, instance.usage_type)
-            status_display = dict(Property.STATUS_CHOICES).get(instance.status, instance.status)
-            
-            full_details = f"""
-📋 **تم إضافة عقار جديد**
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-🏠 **معلومات العقار الأساسية:**
-  • الاسم: {instance.name}
-  • المنطقة: {instance.area.name}
-  • العنوان: {instance.address}
-  • رقم الاتصال: {instance.contact}
-
-💰 **معلومات السعر:**
-  • السعر الحالي: {instance.price} ريال
-  • السعر الأصلي: {instance.original_price if instance.original_price else 'بدون'}
-  • نسبة الخصم: {instance.discount}%
-
-🏢 **تفاصيل المساحة:**
-  • عدد الغرف: {instance.rooms}
-  • عدد الأسرة: {instance.beds}
-  • عدد الحمامات: {instance.bathrooms}
-  • المساحة: {instance.size} متر مربع
-  • الطابق: {instance.floor}
-
-⚙️ **المواصفات:**
-  • النوع: {usage_type_display}
-  • مفروش: {'نعم' if instance.furnished else 'لا'}
-  • مميز: {'نعم' if instance.featured else 'لا'}
-  • الحالة: {status_display}
-
-📍 **الموقع الجغرافي:**
-  • خط العرض: {instance.latitude if instance.latitude else 'بدون'}
-  • خط الطول: {instance.longitude if instance.longitude else 'بدون'}
-
-📝 **الوصف:**
-{instance.description}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-⏰ تاريخ الإضافة: {instance.created_at.strftime('%Y-%m-%d %H:%M:%S')}
-"""
-            
-            ActivityLog.objects.create(
-                user=instance.owner,
-                action='create_property',
-                content_type='property',
-                object_id=str(instance.id),
-                object_name=instance.name,
-                description=full_details
+        if instance.owner_id:
+            log_activity(
+                'create_property', 'property', instance.pk, instance.name,
+                user_id=instance.owner_id,
+                payload=property_payload(instance),
+                dedupe_key=f'create_property:{instance.pk}',
             )
     except Exception as e:
         # Log the error but don't break the save operation
         print(f"Error logging property activity: {str(e)}")
 
 
-@receiver(post_save, sender=Property)
-def log_property_soft_delete(sender, instance, created, **kwargs):
+def log_property_soft_delete(instance):
     """
-    Log property soft deletion (is_deleted = True)
+    Log property soft deletion (only called on the is_deleted False -> True transition)
     """
     try:
-        # Check if this is a soft delete (is_deleted changed from False to True)
-        if not created and instance.is_deleted:
-            # Check if there's already a log for this deletion to avoid duplicates
-            existing_log = ActivityLog.objects.filter(
-                action='delete_property',
-                object_id=str(instance.id),
-                description__icontains=instance.deleted_at.strftime('%Y-%m-%d') if instance.deleted_at else ''
-            ).first()
-            
-            if existing_log:
-                return
-            
-            if instance.owner:
-                usage_type_display = dict(Property.USAGE_TYPES).get(instance.usage_type, instance.usage_type)
-                status_display = dict(Property.STATUS_CHOICES).get(instance.status, instance.status)
-                deleted_by = instance.deleted_by.user.username if instance.deleted_by else 'نظام'
-                
-                full_details = f"""
-📋 **تم حذف عقار (حذف منطقي)**
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-🏠 **معلومات العقار الأساسية:**
-  • الاسم: {instance.name}
-  • المنطقة: {instance.area.name}
-  • العنوان: {instance.address}
-  • رقم الاتصال: {instance.contact}
-
-💰 **معلومات السعر:**
-  • السعر الحالي: {instance.price} ريال
-  • السعر الأصلي: {instance.original_price if instance.original_price else 'بدون'}
-  • نسبة الخصم: {instance.discount}%
-
-🏢 **تفاصيل المساحة:**
-  • عدد الغرف: {instance.rooms}
-  • عدد الأسرة: {instance.beds}
-  • عدد الحمامات: {instance.bathrooms}
-  • المساحة: {instance.size} متر مربع
-  • الطابق: {instance.floor}
-
-⚙️ **المواصفات:**
-  • النوع: {usage_type_display}
-  • مفروش: {'نعم' if instance.furnished else 'لا'}
-  • مميز: {'نعم' if instance.featured else 'لا'}
-  • الحالة: {status_display}
-
-📍 **الموقع الجغرافي:**
-  • خط العرض: {instance.latitude if instance.latitude else 'بدون'}
-  • خط الطول: {instance.longitude if instance.longitude else 'بدون'}
-
-👤 **معلومات الحذف:**
-  • تم الحذف بواسطة: {deleted_by}
-  • تاريخ الحذف: {instance.deleted_at.strftime('%Y-%m-%d %H:%M:%S') if instance.deleted_at else 'غير محدد'}
-
-📝 **الوصف:**
-{instance.description}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-⏰ تاريخ الإضافة: {instance.created_at.strftime('%Y-%m-%d %H:%M:%S')}
-"""
-                
-                ActivityLog.objects.create(
-                    user=instance.deleted_by if instance.deleted_by else instance.owner,
-                    action='delete_property',
-                    content_type='property',
-                    object_id=str(instance.id),
-                    object_name=instance.name,
-                    description=full_details
-                )
+        if instance.is_deleted and instance.owner_id:
+            log_activity(
+                'delete_property', 'property', instance.pk, instance.name,
+                user_id=instance.deleted_by_id or instance.owner_id,
+                payload=property_payload(instance, deleted_at=instance.deleted_at),
+                dedupe_key=soft_delete_dedupe_key(instance),
+            )
     except Exception as e:
         # Log the error but don't break the save operation
         print(f"Error logging property soft deletion: {str(e)}")
 
 
-@receiver(post_delete, sender=Property)
-def log_property_deletion(sender, instance, **kwargs):
+def log_property_deletion(instance):
     """
-    Log property deletion with complete details
+    Log property (hard) deletion
     """
     try:
-        if instance.owner:
-            # Build complete property details
-            usage_type_display = dict(Property.USAGE_TYPES).get(instance.usage_type, instance.usage_type)
-            status_display = dict(Property.STATUS_CHOICES).get(instance.status, instance.status)
-            
-            full_details = f"""
-📋 **تم حذف عقار**
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-🏠 **معلومات العقار الأساسية:**
-  • الاسم: {instance.name}
-  • المنطقة: {instance.area.name}
-  • العنوان: {instance.address}
-  • رقم الاتصال: {instance.contact}
-
-💰 **معلومات السعر:**
-  • السعر الحالي: {instance.price} ريال
-  • السعر الأصلي: {instance.original_price if instance.original_price else 'بدون'}
-  • نسبة الخصم: {instance.discount}%
-
-🏢 **تفاصيل المساحة:**
-  • عدد الغرف: {instance.rooms}
-  • عدد الأسرة: {instance.beds}
-  • عدد الحمامات: {instance.bathrooms}
-  • المساحة: {instance.size} متر مربع
-  • الطابق: {instance.floor}
-
-⚙️ **المواصفات:**
-  • النوع: {usage_type_display}
-  • مفروش: {'نعم' if instance.furnished else 'لا'}
-  • مميز: {'نعم' if instance.featured else 'لا'}
-  • الحالة: {status_display}
-
-📍 **الموقع الجغرافي:**
-  • خط العرض: {instance.latitude if instance.latitude else 'بدون'}
-  • خط الطول: {instance.longitude if instance.longitude else 'بدون'}
-
-📝 **الوصف:**
-{instance.description}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-⏰ تاريخ الإضافة: {instance.created_at.strftime('%Y-%m-%d %H:%M:%S')}
-⏰ تاريخ الحذف: {__import__('django.utils', fromlist=['timezone']).timezone.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-            
-            ActivityLog.objects.create(
-                user=instance.owner,
-                action='delete_property',
-                content_type='property',
-                object_id=str(instance.id),
-                object_name=instance.name,
-                description=full_details
+        if instance.owner_id:
+            log_activity(
+                'delete_property', 'property', instance.pk, instance.name,
+                user_id=instance.owner_id,
+                payload=property_payload(instance, hard_delete=True, deleted_at=timezone.now()),
             )
     except Exception as e:
         # Log the error but don't break the delete operation
@@ -219,38 +88,24 @@ def log_property_deletion(sender, instance, **kwargs):
 # ============ Notifications Signals ============
 # تم تفعيل إشعارات العقارات الجديدة والمستخدمين والرسائل
 
-@receiver(post_save, sender=Property)
-def create_new_property_notification(sender, instance, created, **kwargs):
+def create_new_property_notification(instance):
     """
     إرسال إشعار للمسؤولين عند إضافة عقار جديد بانتظار الموافقة
     """
     try:
-        if created and instance.status == 'pending' and instance.owner:
-            # الحصول على جميع المسؤولين (admins و staff)
-            admins = UserProfile.objects.filter(
-                Q(user_type='admin') | Q(user__is_staff=True),
-                user__is_active=True
-            ).exclude(id=instance.owner.id).values_list('user', flat=True)
-            
+        if instance.status == 'pending' and instance.owner:
             # بيانات العقار
             usage_type_display = dict(Property.USAGE_TYPES).get(instance.usage_type, instance.usage_type)
             
-            # إنشاء إشعارات للمسؤولين
-            for admin_id in admins:
-                try:
-                    admin_user = User.objects.get(id=admin_id)
-                    admin_profile = admin_user.profile
-                    
-                    Notification.objects.create(
-                        recipient=admin_profile,
-                        notification_type='property',
-                        title='عقار معلق بانتظار الموافقة',
-                        description=f'عقار جديد من {instance.owner.user.username}\n🏠 العقار: {instance.name}\n📍 المنطقة: {instance.area.name}\n💰 السعر: {instance.price} ريال\n🏷️ النوع: {usage_type_display}\n👤 المالك: {instance.owner.user.get_full_name() or instance.owner.user.username}',
-                        related_property=instance,
-                        related_user=instance.owner
-                    )
-                except Exception as e:
-                    print(f"Error creating notification for admin {admin_id}: {str(e)}")
+            # إشعار المسؤولين (يُدمج مع إشعارات العقارات المعلقة غير المقروءة الأخيرة)
+            notify_admins(
+                'pending_property', 'property',
+                title='عقار معلق بانتظار الموافقة',
+                description=f'عقار جديد من {instance.owner.user.username}\n🏠 العقار: {instance.name}\n📍 المنطقة: {instance.area.name}\n💰 السعر: {instance.price} ريال\n🏷️ النوع: {usage_type_display}\n👤 المالك: {instance.owner.user.get_full_name() or instance.owner.user.username}',
+                related_property=instance,
+                related_user=instance.owner,
+                exclude=[instance.owner_id],
+            )
             
             # إنشاء إشعار أيضاً للمالك نفسه
             try:
@@ -283,32 +138,19 @@ def create_new_user_notification(sender, instance, created, **kwargs):
                 # سيتم إرساله لاحقاً عند إنشاء Profile
                 return
             
-            # الحصول على جميع المسؤولين (admins و staff)
-            admins = UserProfile.objects.filter(
-                Q(user_type='admin') | Q(user__is_staff=True),
-                user__is_active=True
-            ).exclude(user=instance).values_list('user', flat=True)
-            
             # بيانات المستخدم الجديد
             user_type_display = dict(UserProfile.USER_TYPE_CHOICES).get(
                 profile.user_type,
                 profile.user_type
             )
             
-            # إنشاء إشعارات للمسؤولين
-            for admin_id in admins:
-                try:
-                    admin_user = User.objects.get(id=admin_id)
-                    admin_profile = admin_user.profile
-                    
-                    Notification.objects.create(
-                        recipient=admin_profile,
-                        notification_type='user',
-                        title='مستخدم جديد',
-                        description=f'تم تسجيل مستخدم جديد: {instance.username} ({user_type_display})\n📧 البريد: {instance.email}',
-                    )
-                except Exception as e:
-                    print(f"Error creating notification for admin {admin_id}: {str(e)}")
+            # إشعار المسؤولين (يُدمج مع إشعارات المستخدمين الجدد غير المقروءة الأخيرة)
+            notify_admins(
+                'new_user', 'user',
+                title='مستخدم جديد',
+                description=f'تم تسجيل مستخدم جديد: {instance.username} ({user_type_display})\n📧 البريد: {instance.email}',
+                exclude=[profile.pk],
+            )
                     
     except Exception as e:
         print(f"Error creating new user notification: {str(e)}")
@@ -321,32 +163,19 @@ def create_new_user_profile_notification(sender, instance, created, **kwargs):
     """
     try:
         if created:
-            # الحصول على جميع المسؤولين (admins و staff)
-            admins = UserProfile.objects.filter(
-                Q(user_type='admin') | Q(user__is_staff=True),
-                user__is_active=True
-            ).exclude(id=instance.id).values_list('user', flat=True)
-            
             # بيانات المستخدم الجديد
             user_type_display = dict(UserProfile.USER_TYPE_CHOICES).get(
                 instance.user_type,
                 instance.user_type
             )
             
-            # إنشاء إشعارات للمسؤولين
-            for admin_id in admins:
-                try:
-                    admin_user = User.objects.get(id=admin_id)
-                    admin_profile = admin_user.profile
-                    
-                    Notification.objects.create(
-                        recipient=admin_profile,
-                        notification_type='user',
-                        title='مستخدم جديد',
-                        description=f'تم تسجيل مستخدم جديد: {instance.user.username} ({user_type_display})\n📧 البريد: {instance.user.email}',
-                    )
-                except Exception as e:
-                    print(f"Error creating notification for admin {admin_id}: {str(e)}")
+            # إشعار المسؤولين (يُدمج مع إشعارات المستخدمين الجدد غير المقروءة الأخيرة)
+            notify_admins(
+                'new_user', 'user',
+                title='مستخدم جديد',
+                description=f'تم تسجيل مستخدم جديد: {instance.user.username} ({user_type_display})\n📧 البريد: {instance.user.email}',
+                exclude=[instance.pk],
+            )
                     
     except Exception as e:
         print(f"Error creating new user profile notification: {str(e)}")
@@ -359,26 +188,99 @@ def create_new_message_notification(sender, instance, created, **kwargs):
     """
     try:
         if created:
-            # الحصول على جميع المسؤولين (admins و staff)
-            admins = UserProfile.objects.filter(
-                Q(user_type='admin') | Q(user__is_staff=True),
-                user__is_active=True
-            ).values_list('user', flat=True)
-            
-            # إنشاء إشعارات للمسؤولين
-            for admin_id in admins:
-                try:
-                    admin_user = User.objects.get(id=admin_id)
-                    admin_profile = admin_user.profile
-                    
-                    Notification.objects.create(
-                        recipient=admin_profile,
-                        notification_type='message',
-                        title='رسالة تواصل جديدة',
-                        description=f'رسالة جديدة من {instance.name}\n📧 البريد: {instance.email}\n📞 الموضوع: {instance.subject}',
-                    )
-                except Exception as e:
-                    print(f"Error creating notification for admin {admin_id}: {str(e)}")
+            # إشعار المسؤولين (يُدمج مع رسائل التواصل غير المقروءة الأخيرة)
+            notify_admins(
+                'contact_message', 'message',
+                title='رسالة تواصل جديدة',
+                description=f'رسالة جديدة من {instance.name}\n📧 البريد: {instance.email}\n📞 الموضوع: {instance.subject}',
+            )
                     
     except Exception as e:
-        print(f"Error creating new message notification: {str(e)}")
\ No newline at end of file
+        print(f"Error creating new message notification: {str(e)}")
+
+
+# ============ Property side-effect dispatcher ============
+# receiver واحد لـ post_save يقارن الحقول المتتبعة (القيمة عند التحميل مقابل الحالية)
+# ويشغّل المعالجات المعنية فقط بعد تأكيد المعاملة. الحفظ بـ update_fields لا يفحص إلا تلك الحقول.
+
+TRACKED_PROPERTY_FIELDS = ('status', 'is_deleted', 'is_booked', 'owner_id', 'name', 'address', 'description')
+# تغير النص يعيد فحص التكرار (مع الإنشاء والعودة إلى pending)
+DUPLICATE_SCAN_FIELDS = {'name', 'address', 'description'}
+
+
+def _tracked_values(instance):
+    # من __dict__ مباشرة حتى لا تُحمَّل الحقول المؤجلة (.only / .defer) باستعلام
+    return {field: instance.__dict__.get(field) for field in TRACKED_PROPERTY_FIELDS}
+
+
+@receiver(post_init, sender=Property)
+def remember_tracked_fields(sender, instance, **kwargs):
+    instance._tracked_fields = _tracked_values(instance)
+
+
+def property_changes(instance, update_fields=None):
+    """{field: (old, new)} للحقول المتتبعة التي تغيرت منذ التحميل/آخر حفظ"""
+    old = getattr(instance, '_tracked_fields', {})
+    new = _tracked_values(instance)
+    fields = TRACKED_PROPERTY_FIELDS
+    if update_fields is not None:
+        fields = [f for f in fields if f in update_fields or f.removesuffix('_id') in update_fields]
+    return {f: (old.get(f), new[f]) for f in fields if old.get(f) != new[f]}
+
+
+@receiver(post_save, sender=Property)
+def dispatch_property_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """
+    - إنشاء: سجل نشاط + إشعار المسؤولين والمالك
+    - is_deleted من False إلى True: سجل الحذف المنطقي
+    - تغير status / is_deleted / المالك: تحديث عداد الملف العام للمالك
+    - إنشاء / تغير النص / العودة إلى pending: إعادة فحص التكرار في الخلفية
+    """
+    if raw:
+        return
+    changes = {} if created else property_changes(instance, update_fields)
+    instance._tracked_fields = _tracked_values(instance)
+
+    if not instance.is_deleted and (
+        created or DUPLICATE_SCAN_FIELDS & changes.keys() or changes.get('status', (None, None))[1] == 'pending'
+    ):
+        schedule_duplicate_scan(instance.pk)
+
+    handlers = []
+    if created:
+        handlers += [log_property_activity, create_new_property_notification]
+    elif changes.get('is_deleted') == (False, True):
+        handlers.append(log_property_soft_delete)
+
+    owner_ids = set()
+    if created or {'status', 'is_deleted', 'owner_id'} & changes.keys():
+        owner_ids = {instance.owner_id, changes.get('owner_id', (None,))[0]} - {None}
+
+    if not handlers and not owner_ids:
+        return
+
+    def run():
+        for handler in handlers:
+            handler(instance)
+        if owner_ids:
+            refresh_properties_count(owner_ids)
+
+    transaction.on_commit(run)
+
+
+@receiver(post_delete, sender=Property)
+def dispatch_property_deleted(sender, instance, **kwargs):
+    def run():
+        log_property_deletion(instance)
+        if instance.owner_id:
+            refresh_properties_count([instance.owner_id])
+
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def rescan_property_images(sender, instance, raw=False, **kwargs):
+    """تغير صور العقار يعيد فحص التكرار (إبطال وفحص واحد لكل عقار في المعاملة مهما كان عدد الصور)"""
+    if not raw:
+        schedule_duplicate_scan(instance.property_id)
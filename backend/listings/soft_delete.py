@@ -0,0 +1,111 @@
+"""
+حذف منطقي واسترجاع مجموعة عقارات في معاملة واحدة
+UPDATE واحد، وسجلات التدقيق والنشاط بـ bulk_create، وإشعار واحد مجمع للمسؤولين
+"""
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.public_profile import refresh_properties_count
+
+from .activity import property_payload, soft_delete_dedupe_key
+from .audit import property_snapshot, record_property_audits
+from .models import ActivityLog, Property
+from .notification_policy import notify_admins
+
+SOFT_DELETE_ACTIONS = {
+    # action -> (is_deleted قبل العملية، audit action، activity action، عنوان الإشعار المجمع)
+    'delete': (False, 'delete', 'delete_property', 'تم حذف {count} عقار'),
+    'restore': (True, 'restore', 'restore_property', 'تم استرجاع {count} عقار'),
+}
+
+
+class SoftDeleteError(ValueError):
+    """طلب حذف/استرجاع غير صالح"""
+
+
+def bulk_soft_delete(property_ids, performed_by=None, notes='', ip_address=None):
+    return _bulk_apply('delete', property_ids, performed_by, notes, ip_address)
+
+
+def bulk_restore(property_ids, performed_by=None, notes='', ip_address=None):
+    return _bulk_apply('restore', property_ids, performed_by, notes, ip_address)
+
+
+def _bulk_apply(action, property_ids, performed_by, notes, ip_address):
+    """
+    يعيد (المعرفات التي تم تطبيقها، المعرفات المتجاهلة: غير موجودة أو في الحالة المطلوبة مسبقاً)
+    """
+    max_items = getattr(settings, 'BULK_SOFT_DELETE_MAX_ITEMS', 500)
+    requested = list(dict.fromkeys(str(pk) for pk in property_ids))
+    if not requested:
+        raise SoftDeleteError('يجب تحديد عقار واحد على الأقل')
+    if len(requested) > max_items:
+        raise SoftDeleteError(f'الحد الأقصى {max_items} عقار في الطلب الواحد')
+
+    valid_ids = [pk for pk in requested if _is_uuid(pk)]
+    was_deleted, audit_action, activity_action, summary_title = SOFT_DELETE_ACTIONS[action]
+    now = timezone.now()
+
+    with transaction.atomic():
+        properties = list(
+            Property.objects.select_for_update(of=('self',))
+            .filter(pk__in=valid_ids, is_deleted=was_deleted)
+        )
+        applied_ids = [p.pk for p in properties]
+        if not applied_ids:
+            return [], requested
+        snapshots = [property_snapshot(p) for p in properties]
+
+        values = (
+            {'is_deleted': True, 'deleted_at': now, 'deleted_by': performed_by}
+            if action == 'delete' else
+            {'is_deleted': False, 'deleted_at': None, 'deleted_by': None}
+        )
+        Property.objects.filter(pk__in=applied_ids).update(updated_at=now, **values)
+        for property_obj in properties:
+            for field, value in values.items():
+                setattr(property_obj, field, value)
+
+        record_property_audits(
+            zip(properties, snapshots), audit_action,
+            performed_by=performed_by, notes=notes, ip_address=ip_address,
+        )
+        # نفس مفتاح سجل الحذف في destroy/signal فلا يتكرر
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=performed_by,
+                action=activity_action,
+                content_type='property',
+                object_id=str(property_obj.pk),
+                object_name=property_obj.name[:500],
+                payload=property_payload(property_obj, deleted_at=now if action == 'delete' else None, notes=notes),
+                dedupe_key=soft_delete_dedupe_key(property_obj) if action == 'delete' else '',
+                ip_address=ip_address,
+            )
+            for property_obj in properties
+        ], ignore_conflicts=action == 'delete')
+
+        # UPDATE لا يطلق post_save: العدادات والإشعار المجمع بعد التأكيد
+        owner_ids = {p.owner_id for p in properties}
+        transaction.on_commit(lambda: refresh_properties_count(owner_ids))
+        transaction.on_commit(lambda: notify_admins(
+            '', 'property',
+            title=summary_title.format(count=len(applied_ids)),
+            description='\n'.join(p.name for p in properties[:10]) + ('\n…' if len(properties) > 10 else ''),
+            related_user=performed_by,
+            exclude=[performed_by.pk] if performed_by else (),
+        ))
+
+    applied = {str(pk) for pk in applied_ids}
+    return applied_ids, [pk for pk in requested if pk not in applied]
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
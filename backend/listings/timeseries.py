@@ -0,0 +1,172 @@
+"""
+Time-series helpers for analytics endpoints
+تجميع البيانات الزمنية باستعلام واحد (Trunc + GROUP BY) مع ملء الفترات الفارغة
+"""
+import calendar
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import models
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_TIMEZONE = 'Africa/Cairo'
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# الحد الأقصى لعدد الفترات في الاستجابة الواحدة (حماية من from/to واسعة جداً)
+MAX_PERIODS = 2000
+
+
+def floor_period(value, granularity):
+    """تقريب التاريخ/الوقت (المحلي) إلى بداية الفترة"""
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    if isinstance(value, datetime):
+        value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def shift_period(value, granularity, steps=1):
+    """التحرك عدد من الفترات للأمام (أو للخلف بقيمة سالبة)"""
+    if granularity == 'hour':
+        return value + timedelta(hours=steps)
+    if granularity == 'day':
+        return value + timedelta(days=steps)
+    if granularity == 'week':
+        return value + timedelta(weeks=steps)
+    month_index = value.year * 12 + (value.month - 1) + steps
+    year, month = divmod(month_index, 12)
+    day = min(value.day, calendar.monthrange(year, month + 1)[1])
+    return value.replace(year=year, month=month + 1, day=day)
+
+
+def format_period(value, granularity):
+    """تحويل بداية الفترة إلى نص مناسب للواجهة"""
+    if granularity == 'month':
+        return value.strftime('%Y-%m')
+    if granularity == 'hour':
+        return value.strftime('%Y-%m-%dT%H:00')
+    return value.strftime('%Y-%m-%d')
+
+
+def _is_date_field(queryset, field):
+    model_field = queryset.model._meta.get_field(field)
+    return isinstance(model_field, models.DateField) and not isinstance(model_field, models.DateTimeField)
+
+
+def _to_local_naive(value, tz):
+    """تحويل أي قيمة (date / datetime واعٍ بالمنطقة) إلى datetime محلي بدون tzinfo"""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(tz)
+        return value.replace(tzinfo=None)
+    return datetime.combine(value, time.min)
+
+
+def time_series(queryset, field, metric=None, granularity='day', start=None, end=None, tz=DEFAULT_TIMEZONE):
+    """
+    تجميع queryset حسب الفترة الزمنية في استعلام واحد مع ملء الفترات الفارغة بالصفر
+
+    - field: حقل التاريخ/الوقت (DateTimeField أو DateField)
+    - metric: تعبير التجميع (افتراضياً Count('pk'))
+    - granularity: hour / day / week / month
+    - start, end: حدود الفترة (شاملة) كـ date أو datetime
+
+    يعيد قائمة [{'period': <date|datetime محلي>, 'value': <رقم>}, ...]
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'granularity غير مدعوم: {granularity}')
+    if metric is None:
+        metric = Count('pk')
+
+    tzinfo = ZoneInfo(tz) if isinstance(tz, str) else tz
+    date_only = _is_date_field(queryset, field)
+    if date_only and granularity == 'hour':
+        raise ValueError('لا يمكن التجميع بالساعة على حقل تاريخ فقط')
+
+    now_local = timezone.now().astimezone(tzinfo).replace(tzinfo=None)
+    end_local = _to_local_naive(end, tzinfo) if end is not None else now_local
+    start_local = _to_local_naive(start, tzinfo) if start is not None else end_local
+    if start_local > end_local:
+        raise ValueError('تاريخ البداية يجب أن يكون قبل تاريخ النهاية')
+
+    first_period = floor_period(start_local, granularity)
+    last_period = floor_period(end_local, granularity)
+    stop = shift_period(last_period, granularity)
+
+    if date_only:
+        lower, upper = first_period.date(), stop.date()
+        trunc = GRANULARITIES[granularity](field, output_field=models.DateField())
+    else:
+        lower, upper = first_period.replace(tzinfo=tzinfo), stop.replace(tzinfo=tzinfo)
+        trunc = GRANULARITIES[granularity](field, tzinfo=tzinfo)
+
+    rows = (
+        queryset.filter(**{f'{field}__gte': lower, f'{field}__lt': upper})
+        .annotate(period=trunc)
+        .values('period')
+        .annotate(value=metric)
+        .order_by('period')
+    )
+    values_by_period = {_to_local_naive(row['period'], tzinfo): row['value'] for row in rows}
+
+    series = []
+    current = first_period
+    while current < stop:
+        if len(series) >= MAX_PERIODS:
+            raise ValueError(f'عدد الفترات يتجاوز الحد المسموح ({MAX_PERIODS})')
+        series.append({
+            'period': current.date() if date_only else current,
+            'value': values_by_period.get(current) or 0,
+        })
+        current = shift_period(current, granularity)
+    return series
+
+
+def _parse_bound(raw, tzinfo, end_of_day=False):
+    try:
+        day = parse_date(raw)
+        value = None if day else parse_datetime(raw)
+    except ValueError:
+        day = value = None
+    if day is not None:
+        return datetime.combine(day, time.max if end_of_day else time.min, tzinfo=tzinfo)
+    if value is None:
+        raise ValueError(f'صيغة تاريخ غير صحيحة: {raw}')
+    return value if timezone.is_aware(value) else value.replace(tzinfo=tzinfo)
+
+
+def parse_time_series_params(params, default_granularity='day', default_periods=30, tz=DEFAULT_TIMEZONE):
+    """
+    قراءة ?granularity=&from=&to= من query params
+
+    إذا لم يتم تحديد from يتم الرجوع default_periods فترة من تاريخ النهاية.
+    يعيد (granularity, start, end) ويرفع ValueError عند وجود قيمة غير صحيحة.
+    """
+    tzinfo = ZoneInfo(tz)
+    granularity = params.get('granularity') or default_granularity
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity يجب أن يكون أحد: {', '.join(GRANULARITIES)}")
+
+    raw_to = params.get('to')
+    raw_from = params.get('from')
+    end = _parse_bound(raw_to, tzinfo, end_of_day=True) if raw_to else timezone.now().astimezone(tzinfo)
+    if raw_from:
+        start = _parse_bound(raw_from, tzinfo)
+    else:
+        local_end = end.astimezone(tzinfo).replace(tzinfo=None)
+        start = shift_period(floor_period(local_end, granularity), granularity, -(max(default_periods, 1) - 1))
+        start = start.replace(tzinfo=tzinfo)
+    return granularity, start, end
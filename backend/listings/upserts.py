@@ -0,0 +1,48 @@
+"""
+Counter upserts
+INSERT ... ON CONFLICT DO UPDATE لزيادة العدادات دفعة واحدة (PostgreSQL و SQLite >= 3.24)
+"""
+from django.db import connections, router
+
+
+def upsert_increment(model, rows, unique_fields, increment_fields, replace_fields=(), insert_fields=(), using=None):
+    """
+    إدراج الصفوف أو زيادة عداداتها إذا كانت موجودة في استعلام واحد
+
+    - rows: قائمة dicts تحتوي unique_fields + increment_fields + replace_fields
+    - increment_fields: تُجمع مع القيمة الحالية (col = col + EXCLUDED.col)
+    - replace_fields: تُستبدل بالقيمة الجديدة (col = EXCLUDED.col)
+    - insert_fields: تُكتب عند الإدراج فقط (مثل first_visited)
+    """
+    if not rows:
+        return 0
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    table = quote(opts.db_table)
+
+    def column(name):
+        return quote(opts.get_field(name).column)
+
+    names = list(unique_fields) + list(increment_fields) + list(replace_fields) + list(insert_fields)
+    fields = [opts.get_field(name) for name in names]
+    columns = [column(name) for name in names]
+
+    assignments = [f'{column(n)} = {table}.{column(n)} + EXCLUDED.{column(n)}' for n in increment_fields]
+    assignments += [f'{column(n)} = EXCLUDED.{column(n)}' for n in replace_fields]
+    conflict = ', '.join(column(n) for n in unique_fields)
+
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    params = []
+    for row in rows:
+        params.extend(field.get_db_prep_save(row[name], connection) for field, name in zip(fields, names))
+
+    sql = (
+        f'INSERT INTO {table} ({", ".join(columns)}) '
+        f'VALUES {", ".join([row_placeholder] * len(rows))} '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET {", ".join(assignments)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return len(rows)
@@ -0,0 +1,58 @@
+"""
+User-agent classification
+تصنيف User-Agent (نوع الجهاز + كشف البوتات) بتعبير منتظم واحد مُجمَّع مسبقاً
+مع LRU cache على نص الـ UA (المتصفحات الشائعة تتكرر كثيراً)
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+UserAgentInfo = namedtuple('UserAgentInfo', ['device_type', 'is_bot'])
+
+# الحد الأقصى لطول الـ UA المستخدم كمفتاح للكاش
+MAX_USER_AGENT_LENGTH = 512
+
+# "bot" في نهاية كلمة (Googlebot, AhrefsBot/) إلا هواتف CUBOT؛ preview / uptime / monitor ككلمات كاملة فقط
+_TOKENS = re.compile(
+    r'(?P<bot>(?<!cu)bot\b|crawl|spider|slurp|mediapartners|facebookexternalhit|embedly|'
+    r'\bpreview\b|bingpreview|headless|phantomjs|lighthouse|pingdom|statuscake|site24x7|'
+    r'\buptime\b|\bmonitor(?:ing)?\b|curl/|wget/|'
+    r'python-requests|python-urllib|aiohttp|httpx|go-http-client|java/|okhttp|axios/|node-fetch|'
+    r'postman|insomnia|scrapy|httpclient|libwww)'
+    r'|(?P<tablet>ipad|tablet|kindle|silk/|playbook|nexus (?:7|9|10)\b|sm-t\d|gt-p\d|\btab\b)'
+    r'|(?P<mobile>mobi|iphone|ipod|windows phone|blackberry|bb10|opera mini|iemobile)'
+    r'|(?P<android>android)'
+    r'|(?P<desktop>windows nt|macintosh|mac os x|x11|linux|cros)',
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def _classify(user_agent):
+    if not user_agent:
+        # الطلبات بدون User-Agent تأتي من سكربتات وليست متصفحات
+        return UserAgentInfo('unknown', True)
+
+    found = {match.lastgroup for match in _TOKENS.finditer(user_agent)}
+    if 'bot' in found:
+        return UserAgentInfo('unknown', True)
+    if 'tablet' in found:
+        return UserAgentInfo('tablet', False)
+    if 'mobile' in found:
+        # iPad بنظام iPadOS يرسل Macintosh ولا يمكن تمييزه هنا
+        return UserAgentInfo('mobile', False)
+    if 'android' in found:
+        # Android بدون "Mobile" = تابلت (حسب توصية Google)
+        return UserAgentInfo('tablet', False)
+    if 'desktop' in found:
+        return UserAgentInfo('desktop', False)
+    return UserAgentInfo('unknown', False)
+
+
+def classify_user_agent(user_agent):
+    """تصنيف User-Agent إلى (device_type, is_bot)"""
+    return _classify((user_agent or '')[:MAX_USER_AGENT_LENGTH])
+
+
+def is_bot(user_agent):
+    return classify_user_agent(user_agent).is_bot
@@ -0,0 +1,101 @@
+"""
+Hourly property-view rollups and spike alerts
+تجميع المشاهدات في PropertyViewBucket (صف لكل عقار/ساعة) واكتشاف الارتفاع المفاجئ
+في المشاهدات لإرسال إشعار 'view' لمالك العقار
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .models import Notification, Property, PropertyViewBucket
+from .timeseries import time_series
+from .upserts import upsert_increment
+
+logger = logging.getLogger(__name__)
+
+# عدد الساعات السابقة المستخدمة كخط أساس للمقارنة
+BASELINE_HOURS = 24
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def record_view_buckets(views_by_property, when):
+    """زيادة عداد الساعة الحالية لكل عقار في الدفعة (upsert واحد)"""
+    hour = floor_hour(when)
+    upsert_increment(
+        PropertyViewBucket,
+        [{'property': pk, 'hour': hour, 'views': views} for pk, views in views_by_property.items()],
+        unique_fields=('property', 'hour'),
+        increment_fields=('views',),
+    )
+
+
+def _is_spike(current, baseline):
+    """الساعة الحالية أعلى من المتوسط بعامل VIEW_SPIKE_MULTIPLIER وفوق حد أدنى ثابت"""
+    minimum = getattr(settings, 'VIEW_SPIKE_MIN_VIEWS', 20)
+    multiplier = getattr(settings, 'VIEW_SPIKE_MULTIPLIER', 3.0)
+    return current >= minimum and current >= multiplier * max(baseline, 1.0)
+
+
+def detect_view_spikes(property_ids, when):
+    """
+    مقارنة مشاهدات الساعة الحالية بمتوسط آخر 24 ساعة للعقارات التي وصلتها مشاهدات
+    (استعلام واحد للـ buckets) مع فترة تهدئة لتجنب تكرار الإشعار
+    """
+    hour = floor_hour(when)
+    buckets = PropertyViewBucket.objects.filter(
+        property_id__in=property_ids,
+        hour__gte=hour - timedelta(hours=BASELINE_HOURS),
+    ).values_list('property_id', 'hour', 'views')
+
+    current, history = {}, {}
+    for pk, bucket_hour, views in buckets:
+        if bucket_hour == hour:
+            current[pk] = views
+        else:
+            history[pk] = history.get(pk, 0) + views
+
+    spiking = {
+        pk: views for pk, views in current.items()
+        if _is_spike(views, history.get(pk, 0) / BASELINE_HOURS)
+    }
+    if not spiking:
+        return []
+
+    cooldown = timedelta(hours=getattr(settings, 'VIEW_SPIKE_COOLDOWN_HOURS', 24))
+    recently_notified = set(
+        Notification.objects.filter(
+            notification_type='view',
+            related_property_id__in=list(spiking),
+            created_at__gte=when - cooldown,
+        ).values_list('related_property_id', flat=True)
+    )
+
+    properties = Property.objects.filter(
+        pk__in=[pk for pk in spiking if pk not in recently_notified],
+        owner__isnull=False, is_deleted=False,
+    ).only('pk', 'name', 'owner_id')
+    notifications = [
+        Notification(
+            recipient_id=prop.owner_id,
+            notification_type='view',
+            title='مشاهدات عالية على عقارك',
+            description=f'حصل عقارك "{prop.name}" على {spiking[prop.pk]} مشاهدة خلال الساعة الأخيرة',
+            related_property=prop,
+        )
+        for prop in properties
+    ]
+    Notification.objects.bulk_create(notifications)
+    return notifications
+
+
+def view_history(prop, granularity='day', start=None, end=None):
+    """مشاهدات العقار لكل فترة من الـ buckets (بدون مسح أحداث خام)"""
+    return time_series(
+        PropertyViewBucket.objects.filter(property=prop), 'hour',
+        metric=Sum('views'), granularity=granularity, start=start, end=end,
+    )
@@ -5,16 +5,25 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.utils import timezone
-from datetime import timedelta
 from django.db import models
 
+from backend_project.db_router import ReplicaReadMixin
+from backend_project.throttling import GCRAClientRateThrottle
+
 from ..models import ActivityLog, Transaction, Visitor
 from ..serializers import ActivityLogSerializer, TransactionSerializer, VisitorSerializer, DashboardSummarySerializer
 from ..analytics import DashboardAnalytics
+from ..timeseries import format_period, parse_time_series_params
+from ..price_index import ensure_fresh
+from ..visitor_sketch import unique_visitors_series, unique_visitors_today
 from .utils import get_client_ip
 
 
+class VisitRateThrottle(GCRAClientRateThrottle):
+    """حد تسجيل الزيارات لكل IP (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['visit'])"""
+    scope = 'visit'
+
+
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet لعرض وتحليل سجلات نشاط المستخدمين
@@ -60,7 +69,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class DashboardAnalyticsViewSet(viewsets.ViewSet):
+class DashboardAnalyticsViewSet(ReplicaReadMixin, viewsets.ViewSet):
     """
     ViewSet شامل لإحصائيات لوحة التحكم
     
@@ -74,7 +83,7 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
     - /analytics/recent_activities/ - آخر الأنشطة
     - /analytics/top_properties/?limit=5 - أكثر العقارات مشاهدة
     - /analytics/price_distribution/ - توزيع الأسعار
-    - /analytics/daily_activity/?days=30 - النشاط اليومي
+    - /analytics/daily_activity/?days=30 - النشاط اليومي (أو ?granularity=hour|day|week|month&from=&to=)
     - /analytics/contact_messages/ - إحصائيات الرسائل
     - /analytics/top_owners/ - أفضل المالكين
     - /analytics/device_stats/ - إحصائيات أنواع الأجهزة
@@ -108,10 +117,15 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def users(self, request):
-        """إحصائيات المستخدمين"""
+        """إحصائيات المستخدمين (?granularity=&from=&to= لسلسلة التسجيلات)"""
         try:
-            data = DashboardAnalytics.get_user_stats()
+            granularity, start, end = parse_time_series_params(
+                request.query_params, default_granularity='month', default_periods=6
+            )
+            data = DashboardAnalytics.get_user_stats(granularity=granularity, start=start, end=end)
             return Response(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -154,30 +168,63 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def top_properties(self, request):
-        """أكثر العقارات مشاهدة"""
+        """أكثر العقارات مشاهدة (?kind=views|trending)"""
         try:
             limit = request.query_params.get('limit', 5)
-            data = DashboardAnalytics.get_top_properties(limit=int(limit))
+            kind = request.query_params.get('kind', 'views')
+            data = DashboardAnalytics.get_top_properties(limit=int(limit), kind=kind)
             return Response(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
     def price_distribution(self, request):
-        """توزيع الأسعار"""
+        """توزيع الأسعار (?pricing=monthly|daily)"""
+        try:
+            pricing = request.query_params.get('pricing', 'monthly')
+            if pricing not in ('monthly', 'daily'):
+                return Response({'error': 'pricing يجب أن يكون monthly أو daily'}, status=status.HTTP_400_BAD_REQUEST)
+            data = DashboardAnalytics.get_price_distribution(pricing=pricing)
+            return Response(data)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['get'])
+    def price_index(self, request):
+        """مؤشر أسعار المناطق (?area=&usage_type=)"""
         try:
-            data = DashboardAnalytics.get_price_distribution()
+            ensure_fresh()
+            data = DashboardAnalytics.get_area_price_index(
+                area_id=request.query_params.get('area'),
+                usage_type=request.query_params.get('usage_type'),
+            )
+            return Response(data)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['get'])
+    def transactions(self, request):
+        """إحصائيات الصفقات (توزيعات ونسب مئوية)"""
+        try:
+            data = DashboardAnalytics.get_transaction_stats()
             return Response(data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
     def daily_activity(self, request):
-        """النشاط اليومي"""
+        """النشاط اليومي (?days= أو ?granularity=&from=&to=)"""
         try:
-            days = request.query_params.get('days', 30)
-            data = DashboardAnalytics.get_daily_activity(days=int(days))
+            days = int(request.query_params.get('days', 30))
+            granularity, start, end = parse_time_series_params(
+                request.query_params, default_granularity='day', default_periods=days
+            )
+            data = DashboardAnalytics.get_daily_activity(granularity=granularity, start=start, end=end)
             return Response(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -209,9 +256,19 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
             return Response(data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['get'])
+    def geo_stats(self, request):
+        """توزيع الزوار حسب الدولة والمدينة"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+            data = DashboardAnalytics.get_geo_stats(limit=limit)
+            return Response(data)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet لإدارة الصفقات والأرباح
     
@@ -233,6 +290,8 @@ class TransactionViewSet(viewsets.ModelViewSet):
     search_fields = ['property_name', 'region', 'customer_name', 'customer_phone']
     ordering_fields = ['profit', 'created_at', 'rent_price']
     ordering = ['-created_at']
+    # التجميعات تُقرأ من النسخة المتماثلة
+    replica_actions = {'statistics', 'by_property_type', 'by_region', 'by_account_type'}
     
     def get_queryset(self):
         """جلب الصفقات"""
@@ -354,7 +413,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class VisitorViewSet(viewsets.ViewSet):
+class VisitorViewSet(ReplicaReadMixin, viewsets.ViewSet):
     """
     ViewSet لتتبع الزوار والإحصائيات
     
@@ -385,32 +444,21 @@ class VisitorViewSet(viewsets.ViewSet):
         serializer = VisitorSerializer(visitors, many=True)
         return Response(serializer.data)
     
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], throttle_classes=[VisitRateThrottle])
     def record_visit(self, request):
-        """تسجيل زائر"""
-        try:
-            ip_address = get_client_ip(request)
-            user_agent = request.META.get('HTTP_USER_AGENT', '')
-            
-            visitor = Visitor.record_visitor(ip_address, user_agent)
-            serializer = VisitorSerializer(visitor)
-            
-            return Response({
-                'message': 'تم تسجيل الزائر بنجاح',
-                'visitor': serializer.data
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """
+        تسجيل زائر (يُضاف للدفعة ويُرد فوراً بـ 204)
+        الكتابة خلال VISIT_BUFFER_MAX_AGE_SECONDS، انظر listings.visitors
+        """
+        ip_address = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+        Visitor.record_visitor(ip_address, user_agent)
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def today_count(self, request):
-        """عدد الزوار اليوم"""
-        today = timezone.now().date()
-        count = Visitor.objects.filter(first_visited__date=today).count()
-        return Response({'visitors_today': count})
+        """عدد الزوار الفريدين اليوم (من ملخص اليوم)"""
+        return Response({'visitors_today': unique_visitors_today()})
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def total_count(self, request):
@@ -424,35 +472,24 @@ class VisitorViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def daily_stats(self, request):
-        """إحصائيات الزوار اليومية (زوار فريدين لكل يوم)"""
+        """إحصائيات الزوار الفريدين لكل فترة (?days= أو ?granularity=&from=&to=)"""
         try:
-            days = int(request.query_params.get('days', 30))
-            if days < 1:
-                days = 1
-
-            today = timezone.now().date()
-            start_date = today - timedelta(days=days - 1)
-
-            queryset = (
-                Visitor.objects.filter(first_visited__date__gte=start_date)
-                .values('first_visited__date')
-                .annotate(visitors=models.Count('id'))
+            days = max(int(request.query_params.get('days', 30)), 1)
+            granularity, start, end = parse_time_series_params(
+                request.query_params, default_granularity='day', default_periods=days
             )
-
-            counts_by_date = {
-                str(item['first_visited__date']): item['visitors'] for item in queryset
-            }
-
-            data = []
-            for i in range(days):
-                current_date = start_date + timedelta(days=i)
-                key = str(current_date)
-                data.append({
-                    'date': key,
-                    'visitors': counts_by_date.get(key, 0)
-                })
-
+            series = unique_visitors_series(granularity=granularity, start=start, end=end)
+            data = [
+                {
+                    'date': format_period(point['period'], granularity),
+                    'visitors': point['value'],
+                    'visits': point['visits'],
+                }
+                for point in series
+            ]
             return Response({'results': data})
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {'error': str(e)},
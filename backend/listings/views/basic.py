@@ -5,7 +5,7 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAdminUser
-from rest_framework.throttling import AnonRateThrottle
+from backend_project.throttling import GCRAAnonRateThrottle
 from django.utils import timezone
 from django.db import models
 
@@ -13,9 +13,9 @@ from ..models import Area, Offer, ContactMessage, Amenity
 from ..serializers import AreaSerializer, OfferSerializer, ContactMessageSerializer, AmenitySerializer
 
 
-class ContactRateThrottle(AnonRateThrottle):
+class ContactRateThrottle(GCRAAnonRateThrottle):
     """Rate limiting for contact message submissions"""
-    rate = '3/minute'
+    scope = 'contact'
 
 
 class AreaViewSet(viewsets.ReadOnlyModelViewSet):
@@ -7,23 +7,54 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Lower
 from datetime import timedelta
 
-from ..models import Property, PropertyImage, PropertyVideo, ActivityLog, PropertyAuditTrail
-from ..serializers import PropertySerializer, PropertyAuditTrailSerializer
+from backend_project.db_router import ReplicaReadMixin
+
+from ..models import Property, PropertyImage, PropertyVideo, PropertyAuditTrail
+from ..serializers import PropertySerializer, PropertyCardSerializer, PropertyAuditTrailSerializer, ModerationQueueSerializer
+from ..leaderboard import get_leaderboard
+from ..view_stats import view_history as property_view_history
+from ..timeseries import format_period, parse_time_series_params
 from ..notifications import (
     send_property_approved_email,
     send_property_rejected_email,
     send_property_submitted_email,
 )
+from ..archive import read_archive
+from ..audit import property_snapshot, reconstruct_property, record_property_audit
+from ..activity import log_activity, property_payload, soft_delete_dedupe_key
+from ..moderation import QUEUE_ORDERINGS, ModerationError, bulk_moderate
+from ..soft_delete import SoftDeleteError, bulk_restore, bulk_soft_delete
 from .utils import get_client_ip
 
 logger = logging.getLogger(__name__)
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class ModerationQueuePagination(CursorPagination):
+    """Keyset pagination لقائمة المراجعة (بدون COUNT)؛ الترتيب يُحدد من QUEUE_ORDERINGS"""
+    page_size = 25
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class AuditTrailPagination(CursorPagination):
+    """سجل التدقيق: keyset على الوقت بدلاً من إرجاع الجدول كاملاً"""
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
+    ordering = ('-timestamp', '-id')
+
+
+class PropertyViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet شامل لإدارة العقارات
     
@@ -40,7 +71,12 @@ class PropertyViewSet(viewsets.ModelViewSet):
     - POST /properties/{id}/resubmit/ - إعادة إرسال عقار مرفوض (المالك)
     - POST /properties/{id}/record_view/ - تسجيل مشاهدة
     - GET /properties/pending/ - العقارات المعلقة (الأدمن)
+    - GET /properties/moderation-queue/ - قائمة المراجعة بالأولوية مع keyset pagination (الأدمن)
+    - POST /properties/bulk-moderate/ - موافقة/رفض مجموعة عقارات (الأدمن)
+    - POST /properties/bulk-delete/ و /properties/bulk-restore/ - حذف منطقي/استرجاع مجموعة عقارات (الأدمن)
     - GET /properties/by-me/ - عقاراتي (المستخدم)
+    - GET /properties/trending/ - الرائج الآن / الأكثر مشاهدة (للعموم)
+    - GET /properties/{id}/view_history/ - مشاهدات العقار بالساعة/اليوم (المالك أو الأدمن)
     
     فلترة البحث:
     - search: اسم، عنوان، منطقة، وصف
@@ -55,12 +91,14 @@ class PropertyViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'address', 'area__name', 'description']
     ordering_fields = ['price', 'created_at', 'size']
     ordering = ['-created_at']
+    # القائمة العامة تُقرأ من النسخة المتماثلة
+    replica_actions = {'list'}
 
     def get_permissions(self):
         """تحديد الأذونات حسب الفعل"""
-        if self.action in ['list', 'retrieve', 'featured']:
+        if self.action in ['list', 'retrieve', 'featured', 'trending']:
             return [AllowAny()]
-        elif self.action in ['pending', 'rejected', 'deleted', 'audit_trail', 'approve', 'reject', 'statistics']:
+        elif self.action in ['pending', 'rejected', 'deleted', 'audit_trail', 'audit_state', 'approve', 'reject', 'statistics', 'bulk_delete', 'bulk_restore', 'bulk_moderate', 'moderation_queue']:
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
@@ -78,10 +116,10 @@ class PropertyViewSet(viewsets.ModelViewSet):
             
             # الصفحة الرئيسية: الجميع (حتى الأدمن) يرى العقارات المعتمدة فقط
             if is_list_view:
-                queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
+                queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
             # صفحة الأدمن والـ Admin Actions: الأدمن يرى جميع العقارات
             elif is_admin:
-                queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(is_deleted=False)
+                queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(is_deleted=False)
             elif self.request.user.is_authenticated:
                 # المستخدم المسجل:
                 user_profile = self.request.user.profile if hasattr(self.request.user, 'profile') else None
@@ -89,25 +127,25 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 if is_detail_request:
                     # عند الوصول إلى عقار محدد: يمكنه الوصول إلى عقاره الخاص أو العقارات المعتمدة (للقراءة)
                     if user_profile:
-                        queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(
+                        queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(
                             (Q(owner=user_profile) | Q(status='approved')) & Q(is_deleted=False)
                         )
                     else:
-                        queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
+                        queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
                 elif self.action == 'destroy':
                     # للحذف: يمكن للمالك حذف عقاره (بدون تصفية بناءً على الحالة)
                     if user_profile:
-                        queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(
+                        queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(
                             owner=user_profile, is_deleted=False
                         )
                     else:
                         queryset = Property.objects.none()
                 else:
                     # في قائمة العقارات: المستخدم يرى فقط العقارات المعتمدة (غير المحذوفة)
-                    queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
+                    queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
             else:
                 # الزائر يرى فقط العقارات المُوافق عليها (غير المحذوفة)
-                queryset = Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
+                queryset = Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
 
             params = self.request.query_params
 
@@ -152,7 +190,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         except Exception as e:
             logger.error(f"Error in get_queryset: {e}")
             # في حالة الخطأ، عرض العقارات المُوافق عليها فقط (غير المحذوفة)
-            return Property.objects.select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
+            return Property.objects.select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos').filter(status='approved', is_deleted=False)
 
     def retrieve(self, request, *args, **kwargs):
         """الحصول على تفاصيل العقار وتسجيل المشاهدة"""
@@ -160,7 +198,8 @@ class PropertyViewSet(viewsets.ModelViewSet):
         
         # تسجيل مشاهدة جديدة
         client_ip = get_client_ip(request)
-        instance.record_view(client_ip)
+        if instance.record_view(client_ip, request.META.get('HTTP_USER_AGENT', '')):
+            instance.views += 1  # المشاهدة تُكتب مع الدفعة التالية
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -192,18 +231,20 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # جميع العقارات الجديدة تبدأ في انتظار المراجعة (pending)
-        property_obj = serializer.save(owner=user_profile, status='pending', submitted_at=timezone.now())
-        
-        # معالجة الصور المرسلة
-        images = request.FILES.getlist('images')
-        for index, image in enumerate(images):
-            PropertyImage.objects.create(property=property_obj, image=image, order=index)
-        
-        # معالجة الفيديوهات المرسلة
-        videos = request.FILES.getlist('videos')
-        for index, video in enumerate(videos):
-            PropertyVideo.objects.create(property=property_obj, video=video, order=index)
+        # معاملة واحدة: فحص التكرار (signals) يُجدول مرة واحدة بعد حفظ العقار وكل صوره
+        with transaction.atomic():
+            # جميع العقارات الجديدة تبدأ في انتظار المراجعة (pending)
+            property_obj = serializer.save(owner=user_profile, status='pending', submitted_at=timezone.now())
+            
+            # معالجة الصور المرسلة
+            images = request.FILES.getlist('images')
+            for index, image in enumerate(images):
+                PropertyImage.objects.create(property=property_obj, image=image, order=index)
+            
+            # معالجة الفيديوهات المرسلة
+            videos = request.FILES.getlist('videos')
+            for index, video in enumerate(videos):
+                PropertyVideo.objects.create(property=property_obj, video=video, order=index)
         
         # إرسال بريد تأكيد الاستقبال
         send_property_submitted_email(property_obj)
@@ -280,35 +321,30 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # حفظ بيانات العقار قبل الحذف (Audit Trail)
-        property_data = PropertySerializer(instance, context={'request': request}).data
+        # لقطة العقار قبل الحذف (Audit Trail)
+        before = property_snapshot(instance)
         
         # حذف منطقي
         instance.is_deleted = True
         instance.deleted_at = timezone.now()
         instance.deleted_by = user_profile
-        instance.save()
+        instance.save(update_fields=['is_deleted', 'deleted_at', 'deleted_by', 'updated_at'])
         
         # تسجيل في Audit Trail
-        PropertyAuditTrail.objects.create(
-            property=instance,
-            action='delete',
+        record_property_audit(
+            instance, before, 'delete',
             performed_by=user_profile,
-            property_data_before=property_data,
-            property_data_after={},
             notes=request.data.get('notes', ''),
             ip_address=get_client_ip(request)
         )
         
-        # تسجيل في ActivityLog
-        ActivityLog.objects.create(
+        # تسجيل في ActivityLog (نفس مفتاح سجل الـ signal فلا يتكرر)
+        log_activity(
+            'delete_property', 'property', instance.id, instance.name,
             user=user_profile,
-            action='delete_property',
-            content_type='property',
-            object_id=str(instance.id),
-            object_name=instance.name,
-            description=f"تم حذف العقار: {instance.name}",
-            ip_address=get_client_ip(request)
+            payload=property_payload(instance, deleted_at=instance.deleted_at, notes=request.data.get('notes', '')),
+            dedupe_key=soft_delete_dedupe_key(instance),
+            ip_address=get_client_ip(request),
         )
         
         return Response(
@@ -326,7 +362,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        properties = Property.objects.filter(owner=user_profile, is_deleted=False).select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos')
+        properties = Property.objects.filter(owner=user_profile, is_deleted=False).select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos')
         serializer = self.get_serializer(properties, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -334,7 +370,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
     def pending(self, request):
         """الحصول على العقارات المعلقة مع فلاتر التاريخ"""
         queryset = Property.objects.filter(status='pending', is_deleted=False).select_related(
-            'area', 'owner', 'owner__user', 'approved_by'
+            'area', 'owner__user', 'approved_by__user'
         ).prefetch_related('images', 'videos')
 
         # فلتر التاريخ
@@ -360,8 +396,10 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 models.Q(owner__user__first_name__icontains=search)
             )
         
-        # الترتيب
+        # الترتيب (قيم مسموحة فقط)
         ordering = request.query_params.get('ordering', '-submitted_at')
+        if ordering not in ('submitted_at', '-submitted_at', 'created_at', '-created_at', 'name', '-name', 'price', '-price'):
+            ordering = '-submitted_at'
         queryset = queryset.order_by(ordering)
         
         serializer = self.get_serializer(queryset, many=True, context={'request': request})
@@ -370,6 +408,45 @@ class PropertyViewSet(viewsets.ModelViewSet):
             'results': serializer.data
         })
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], url_path='moderation-queue')
+    def moderation_queue(self, request):
+        """
+        قائمة المراجعة: ?ordering=priority|oldest|newest&limit=&cursor=
+        فلاتر مفهرسة فقط: area (معرف)، owner (اسم المستخدم)، search (بداية اسم العقار بدون حالة الأحرف)
+        """
+        ordering = request.query_params.get('ordering', 'priority')
+        if ordering not in QUEUE_ORDERINGS:
+            return Response(
+                {'detail': f"ordering يجب أن يكون أحد: {', '.join(QUEUE_ORDERINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = Property.objects.filter(status='pending', is_deleted=False).select_related(
+            'area', 'owner__user'
+        ).prefetch_related('images', 'duplicate_candidates__duplicate_of')
+
+        area = request.query_params.get('area')
+        if area:
+            if not area.isdigit():
+                return Response({'detail': 'area يجب أن يكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(area_id=int(area))
+        owner = request.query_params.get('owner', '').strip()
+        if owner:
+            queryset = queryset.alias(owner_username_lower=Lower('owner__user__username')).filter(
+                owner_username_lower=owner.lower()
+            )
+        search = request.query_params.get('search', '').strip()
+        if search:
+            # property_pending_name_idx على LOWER(name) للعقارات المعلقة
+            queryset = queryset.alias(name_lower=Lower('name')).filter(name_lower__startswith=search.lower())
+
+        paginator = ModerationQueuePagination()
+        paginator.ordering = QUEUE_ORDERINGS[ordering]
+        # view=None: الترتيب من القائمة المسموحة وليس من OrderingFilter الخاص بالـ ViewSet
+        page = paginator.paginate_queryset(queryset, request, view=None)
+        serializer = ModerationQueueSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def approve(self, request, pk=None):
         """الموافقة على عقار"""
@@ -390,7 +467,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         property_obj.approved_by = user_profile
         property_obj.approved_at = timezone.now()
         property_obj.approval_notes = notes
-        property_obj.save()
+        property_obj.save(update_fields=['status', 'approved_by', 'approved_at', 'approval_notes', 'moderation_priority', 'updated_at'])
 
         send_property_approved_email(property_obj)
 
@@ -426,7 +503,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         property_obj.approved_by = user_profile
         property_obj.rejected_at = timezone.now()
         property_obj.approval_notes = notes
-        property_obj.save()
+        property_obj.save(update_fields=['status', 'approved_by', 'rejected_at', 'approval_notes', 'moderation_priority', 'updated_at'])
 
         send_property_rejected_email(property_obj)
 
@@ -436,39 +513,155 @@ class PropertyViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], url_path='bulk-moderate')
+    def bulk_moderate(self, request):
+        """موافقة/رفض مجموعة عقارات معلقة: {ids, action: approve|reject, approval_notes}"""
+        ids = request.data.get('ids') or []
+        if not isinstance(ids, list):
+            return Response({'detail': 'ids يجب أن تكون قائمة'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            applied, skipped = bulk_moderate(
+                ids,
+                request.data.get('action'),
+                notes=(request.data.get('approval_notes') or '').strip(),
+                moderator=getattr(request.user, 'profile', None),
+                ip_address=get_client_ip(request),
+            )
+        except ModerationError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'detail': f'تمت مراجعة {len(applied)} عقار',
+            'applied': [str(pk) for pk in applied],
+            'skipped': skipped,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """حذف منطقي لمجموعة عقارات: {ids, notes}"""
+        return self._bulk_soft_delete_response(request, bulk_soft_delete, 'تم حذف {count} عقار')
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], url_path='bulk-restore')
+    def bulk_restore(self, request):
+        """استرجاع مجموعة عقارات محذوفة: {ids, notes}"""
+        return self._bulk_soft_delete_response(request, bulk_restore, 'تم استرجاع {count} عقار')
+
+    def _bulk_soft_delete_response(self, request, service, message):
+        ids = request.data.get('ids') or []
+        if not isinstance(ids, list):
+            return Response({'detail': 'ids يجب أن تكون قائمة'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            applied, skipped = service(
+                ids,
+                performed_by=getattr(request.user, 'profile', None),
+                notes=(request.data.get('notes') or '').strip(),
+                ip_address=get_client_ip(request),
+            )
+        except SoftDeleteError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'detail': message.format(count=len(applied)),
+            'applied': [str(pk) for pk in applied],
+            'skipped': skipped,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def rejected(self, request):
         """الحصول على العقارات المرفوضة"""
-        properties = Property.objects.filter(status='rejected', is_deleted=False).select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos')
+        properties = Property.objects.filter(status='rejected', is_deleted=False).select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos')
         serializer = self.get_serializer(properties, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def deleted(self, request):
         """الحصول على العقارات المحذوفة"""
-        properties = Property.objects.filter(is_deleted=True).select_related('area', 'owner', 'approved_by', 'deleted_by').prefetch_related('images', 'videos').order_by('-deleted_at')
+        properties = Property.objects.filter(is_deleted=True).select_related('area', 'owner__user', 'approved_by__user', 'deleted_by__user').prefetch_related('images', 'videos').order_by('-deleted_at')
         serializer = self.get_serializer(properties, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def audit_trail(self, request):
-        """الحصول على سجل تدقيق العقارات"""
-        queryset = PropertyAuditTrail.objects.select_related('property', 'performed_by').order_by('-timestamp')
-        
+        """
+        سجل تدقيق العقارات (cursor pagination، الأحدث أولاً)
+        ?archive=1 يقرأ السجلات المؤرشفة بدلاً من الجدول (الأقدم أولاً، ?since=&until= بصيغة YYYY-MM)
+        """
         # فلاتر
         property_id = request.query_params.get('property_id')
         action = request.query_params.get('action')
         user_id = request.query_params.get('user_id')
-        
+
+        if request.query_params.get('archive') in ('1', 'true'):
+            return self._archived_audit_trail(request, property_id, action, user_id)
+
+        queryset = PropertyAuditTrail.objects.select_related('property', 'performed_by__user')
         if property_id:
             queryset = queryset.filter(property_id=property_id)
         if action:
             queryset = queryset.filter(action=action)
         if user_id:
             queryset = queryset.filter(performed_by_id=user_id)
-        
-        serializer = PropertyAuditTrailSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+
+        paginator = AuditTrailPagination()
+        # view=None: ترتيب ثابت بالوقت وليس من OrderingFilter الخاص بالـ ViewSet
+        page = paginator.paginate_queryset(queryset, request, view=None)
+        serializer = PropertyAuditTrailSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    def _archived_audit_trail(self, request, property_id, action, user_id):
+        """قراءة صفحة من ملفات أرشيف التدقيق بمؤشر (شهر:سطر)"""
+        def match(row):
+            return (
+                (not property_id or row['property'] == property_id)
+                and (not action or row['action'] == action)
+                and (not user_id or str(row['performed_by']) == user_id)
+            )
+
+        try:
+            limit = min(int(request.query_params.get('limit', AuditTrailPagination.page_size)), AuditTrailPagination.max_page_size)
+            results, cursor = read_archive(
+                'audit',
+                cursor=request.query_params.get('cursor'),
+                limit=max(limit, 1),
+                match=match,
+                since=request.query_params.get('since'),
+                until=request.query_params.get('until'),
+            )
+        except ValueError:  # ArchiveError أو limit غير رقمي
+            return Response({'detail': 'مؤشر الأرشيف أو limit غير صحيح'}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+        return Response({'next': next_url, 'previous': None, 'results': results})
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def audit_state(self, request):
+        """حالة العقار في وقت معين معاد بناؤها من سجل التدقيق (?property_id=&at=ISO)"""
+        property_id = request.query_params.get('property_id')
+        if not property_id:
+            return Response({'detail': 'يجب تحديد property_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        at = None
+        raw_at = request.query_params.get('at')
+        if raw_at:
+            at = parse_datetime(raw_at)
+            if at is None:
+                return Response({'detail': 'صيغة at غير صحيحة (ISO 8601)'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        try:
+            state = reconstruct_property(property_id, at)
+        except (ValueError, ValidationError):
+            return Response({'detail': 'property_id غير صحيح'}, status=status.HTTP_400_BAD_REQUEST)
+        if state is None:
+            return Response({'detail': 'لا توجد لقطة تدقيق لهذا العقار حتى هذا الوقت'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'property_id': property_id,
+            'at': (at or timezone.now()).isoformat(),
+            'state': state,
+        })
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def rejected_by_me(self, request):
@@ -484,7 +677,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
             owner=user_profile,
             status='rejected',
             is_deleted=False
-        ).select_related('area', 'owner', 'approved_by').prefetch_related('images', 'videos')
+        ).select_related('area', 'owner__user', 'approved_by__user').prefetch_related('images', 'videos')
         serializer = self.get_serializer(properties, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -512,11 +705,15 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        property_obj.resubmission_count += 1
         property_obj.status = 'pending'
         property_obj.submitted_at = timezone.now()
         property_obj.approved_by = None
         property_obj.approval_notes = ''
-        property_obj.save()
+        property_obj.save(update_fields=[
+            'status', 'submitted_at', 'approved_by', 'approval_notes',
+            'resubmission_count', 'moderation_priority', 'updated_at',
+        ])
 
         serializer = self.get_serializer(property_obj)
         return Response({
@@ -548,11 +745,16 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if property_obj.status == 'rejected':
+            property_obj.resubmission_count += 1
         property_obj.status = 'pending'
         property_obj.submitted_at = timezone.now()
         property_obj.approved_by = None
         property_obj.approval_notes = ''
-        property_obj.save()
+        property_obj.save(update_fields=[
+            'status', 'submitted_at', 'approved_by', 'approval_notes',
+            'resubmission_count', 'moderation_priority', 'updated_at',
+        ])
 
         # إرسال بريد تأكيد الاستقبال
         send_property_submitted_email(property_obj)
@@ -590,7 +792,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         property_obj.booked_by = user_profile
         # مسح وقت انتهاء العرض المحدود (لن يظهر عد تنازلي عندما يكون محجوزاً)
         property_obj.booking_expires_at = None
-        property_obj.save()
+        property_obj.save(update_fields=['is_booked', 'booked_at', 'booked_by', 'booking_expires_at', 'updated_at'])
 
         serializer = self.get_serializer(property_obj)
         return Response({
@@ -626,7 +828,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         property_obj.booked_by = None
         # تعيين مدة العرض المحدود (48 ساعة) - سيظهر العد التنازلي عندما يكون العقار متاحاً
         property_obj.booking_expires_at = timezone.now() + timedelta(hours=48)
-        property_obj.save()
+        property_obj.save(update_fields=['is_booked', 'booked_at', 'booked_by', 'booking_expires_at', 'updated_at'])
 
         serializer = self.get_serializer(property_obj)
         return Response({
@@ -642,6 +844,50 @@ class PropertyViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(qs, many=True, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def view_history(self, request, pk=None):
+        """مشاهدات العقار لكل فترة (?granularity=hour|day|week|month&from=&to=) - المالك أو الأدمن"""
+        prop = Property.objects.filter(pk=pk, is_deleted=False).select_related('owner').first()
+        if prop is None:
+            return Response({'detail': 'العقار غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+        is_admin = request.user.is_staff or request.user.is_superuser
+        user_profile = getattr(request.user, 'profile', None)
+        if not is_admin and (user_profile is None or prop.owner_id != user_profile.pk):
+            return Response(
+                {'detail': 'ليس لديك صلاحية الوصول لهذه البيانات'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            granularity, start, end = parse_time_series_params(
+                request.query_params, default_granularity='day', default_periods=30
+            )
+            series = property_view_history(prop, granularity=granularity, start=start, end=end)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'property_id': str(prop.pk),
+            'total_views': prop.views,
+            'granularity': granularity,
+            'results': [
+                {'period': format_period(point['period'], granularity), 'views': point['value']}
+                for point in series
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """الرائج الآن (?kind=trending|views&limit=)"""
+        kind = request.query_params.get('kind', 'trending')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+            properties = get_leaderboard(kind=kind, limit=limit)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = PropertyCardSerializer(properties, many=True, context={'request': request})
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """إحصائيات العقارات"""
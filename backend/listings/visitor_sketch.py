@@ -0,0 +1,163 @@
+"""
+Daily unique visitors (HyperLogLog)
+صف واحد لكل (يوم، نوع جهاز) يحتوي 4096 سجل HLL (4KB) مبنية على IP مُجزَّأ بمفتاح سري.
+الزوار الفريدون ليوم أو أسبوع أو شهر = دمج السجلات بـ max ثم التقدير (خطأ ~1.6%).
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailyVisitorSketch
+from .timeseries import floor_period, shift_period, MAX_PERIODS
+
+PRECISION = 12
+REGISTER_COUNT = 1 << PRECISION
+_REST_BITS = 64 - PRECISION
+
+
+def empty_registers():
+    return np.zeros(REGISTER_COUNT, dtype=np.uint8)
+
+
+def _hash_key():
+    return hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+
+
+def hash_ip(ip_address, key=None):
+    """بصمة 64-bit للـ IP (لا يُخزَّن العنوان نفسه في الملخص)"""
+    digest = hashlib.blake2b(ip_address.encode(), digest_size=8, key=key or _hash_key()).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def add_hashes(registers, hashes):
+    """إضافة بصمات إلى السجلات (in-place)"""
+    if not hashes:
+        return registers
+    index = np.fromiter((h >> _REST_BITS for h in hashes), dtype=np.int64, count=len(hashes))
+    rest_mask = (1 << _REST_BITS) - 1
+    rank = np.fromiter(
+        (_REST_BITS - (h & rest_mask).bit_length() + 1 for h in hashes),
+        dtype=np.uint8, count=len(hashes),
+    )
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+def estimate(registers):
+    """تقدير عدد العناصر الفريدة (مع linear counting للأعداد الصغيرة)"""
+    m = float(REGISTER_COUNT)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return int(round(m * np.log(m / zeros)))
+    return int(round(raw))
+
+
+def _from_db(value):
+    registers = np.frombuffer(bytes(value), dtype=np.uint8) if value else b''
+    return registers.copy() if len(registers) == REGISTER_COUNT else empty_registers()
+
+
+def record_visits(visits):
+    """
+    إضافة دفعة زيارات [(ip, device_type, visited_at, count)] إلى ملخصات الأيام
+    (صف مقفل لكل (يوم، جهاز) ثم دمج بـ max وكتابة واحدة)
+    """
+    if not visits:
+        return
+    key = _hash_key()
+    batch = {}
+    for ip_address, device_type, visited_at, count in visits:
+        day = timezone.localdate(visited_at)
+        hashes, total = batch.get((day, device_type), ([], 0))
+        hashes.append(hash_ip(ip_address, key))
+        batch[(day, device_type)] = (hashes, total + count)
+
+    with transaction.atomic():
+        DailyVisitorSketch.objects.bulk_create(
+            [DailyVisitorSketch(day=day, device_type=device, registers=empty_registers().tobytes()) for day, device in batch],
+            ignore_conflicts=True,
+        )
+        days = {day for day, _ in batch}
+        sketches = DailyVisitorSketch.objects.select_for_update().filter(day__in=days)
+        updated = []
+        for sketch in sketches:
+            entry = batch.get((sketch.day, sketch.device_type))
+            if entry is None:
+                continue
+            hashes, total = entry
+            sketch.registers = add_hashes(_from_db(sketch.registers), hashes).tobytes()
+            sketch.visits += total
+            sketch.updated_at = timezone.now()
+            updated.append(sketch)
+        DailyVisitorSketch.objects.bulk_update(updated, ['registers', 'visits', 'updated_at'])
+
+
+def unique_visitors(start_day, end_day, device_type=None):
+    """عدد الزوار الفريدين بين يومين (شاملين) لكل الأجهزة أو لجهاز واحد"""
+    sketches = DailyVisitorSketch.objects.filter(day__gte=start_day, day__lte=end_day)
+    if device_type:
+        sketches = sketches.filter(device_type=device_type)
+    merged = empty_registers()
+    for registers in sketches.values_list('registers', flat=True):
+        np.maximum(merged, _from_db(registers), out=merged)
+    return estimate(merged)
+
+
+def _local_day(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def unique_visitors_series(granularity='day', start=None, end=None):
+    """
+    الزوار الفريدون لكل فترة (day / week / month) من ملخصات الأيام
+    يعيد [{'period': date, 'value': int, 'visits': int}] مع ملء الفترات الفارغة
+    """
+    if granularity == 'hour':
+        raise ValueError('لا يمكن التجميع بالساعة على ملخصات يومية')
+    end_day = _local_day(end) if end is not None else timezone.localdate()
+    start_day = _local_day(start) if start is not None else end_day
+    if start_day > end_day:
+        raise ValueError('تاريخ البداية يجب أن يكون قبل تاريخ النهاية')
+
+    first = floor_period(start_day, granularity)
+    stop = shift_period(floor_period(end_day, granularity), granularity)
+
+    periods = {}
+    rows = DailyVisitorSketch.objects.filter(day__gte=first, day__lt=stop).values_list('day', 'registers', 'visits')
+    for day, registers, visits in rows:
+        period = floor_period(day, granularity)
+        merged, total = periods.get(period, (None, 0))
+        merged = _from_db(registers) if merged is None else np.maximum(merged, _from_db(registers))
+        periods[period] = (merged, total + visits)
+
+    series = []
+    current = first
+    while current < stop:
+        if len(series) >= MAX_PERIODS:
+            raise ValueError(f'عدد الفترات يتجاوز الحد المسموح ({MAX_PERIODS})')
+        merged, total = periods.get(current, (None, 0))
+        series.append({
+            'period': current,
+            'value': estimate(merged) if merged is not None else 0,
+            'visits': total,
+        })
+        current = shift_period(current, granularity)
+    return series
+
+
+def unique_visitors_today():
+    today = timezone.localdate()
+    return unique_visitors(today, today)
+
+
+def unique_visitors_last_days(days):
+    today = timezone.localdate()
+    return unique_visitors(today - timedelta(days=days - 1), today)
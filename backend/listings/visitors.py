@@ -0,0 +1,84 @@
+"""
+Batched visitor ingestion
+زيارات الموقع تُجمَّع في الذاكرة حسب IP وتُكتب كـ upsert واحد لكل دفعة:
+INSERT ... ON CONFLICT (ip_address) DO UPDATE SET visit_count = visit_count + n
+مع تحديث ملخص الزوار الفريدين لليوم (visitor_sketch) في نفس المعاملة
+والدولة/المدينة تُحدَّد للدفعة كاملة من قاعدة GeoIP المحلية عند الإدراج
+الزيارة تُكتب خلال VISIT_BUFFER_MAX_AGE_SECONDS حتى بدون زيارات لاحقة (خيط الـ flusher في buffers)،
+والقتل المفاجئ للـ worker يفقد فقط زيارات آخر VISIT_BUFFER_MAX_AGE_SECONDS ثانية
+"""
+import ipaddress
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .buffers import BatchBuffer
+from .geoip import lookup_many
+from .models import Visitor
+from .upserts import upsert_increment
+from .user_agents import classify_user_agent
+from .visitor_sketch import record_visits
+
+
+def _merge_visits(old, new):
+    """جمع عدد الزيارات والاحتفاظ بآخر بيانات متصفح ووقت"""
+    return {
+        'visit_count': old['visit_count'] + new['visit_count'],
+        'user_agent': new['user_agent'],
+        'device_type': new['device_type'],
+        'first_visited': old['first_visited'],
+        'last_visited': new['last_visited'],
+    }
+
+
+def flush_visits(items):
+    """كتابة دفعة الزيارات في استعلام upsert واحد"""
+    ips = list(items)
+    rows = [
+        {'ip_address': ip, 'country': country, 'city': city, **items[ip]}
+        for ip, (country, city) in zip(ips, lookup_many(ips))
+    ]
+    with transaction.atomic():
+        upsert_increment(
+            Visitor,
+            rows,
+            unique_fields=('ip_address',),
+            increment_fields=('visit_count',),
+            replace_fields=('user_agent', 'device_type', 'last_visited'),
+            insert_fields=('first_visited', 'country', 'city'),
+        )
+        record_visits([
+            (ip, visit['device_type'], visit['last_visited'], visit['visit_count'])
+            for ip, visit in items.items()
+        ])
+
+
+visit_buffer = BatchBuffer(
+    'visitors',
+    flush_visits,
+    _merge_visits,
+    max_items=getattr(settings, 'VISIT_BUFFER_MAX_ITEMS', 500),
+    max_age=getattr(settings, 'VISIT_BUFFER_MAX_AGE_SECONDS', 10),
+)
+
+
+def enqueue_visit(ip_address, user_agent=''):
+    """إضافة زيارة للمخزن المؤقت (بدون أي استعلام لقاعدة البيانات) - يعيد False للبوتات"""
+    agent = classify_user_agent(user_agent)
+    if agent.is_bot:
+        return False
+    try:
+        # عنوان غير صالح (مثلاً من X-Forwarded-For) يُفشل الدفعة كاملة على PostgreSQL
+        ip_address = str(ipaddress.ip_address((ip_address or '').strip()))
+    except ValueError:
+        return False
+    now = timezone.now()
+    visit_buffer.add(ip_address, {
+        'visit_count': 1,
+        'user_agent': user_agent,
+        'device_type': agent.device_type,
+        'first_visited': now,
+        'last_visited': now,
+    })
+    return True
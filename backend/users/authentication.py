@@ -0,0 +1,102 @@
+"""
+Cached token authentication
+Resolves token -> user -> profile in a single select_related query and keeps the
+result in a short-TTL in-process LRU. Entries carry a per-user version stored in
+the Django cache, so logout, password change and profile updates invalidate them
+(across workers, through the shared cache tier).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+AUTH_VERSION_KEY = 'users:auth-version:{}'
+
+
+class _TokenCache:
+    """Thread-safe LRU of token key -> (expires_at, version, token)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, version, token, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, version, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key=None, user_id=None):
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+            if user_id is not None:
+                for cached_key in [k for k, e in self._entries.items() if e[2].user_id == user_id]:
+                    del self._entries[cached_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = _TokenCache(getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 1024))
+
+
+def get_auth_version(user_id):
+    return cache.get(AUTH_VERSION_KEY.format(user_id), 0)
+
+
+def invalidate_user(user_id, token_key=None):
+    """Drop cached credentials for a user (and bump the shared version)."""
+    cache.set(AUTH_VERSION_KEY.format(user_id), time.time_ns(), None)
+    token_cache.discard(key=token_key, user_id=user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that loads token, user and profile in one query and
+    serves repeat requests from an in-process LRU.
+
+    Each request receives a deep copy, so views can mutate request.user
+    without affecting other requests.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None and entry[1] == get_auth_version(entry[2].user_id):
+            token = copy.deepcopy(entry[2])
+            return (token.user, token)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user', 'user__profile').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # An invalidation racing with this query is bounded by the TTL.
+        version = get_auth_version(token.user_id)
+        token_cache.set(key, version, token, getattr(settings, 'AUTH_TOKEN_CACHE_SECONDS', 60))
+        token = copy.deepcopy(token)
+        return (token.user, token)
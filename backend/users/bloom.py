@@ -0,0 +1,92 @@
+"""
+Bloom filter of taken usernames
+Lets the signup form's keystroke-driven availability checks answer "available"
+without a database query in the common case. A negative answer is definite; a
+positive answer is confirmed against the database (lower(username) index).
+"""
+import hashlib
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+BLOOM_VERSION_KEY = 'users:username-bloom:version'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= np.uint8(1 << (position & 7))
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UsernameBloom:
+    """
+    Per-process filter of lowercased usernames.
+
+    Built lazily from auth_user; rebuilt when another worker bumps the shared
+    version (signup or rename), at most once per USERNAME_BLOOM_REFRESH_SECONDS.
+    Until that rebuild the filter may miss the new name, so lookups go to the
+    database instead.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._version = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _build(self, version):
+        from django.contrib.auth.models import User
+        from django.db.models.functions import Lower
+
+        usernames = list(User.objects.annotate(name=Lower('username')).values_list('name', flat=True))
+        # Headroom so new signups do not degrade the false-positive rate quickly.
+        bloom = BloomFilter(capacity=len(usernames) * 2 + 1000)
+        for username in usernames:
+            bloom.add(username)
+        self._filter, self._version, self._built_at = bloom, version, time.monotonic()
+
+    def _current(self):
+        """The filter, or None while it is stale but a rebuild is not due yet."""
+        version = cache.get(BLOOM_VERSION_KEY, 0)
+        refresh = getattr(settings, 'USERNAME_BLOOM_REFRESH_SECONDS', 30)
+        with self._lock:
+            if self._filter is None or self._version != version:
+                if self._filter is not None and time.monotonic() - self._built_at < refresh:
+                    return None
+                self._build(version)
+            return self._filter
+
+    def might_exist(self, username):
+        bloom = self._current()
+        return bloom is None or username.lower() in bloom
+
+    def add(self, username):
+        """Record a new username locally and tell other workers to rebuild."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(username.lower())
+        cache.set(BLOOM_VERSION_KEY, time.time_ns(), None)
+
+
+username_bloom = UsernameBloom()
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Functional indexes for case-insensitive username/email lookups
+    (queried as username__lower / email__lower, see users.apps).
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0016_remove_passwordresettoken_phone_number_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_auth_user_username_lower_idx ON auth_user (LOWER(username));',
+            reverse_sql='DROP INDEX IF EXISTS users_auth_user_username_lower_idx;',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX IF EXISTS users_auth_user_email_lower_idx;',
+        ),
+    ]
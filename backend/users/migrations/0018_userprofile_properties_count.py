@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_properties_count(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    Property = apps.get_model('listings', 'Property')
+    counts = (
+        Property.objects.filter(owner=OuterRef('pk'), status='approved', is_deleted=False)
+        .order_by()
+        .values('owner')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    UserProfile.objects.update(
+        properties_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0068_dailyvisitorsketch'),
+        ('users', '0017_auth_user_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='properties_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_properties_count, migrations.RunPython.noop),
+    ]
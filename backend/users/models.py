@@ -57,6 +57,9 @@ class UserProfile(models.Model):
     is_email_verified = models.BooleanField(default=False)
     is_phone_verified = models.BooleanField(default=False)
 
+    # Denormalized: approved, non-deleted listings (kept by users.public_profile.refresh_properties_count)
+    properties_count = models.PositiveIntegerField(default=0, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,61 @@
+"""
+Public profile header cache and denormalized listing counters.
+
+The public profile page is hit far more often than an owner's listings
+change, so the header (plus the first page of listing cards) is cached per
+username and dropped whenever the owner's profile or properties change.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+PUBLIC_PROFILE_CACHE_KEY = 'users:public-profile:{}'
+
+
+def public_profile_cache_key(username):
+    return PUBLIC_PROFILE_CACHE_KEY.format(username.lower())
+
+
+def get_cached_public_profile(username):
+    return cache.get(public_profile_cache_key(username))
+
+
+def set_cached_public_profile(username, payload):
+    timeout = getattr(settings, 'PUBLIC_PROFILE_CACHE_SECONDS', 300)
+    cache.set(public_profile_cache_key(username), payload, timeout)
+
+
+def invalidate_public_profile(username):
+    if username:
+        cache.delete(public_profile_cache_key(username))
+
+
+def approved_properties_count_subquery():
+    """COUNT of approved, non-deleted properties per profile (for .update / .annotate)."""
+    from listings.models import Property
+
+    counts = (
+        Property.objects.filter(owner=OuterRef('pk'), status='approved', is_deleted=False)
+        .order_by()
+        .values('owner')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def refresh_properties_count(profile_ids):
+    """
+    Recompute UserProfile.properties_count for the given profiles and drop
+    their cached public profiles. Uses .update() so profile signals don't fire.
+    """
+    from .models import UserProfile
+
+    profile_ids = {pk for pk in profile_ids if pk}
+    if not profile_ids:
+        return
+    profiles = UserProfile.objects.filter(pk__in=profile_ids)
+    profiles.update(properties_count=approved_properties_count_subquery())
+    for username in profiles.values_list('user__username', flat=True):
+        invalidate_public_profile(username)
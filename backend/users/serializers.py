@@ -2,6 +2,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.db.models.functions import Lower
 from .models import UserProfile, PasswordResetToken
 import re
 
@@ -29,7 +30,7 @@ class PublicUserProfileSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
     username = serializers.CharField(source='user.username', read_only=True)
     member_since = serializers.DateTimeField(source='created_at', read_only=True)
-    properties_count = serializers.SerializerMethodField()
+    properties_count = serializers.IntegerField(read_only=True)  # denormalized counter
 
     class Meta:
         model = UserProfile
@@ -42,9 +43,6 @@ class PublicUserProfileSerializer(serializers.ModelSerializer):
         # Prefer User.get_full_name() (first_name + last_name) as it's the source of truth
         return obj.user.get_full_name() or obj.full_name or obj.user.username
 
-    def get_properties_count(self, obj):
-        return obj.properties.filter(is_deleted=False, status='approved').count()
-
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer for User model with profile.
@@ -103,7 +101,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         value = value.lower()
         
         # Check if username exists (case-insensitive)
-        if User.objects.filter(username__iexact=value).exists():
+        if User.objects.alias(username_lower=Lower('username')).filter(username_lower=value).exists():
             raise serializers.ValidationError("اسم المستخدم موجود بالفعل")
         if not re.match(r'^[a-zA-Z0-9_.-]+$', value):
             raise serializers.ValidationError(
@@ -113,7 +111,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def validate_email(self, value):
         """Validate email uniqueness."""
-        if User.objects.filter(email=value).exists():
+        if User.objects.alias(email_lower=Lower('email')).filter(email_lower=value.lower()).exists():
             raise serializers.ValidationError("البريد الإلكتروني مسجل بالفعل")
         return value
 
@@ -1,11 +1,49 @@
 """
 Signals for user-related events
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.db.models import Q
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_user
+from .bloom import username_bloom
+from .public_profile import invalidate_public_profile
 from .models import UserProfile
 
 # Note: The notifications for new users are handled in listings/signals.py
-# This file is kept for future user-related signals if needed
+
+
+# ----------- AUTH CACHE INVALIDATION ----------------
+@receiver([post_save, post_delete], sender=User)
+def invalidate_auth_on_user_change(sender, instance, **kwargs):
+    """Password change, deactivation or profile edits on User."""
+    invalidate_user(instance.pk)
+    invalidate_public_profile(instance.username)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_auth_on_profile_change(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+    invalidate_public_profile(instance.user.username)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_auth_on_logout(sender, instance, **kwargs):
+    invalidate_user(instance.user_id, token_key=instance.key)
+
+
+# ----------- USERNAME BLOOM FILTER ----------------
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # From __dict__ so deferred usernames (.only / .defer) are not loaded by a query
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+def add_username_to_bloom(sender, instance, created, **kwargs):
+    """New users and renames (admin edits); old names stay as harmless false positives."""
+    username = instance.__dict__.get('username')
+    if username and (created or username != getattr(instance, '_loaded_username', None)):
+        username_bloom.add(username)
+    instance._loaded_username = username
@@ -3,11 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.models import Token
-from rest_framework.throttling import AnonRateThrottle
+from rest_framework.pagination import CursorPagination
+from backend_project.throttling import GCRAAnonRateThrottle
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.core.mail import send_mail
 from django.conf import settings
+from django.urls import reverse
 import logging
 from .serializers import (
     UserSerializer,
@@ -20,23 +22,66 @@ from .serializers import (
     ResetPasswordSerializer,
 )
 from .models import UserProfile, PasswordResetToken
+from .bloom import username_bloom
+from .public_profile import get_cached_public_profile, set_cached_public_profile
 from django.db.models import Q
+from django.db.models.functions import Lower
 from django.utils import timezone
 from datetime import timedelta
-from listings.serializers import PropertySerializer
+from listings.serializers import ProfilePropertyCardSerializer
 from listings.models import Property
 
 logger = logging.getLogger(__name__)
 
 
-class AuthRateThrottle(AnonRateThrottle):
-    """Rate limiting for auth endpoints"""
-    rate = '20/minute'
+def _user_by_email(email):
+    """
+    Case-insensitive email lookup (LOWER(email) index). Accounts whose emails differ
+    only by case resolve to the oldest one. Raises User.DoesNotExist.
+    """
+    user = (
+        User.objects.alias(email_lower=Lower('email'))
+        .filter(email_lower=email.lower())
+        .order_by('pk')
+        .first()
+    )
+    if user is None:
+        raise User.DoesNotExist
+    return user
+
+
+def _profile_by_username(username):
+    """Case-insensitive username lookup (LOWER(username) index); None when missing."""
+    return (
+        UserProfile.objects.select_related('user')
+        .alias(username_lower=Lower('user__username'))
+        .filter(username_lower=username.lower())
+        .order_by('user_id')
+        .first()
+    )
+
+
+class AuthRateThrottle(GCRAAnonRateThrottle):
+    """Rate limiting for auth endpoints (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['auth'])"""
+    scope = 'auth'
 
 
-class ContactRateThrottle(AnonRateThrottle):
+class ContactRateThrottle(GCRAAnonRateThrottle):
     """Rate limiting for contact message endpoints"""
-    rate = '3/minute'
+    scope = 'contact'
+
+class PublicProfilePropertiesPagination(CursorPagination):
+    """Approved listings on a public profile, newest first."""
+    page_size = 12
+    ordering = ('-created_at', '-id')
+    first_page_only = False
+
+    def decode_cursor(self, request):
+        # The cached header endpoint always serves the first page
+        if self.first_page_only:
+            return None
+        return super().decode_cursor(request)
+
 
 class AuthViewSet(viewsets.ViewSet):
     """
@@ -137,8 +182,11 @@ class AuthViewSet(viewsets.ViewSet):
                 {'available': False, 'error': 'username is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        # Check username exists (case-insensitive)
-        exists = User.objects.filter(username__iexact=username).exists()
+        # Bloom filter miss = definitely available (no DB query)
+        if not username_bloom.might_exist(username):
+            return Response({'available': True}, status=status.HTTP_200_OK)
+        # Check username exists (case-insensitive, lower(username) index)
+        exists = User.objects.alias(username_lower=Lower('username')).filter(username_lower=username.lower()).exists()
         return Response({'available': not exists}, status=status.HTTP_200_OK)
 
     # ----------- CHECK EMAIL ----------------
@@ -155,7 +203,7 @@ class AuthViewSet(viewsets.ViewSet):
                 {'available': False, 'error': 'email is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        exists = User.objects.filter(email=email).exists()
+        exists = User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).exists()
         return Response({'available': not exists}, status=status.HTTP_200_OK)
 
     # ----------- CHANGE PASSWORD ----------------
@@ -269,38 +317,72 @@ class AuthViewSet(viewsets.ViewSet):
     )
     def public_profile(self, request, username=None):
         """
-        Get public profile for any user by username - shows safe public info + their approved properties.
+        Get public profile for any user by username - shows safe public info + the first
+        page of their approved properties. Cached per username; `next` points at the
+        cursor-paginated listings feed for the remaining pages.
         """
-        try:
+        payload = get_cached_public_profile(username)
+        if payload is None:
             # Use case-insensitive search for username consistency
-            profile = UserProfile.objects.select_related('user').get(user__username__iexact=username)
-        except UserProfile.DoesNotExist:
+            profile = _profile_by_username(username)
+            if profile is None:
+                return Response(
+                    {'success': False, 'error': 'المستخدم غير موجود'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            page = self._public_properties_page(request, profile, first_page=True)
+            payload = {
+                'success': True,
+                'profile': PublicUserProfileSerializer(profile).data,
+                'properties': page['results'],
+                'next': page['next'],
+            }
+            set_cached_public_profile(username, payload)
+
+        return Response(payload, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[AllowAny],
+        url_path=r'public-profile/(?P<username>[\w.-]+)/properties'
+    )
+    def public_profile_properties(self, request, username=None):
+        """
+        Cursor-paginated approved properties of a user (lean card payload).
+        """
+        profile = _profile_by_username(username)
+        if profile is None:
             return Response(
                 {'success': False, 'error': 'المستخدم غير موجود'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        page = self._public_properties_page(request, profile)
+        return Response({'success': True, **page}, status=status.HTTP_200_OK)
 
-        # Public profile data
-        profile_data = PublicUserProfileSerializer(profile).data
-
-        # Get user's approved, non-deleted properties
+    def _public_properties_page(self, request, profile, first_page=False):
+        """
+        One page of the profile's approved, non-deleted properties. The first
+        page (cached with the header) links `next` to the properties feed.
+        """
         properties = Property.objects.filter(
             owner=profile,
             status='approved',
             is_deleted=False
-        ).select_related('area', 'owner', 'owner__user').prefetch_related(
-            'images', 'videos', 'amenities'
-        ).order_by('-created_at')
-
-        properties_data = PropertySerializer(
-            properties, many=True, context={'request': request}
-        ).data
+        ).select_related('area', 'owner__user').prefetch_related('images')
 
-        return Response({
-            'success': True,
-            'profile': profile_data,
-            'properties': properties_data,
-        }, status=status.HTTP_200_OK)
+        paginator = PublicProfilePropertiesPagination()
+        paginator.first_page_only = first_page
+        page = paginator.paginate_queryset(properties, request, view=self)
+        if first_page:
+            paginator.base_url = request.build_absolute_uri(
+                reverse('users:auth-public-profile-properties', kwargs={'username': profile.user.username})
+            )
+        return {
+            'results': ProfilePropertyCardSerializer(page, many=True, context={'request': request}).data,
+            'next': paginator.get_next_link(),
+        }
 
     # ----------- RECENT ACCOUNTS ----------------
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], url_path='recent-accounts')
@@ -351,7 +433,7 @@ class AuthViewSet(viewsets.ViewSet):
         if serializer.is_valid():
             email = serializer.validated_data.get('email')
             try:
-                user = User.objects.get(email=email)
+                user = _user_by_email(email)
                 
                 # Delete previous reset tokens
                 PasswordResetToken.objects.filter(user=user).delete()
@@ -450,7 +532,7 @@ class AuthViewSet(viewsets.ViewSet):
             new_password = serializer.validated_data.get('new_password')
             
             try:
-                user = User.objects.get(email=email)
+                user = _user_by_email(email)
                 
                 # Get reset token
                 try:
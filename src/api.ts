@@ -381,6 +381,13 @@ export interface PublicProfileResponse {
   success: boolean;
   profile: PublicUserProfile;
   properties: ApiProperty[];
+  next: string | null;
+}
+
+export interface PublicProfilePropertiesPage {
+  success: boolean;
+  results: ApiProperty[];
+  next: string | null;
 }
 
 export async function fetchPublicProfile(username: string): Promise<PublicProfileResponse> {
@@ -393,6 +400,17 @@ export async function fetchPublicProfile(username: string): Promise<PublicProfil
   }
 }
 
+// Next page of a public profile's listings (`next` cursor URL from the previous page)
+export async function fetchPublicProfileProperties(nextUrl: string): Promise<PublicProfilePropertiesPage> {
+  try {
+    const { data } = await API.get(nextUrl);
+    return data;
+  } catch (error) {
+    console.error("Error fetching public profile properties:", error);
+    throw error;
+  }
+}
+
 // ============ Properties ============
 export async function fetchProperties(): Promise<ApiProperty[]> {
   try {
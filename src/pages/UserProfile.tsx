@@ -18,7 +18,7 @@ import {
   Share2,
   Grid3X3, LayoutList, TrendingUp,
 } from "lucide-react";
-import { fetchPublicProfile, PublicUserProfile, ApiProperty } from "@/api";
+import { fetchPublicProfile, fetchPublicProfileProperties, PublicUserProfile, ApiProperty } from "@/api";
 
 /* ===== User Type Configuration ===== */
 const USER_TYPES: Record<string, {
@@ -68,6 +68,8 @@ const UserProfilePage = () => {
   const { username } = useParams();
   const [profile, setProfile] = useState<PublicUserProfile | null>(null);
   const [properties, setProperties] = useState<ApiProperty[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [viewMode, setViewMode] = useState<"grid" | "list">("grid");
@@ -81,6 +83,7 @@ const UserProfilePage = () => {
         const data = await fetchPublicProfile(username);
         setProfile(data.profile);
         setProperties(data.properties);
+        setNextPage(data.next);
       } catch {
         setError("لم نتمكن من العثور على هذا المستخدم");
       } finally {
@@ -91,6 +94,20 @@ const UserProfilePage = () => {
     window.scrollTo(0, 0);
   }, [username]);
 
+  const loadMore = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPublicProfileProperties(nextPage);
+      setProperties(prev => [...prev, ...page.results]);
+      setNextPage(page.next);
+    } catch {
+      // يبقى زر "عرض المزيد" متاحاً لإعادة المحاولة
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const featuredProps = useMemo(() => properties.filter(p => p.featured), [properties]);
   const discountedProps = useMemo(() => properties.filter(p => p.discount !== null && p.discount > 0), [properties]);
 
@@ -377,7 +394,7 @@ const UserProfilePage = () => {
                   {/* Tabs */}
                   <TabsList className="hidden sm:flex bg-muted/50 rounded-xl h-9 p-1">
                     <TabsTrigger value="all" className="rounded-lg text-xs px-3 data-[state=active]:shadow-sm">
-                      الكل ({properties.length})
+                      الكل ({profile.properties_count})
                     </TabsTrigger>
                     {featuredProps.length > 0 && (
                       <TabsTrigger value="featured" className="rounded-lg text-xs px-3 data-[state=active]:shadow-sm gap-1">
@@ -415,6 +432,14 @@ const UserProfilePage = () => {
                 <PropertiesGrid properties={featuredProps} viewMode={viewMode} />
               </TabsContent>
             </Tabs>
+
+            {nextPage && (
+              <div className="flex justify-center mt-8">
+                <Button variant="outline" className="rounded-xl px-8" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? "جاري التحميل..." : "عرض المزيد"}
+                </Button>
+              </div>
+            )}
           </motion.div>
         </section>
       </main>